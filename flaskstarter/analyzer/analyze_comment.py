@@ -26,13 +26,13 @@ DPI = 400
 
 
 class CommentAnalyzer:
-    def __init__(self, csv_path, db_name="bilibili_comments.db"):
+    def __init__(self, csv_path, db_name="bilibili_comments.db", output_dir=IMAGE_DIR):
         self.csv_path = csv_path
         self.db_name = db_name
 
         self.font_path = FONT_PATH
         self.stopwords_path = HIT_STOPWORDS_PATH
-        self.output_dir = IMAGE_DIR
+        self.output_dir = output_dir
         self.df = None
         self.df_unique_users = None 
         self._setup_matplotlib_font()
@@ -8,6 +8,9 @@ from .settings import settings
 from .frontend import frontend
 from .bilibili import bilibili  # 添加这一行
 from .extensions import db, mail, cache, login_manager, admin
+from .database.migrations import apply_migrations
+from .jobs.tasks import get_job_queue
+from .tools.config import BILI_DB_PATH, JOB_IN_WEB_PROCESS
 from .utils import INSTANCE_FOLDER_PATH, pretty_date
 
 
@@ -33,6 +36,7 @@ def create_app(config=None, app_name=None, blueprints=None):
     configure_hook(app)
     configure_blueprints(app, blueprints)
     configure_extensions(app)
+    configure_bilibili_db(app)
     configure_logging(app)
     configure_template_filters(app)
     configure_error_handlers(app)
@@ -73,6 +77,12 @@ def configure_extensions(app):
     login_manager.setup_app(app)
 
 
+def configure_bilibili_db(app):
+    # Bring the crawler database up to the latest schema version
+
+    apply_migrations(BILI_DB_PATH)
+
+
 def configure_blueprints(app, blueprints):
     # Configure blueprints in views
 
@@ -104,7 +114,10 @@ def configure_logging(app):
 def configure_hook(app):
     @app.before_request
     def before_request():
-        pass
+        # Start the background job workers with the first request, so CLI
+        # commands that also build the app never pick up queued jobs
+        if JOB_IN_WEB_PROCESS:
+            get_job_queue().start()
 
 
 def configure_error_handlers(app):
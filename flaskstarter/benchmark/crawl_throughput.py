@@ -0,0 +1,159 @@
+"""
+对比同步模式与异步模式爬取同一视频的吞吐，并校验两者写入的 comment/user 表完全一致；
+数据集中部分一级评论只带 rcount，校验这些评论入库的回复数与二级评论，
+并在爬完后做一次增量重爬，评论未变化时应只请求一页。
+
+用法: python -m flaskstarter.benchmark.crawl_throughput --roots 200 --replies 30 --latency-ms 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+from ..crawler.get_single_video_comment import BilibiliCommentCrawler
+from ..crawler.rate_limiter import RateLimiter
+from ..tools.config import RATE_LIMITS
+from ..tools.http_client import HttpClient
+from ..database.db_manage import init_bilibili_db
+from .stub_server import StubServer, VideoFixture
+
+UNTHROTTLED_LIMITS = {
+    family: {"rate": 10000.0, "min_rate": 10000.0, "max_rate": 10000.0, "burst": 1000}
+    for family in RATE_LIMITS
+}
+
+
+def run_crawl(
+    server: StubServer,
+    video: VideoFixture,
+    db_path: str,
+    concurrency: int,
+    incremental: bool = False,
+):
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_bilibili_db(db_path)
+        crawler = BilibiliCommentCrawler(
+            bv=video.bvid, db_name=db_path, concurrency=concurrency
+        )
+        crawler.api_base = server.url
+        # 本地桩服务器不做风控，放开限速以测出爬虫本身的吞吐
+        crawler.http = HttpClient(
+            cookie_path=os.devnull, rate_limiter=RateLimiter(UNTHROTTLED_LIMITS)
+        )
+        requests_before = server.request_count
+        connections_before = server.connection_count
+        started = time.perf_counter()
+        count = crawler.crawl(incremental=incremental)
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "comments": count,
+        "requests": server.request_count - requests_before,
+        "saved_requests": crawler.saved_requests,
+        "connections": server.connection_count - connections_before,
+        "latency": crawler.http.get_latency_stats(),
+        "seconds": elapsed,
+        "commit_seconds": crawler.write_buffer.commit_seconds,
+        "user_cache_hit_rate": crawler.write_buffer.user_cache.hit_rate,
+        "comments_per_sec": count / elapsed if elapsed else 0.0,
+    }
+
+
+def dump_tables(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        comments = conn.execute("SELECT * FROM comment ORDER BY rpid").fetchall()
+        users = conn.execute("SELECT * FROM user ORDER BY mid").fetchall()
+    finally:
+        conn.close()
+    return comments, users
+
+
+def check_rcount_only_roots(video: VideoFixture, db_path: str):
+    """
+    检查只带 rcount 的一级评论：入库的回复数与二级评论条数都应与数据集一致。
+    :return: (这类评论的条数, 不一致的条数)
+    """
+    roots = [
+        root
+        for root in video.roots
+        if root["rcount"] and not root["reply_control"].get("sub_reply_entry_text")
+    ]
+    mismatched = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        for root in roots:
+            expected = video.sub_reply_count(root["rpid"])
+            stored = conn.execute(
+                "SELECT single_reply_num FROM comment WHERE rpid = ?", (root["rpid"],)
+            ).fetchone()
+            sub_rows = conn.execute(
+                "SELECT COUNT(*) FROM comment WHERE rootid = ?", (root["rpid"],)
+            ).fetchone()[0]
+            if stored is None or stored[0] != expected or sub_rows != expected:
+                mismatched += 1
+    finally:
+        conn.close()
+    return len(roots), mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="评论爬虫同步/异步模式吞吐对比")
+    parser.add_argument("--roots", type=int, default=200)
+    parser.add_argument("--replies", type=int, default=30)
+    parser.add_argument("--rcount-only-every", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    video = VideoFixture(
+        1001,
+        "BV1stub00001",
+        "桩服务视频",
+        args.roots,
+        args.replies,
+        rcount_only_every=args.rcount_only_every,
+    )
+    print(f"数据集: {args.roots} 条一级评论, 共 {video.total_comments} 条评论")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, StubServer(
+        [video], latency_ms=args.latency_ms
+    ) as server:
+        sync_db = os.path.join(tmp_dir, "sync.db")
+        async_db = os.path.join(tmp_dir, "async.db")
+        results = [
+            run_crawl(server, video, sync_db, concurrency=1),
+            run_crawl(server, video, async_db, concurrency=args.concurrency),
+        ]
+        for result in results:
+            mode = "同步" if result["concurrency"] == 1 else "异步"
+            print(
+                f"{mode} (concurrency={result['concurrency']}): {result['comments']} 条, "
+                f"{result['requests']} 次请求 (预览省去 {result['saved_requests']} 次) / "
+                f"{result['connections']} 条连接, "
+                f"{result['seconds']:.2f}s "
+                f"(写库 {result['commit_seconds']:.2f}s, "
+                f"用户缓存命中率 {result['user_cache_hit_rate']:.1%}), "
+                f"{result['comments_per_sec']:.1f} 条/s"
+            )
+            for family, stats in result["latency"].items():
+                print(
+                    f"    {family}: {stats['count']} 次, 平均 {stats['mean_ms']:.1f}ms, "
+                    f"p50 {stats['p50_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms"
+                )
+
+        identical = dump_tables(sync_db) == dump_tables(async_db)
+        print(f"comment/user 表是否一致: {'是' if identical else '否'}")
+        rcount_only, mismatched = check_rcount_only_roots(video, sync_db)
+        print(f"只带 rcount 的一级评论: {rcount_only} 条, 回复数或二级评论不一致 {mismatched} 条")
+        recrawl = run_crawl(server, video, sync_db, concurrency=1, incremental=True)
+        print(f"评论未变化时增量重爬: {recrawl['requests']} 次请求")
+        print(f"加速比: {results[0]['seconds'] / results[1]['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
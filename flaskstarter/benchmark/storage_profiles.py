@@ -0,0 +1,131 @@
+"""
+在各存储预设下同时运行爬虫式批量写入与 CSV 导出式流式读取，对比读写吞吐。
+
+写线程模拟 WriteBuffer：每次事务写入 --batch 条评论；读线程反复流式读取
+get_comments_by_oid_stream 的全部结果，模拟网页导出。
+
+用法: python -m flaskstarter.benchmark.storage_profiles --seconds 5 --readers 2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from ..database.connection import STORAGE_PROFILES, get_connection_manager
+from ..database.db_manage import init_bilibili_db
+from ..repository.comment_repository import CommentRepository
+from .bulk_upsert import synthetic_comments
+
+
+def run_profile(
+    db_path: str, profile: str, seconds: float, readers: int, batch: int, preload: int
+) -> dict:
+    manager = get_connection_manager(db_path)
+    manager.set_storage_profile(profile)
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_bilibili_db(db_path)
+    repo = CommentRepository(db_path)
+    repo.bulk_upsert_comments(synthetic_comments(preload), chunk_size=5000)
+    export_oids = list(range(1000, 1010))
+
+    stop = threading.Event()
+    stats = {"written": 0, "read": 0, "write_errors": 0, "commit_seconds": 0.0}
+    lock = threading.Lock()
+
+    def writer():
+        next_rpid = preload
+        while not stop.is_set():
+            comments = list(synthetic_comments(batch, start=next_rpid))
+            started = time.perf_counter()
+            try:
+                with manager.transaction() as conn:
+                    conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO comment VALUES
+                        (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        [comment.to_tuple() for comment in comments],
+                    )
+            except sqlite3.Error:
+                with lock:
+                    stats["write_errors"] += 1
+                continue
+            with lock:
+                stats["commit_seconds"] += time.perf_counter() - started
+                stats["written"] += len(comments)
+            next_rpid += batch
+        manager.close_thread_connection()
+
+    def reader():
+        while not stop.is_set():
+            rows = 0
+            for _ in repo.get_comments_by_oid_stream(export_oids):
+                rows += 1
+                if stop.is_set():
+                    break
+            with lock:
+                stats["read"] += rows
+        manager.close_thread_connection()
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader) for _ in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    manager.close_all()
+
+    return {
+        "profile": profile,
+        "write_rows_per_sec": stats["written"] / seconds,
+        "read_rows_per_sec": stats["read"] / seconds,
+        "avg_commit_ms": (
+            stats["commit_seconds"] / (stats["written"] / batch) * 1000
+            if stats["written"]
+            else 0.0
+        ),
+        "write_errors": stats["write_errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存储预设并发读写基准测试")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--preload", type=int, default=200_000)
+    parser.add_argument(
+        "--profiles", nargs="*", default=list(STORAGE_PROFILES.keys())
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'预设':<14}{'写入 行/s':>12}{'读取 行/s':>14}{'平均提交 ms':>14}{'写入失败':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for profile in args.profiles:
+            result = run_profile(
+                os.path.join(tmp_dir, f"{profile}.db"),
+                profile,
+                args.seconds,
+                args.readers,
+                args.batch,
+                args.preload,
+            )
+            print(
+                f"{profile:<14}{result['write_rows_per_sec']:>12.0f}"
+                f"{result['read_rows_per_sec']:>14.0f}{result['avg_commit_ms']:>14.2f}"
+                f"{result['write_errors']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+"""
+本地 B 站评论接口桩服务，按固定随机种子生成评论数据（或从原始页面存档加载），用于离线压测爬虫吞吐。
+提供一级/二级评论、评论详情、视频信息、UP 主视频列表，以及 aicu 的用户评论搜索与用户空间接口，
+可配置响应延迟、错误率与限流（超出后返回 HTTP 412）。
+
+用法: python -m flaskstarter.benchmark.stub_server --roots 200 --replies 30 --port 8765
+然后把爬虫指向它:
+    BILI_API_BASE=http://127.0.0.1:8765 \
+    AICU_API_BASE=http://127.0.0.1:8765 AICU_WORKER_BASE=http://127.0.0.1:8765 flask crawlvideos BV1stub00001
+"""
+
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from ..crawler.page_archive import PageArchive, VIDEO_ARCHIVE
+from ..tools.wbi import sign_wbi_params
+
+MAIN_PAGE_SIZE = 20
+PREVIEW_SIZE = 3
+LOCATIONS = ["北京", "上海", "广东", "浙江", "四川", "江苏", "湖北", "海外"]
+
+
+class VideoFixture:
+    """
+    一个视频的全部评论数据，一级评论按时间倒序排列。
+    二级评论不常驻内存，每条都由 (seed, rpid) 确定性地按需生成，百万级评论的数据集也只占少量内存；
+    从页面存档加载的数据集则直接保存记录下的二级评论。
+    """
+
+    def __init__(
+        self,
+        oid: int,
+        bvid: str,
+        title: str,
+        root_count: int,
+        replies_per_root: int,
+        seed: int = 0,
+        user_pool: int = 5000,
+        rcount_only_every: int = 0,
+    ):
+        """
+        :param rcount_only_every: 每隔多少条一级评论有一条不带 "共N条回复"、只有 rcount 的评论，
+            对应接口对回复较少的评论的返回；0 表示所有有回复的评论都带该文本
+        """
+        self.oid = oid
+        self.bvid = bvid
+        self.title = title
+        self.seed = seed
+        self.user_pool = user_pool
+        self.roots: List[dict] = []
+        # 一级评论 rpid -> (发布时间, 二级评论数)；二级评论的 rpid 紧跟在所属一级评论之后
+        self.root_info: Dict[int, Tuple[int, int]] = {}
+        self._root_rpids: List[int] = []
+        self._recorded_subs: Optional[Dict[int, List[dict]]] = None
+        self._total_comments: Optional[int] = None
+
+        rng = random.Random(seed)
+        now = 1700000000
+        rpid = oid * 10_000_000
+        for i in range(root_count):
+            rpid += 1
+            reply_count = rng.randint(0, replies_per_root * 2) if replies_per_root else 0
+            root_time = now - i * 60
+            self.root_info[rpid] = (root_time, reply_count)
+            self._root_rpids.append(rpid)
+            root = self._make_reply(
+                self._reply_rng(rpid),
+                rpid,
+                root_time,
+                rcount=reply_count,
+                entry_text=not (rcount_only_every and i % rcount_only_every == 0),
+            )
+            root["replies"] = self.get_sub_replies(rpid, 0, PREVIEW_SIZE)
+            self.roots.append(root)
+            rpid += reply_count
+
+    def _reply_rng(self, rpid: int) -> random.Random:
+        return random.Random(self.seed * 1_000_000_007 + rpid)
+
+    def _make_reply(
+        self,
+        rng: random.Random,
+        rpid: int,
+        ctime: int,
+        root: int = 0,
+        parent: int = 0,
+        rcount: int = 0,
+        entry_text: bool = True,
+    ) -> dict:
+        mid = rng.randint(1, self.user_pool)
+        reply_control = {"location": f"IP属地：{rng.choice(LOCATIONS)}"}
+        if rcount and entry_text:
+            reply_control["sub_reply_entry_text"] = f"共{rcount}条回复"
+        return {
+            "rpid": rpid,
+            "oid": self.oid,
+            "type": 1,
+            "mid": mid,
+            "root": root,
+            "parent": parent,
+            "ctime": ctime,
+            "like": rng.randint(0, 500),
+            "rcount": rcount,
+            "member": {
+                "mid": mid,
+                "uname": f"user_{mid}",
+                "sex": ["男", "女", "保密"][mid % 3],
+                "sign": f"sign of {mid}",
+                "avatar": f"https://i0.hdslb.com/bfs/face/{mid}.jpg",
+                "level_info": {"current_level": mid % 7},
+                "vip": {"vipStatus": 1 if mid % 3 == 0 else 0},
+            },
+            "content": {"message": f"评论 {rpid} 的内容"},
+            "reply_control": reply_control,
+            "replies": [],
+        }
+
+    def _make_sub_reply(self, root_rpid: int, index: int) -> dict:
+        rpid = root_rpid + index + 1
+        root_time = self.root_info[root_rpid][0]
+        return self._make_reply(
+            self._reply_rng(rpid),
+            rpid,
+            root_time + index + 1,
+            root=root_rpid,
+            parent=root_rpid,
+        )
+
+    def has_root(self, root_rpid: int) -> bool:
+        if self._recorded_subs is not None:
+            return root_rpid in self._recorded_subs
+        return root_rpid in self.root_info
+
+    def sub_reply_count(self, root_rpid: int) -> int:
+        if self._recorded_subs is not None:
+            return len(self._recorded_subs.get(root_rpid, []))
+        return self.root_info[root_rpid][1]
+
+    def get_sub_replies(self, root_rpid: int, start: int, stop: int) -> List[dict]:
+        """返回某条一级评论下第 start 到 stop-1 条二级评论。"""
+        if self._recorded_subs is not None:
+            return self._recorded_subs.get(root_rpid, [])[start:stop]
+        stop = min(stop, self.root_info[root_rpid][1])
+        return [self._make_sub_reply(root_rpid, i) for i in range(start, stop)]
+
+    def find_reply(self, rpid: int) -> Optional[dict]:
+        if self._recorded_subs is not None:
+            for reply in self.roots:
+                if reply["rpid"] == rpid:
+                    return reply
+            for subs in self._recorded_subs.values():
+                for reply in subs:
+                    if reply["rpid"] == rpid:
+                        return reply
+            return None
+
+        index = bisect.bisect_right(self._root_rpids, rpid) - 1
+        if index < 0:
+            return None
+        root_rpid = self._root_rpids[index]
+        if rpid == root_rpid:
+            return self.roots[index]
+        sub_index = rpid - root_rpid - 1
+        if sub_index < self.root_info[root_rpid][1]:
+            return self._make_sub_reply(root_rpid, sub_index)
+        return None
+
+    @property
+    def total_comments(self) -> int:
+        if self._total_comments is None:
+            self._total_comments = len(self.roots) + sum(
+                self.sub_reply_count(reply["rpid"]) for reply in self.roots
+            )
+        return self._total_comments
+
+    @classmethod
+    def from_archive(
+        cls, archive: PageArchive, oid: int, bvid: str, title: str = "存档视频"
+    ) -> "VideoFixture":
+        """
+        用真实爬取时记录的原始页面构造数据，按一级评论的翻页顺序与二级评论的页码拼接；
+        没有记录二级评论页的一级评论（回复都在内嵌预览里）使用预览。
+        """
+        video = cls(oid, bvid, title, root_count=0, replies_per_root=0)
+        seen_roots = set()
+        sub_pages: Dict[int, Dict[int, list]] = {}
+        for record in archive.iter_records(VIDEO_ARCHIVE, oid):
+            replies = (record["data"] or {}).get("replies") or []
+            if record["endpoint"] == "main":
+                for reply in replies:
+                    if reply["rpid"] not in seen_roots:
+                        seen_roots.add(reply["rpid"])
+                        video.roots.append(reply)
+            else:
+                sub_pages.setdefault(record["root"], {})[record["pn"]] = replies
+        video._recorded_subs = {}
+        for reply in video.roots:
+            pages = sub_pages.get(reply["rpid"], {})
+            video._recorded_subs[reply["rpid"]] = [
+                sub for pn in sorted(pages) for sub in pages[pn]
+            ] or list(reply.get("replies") or [])
+        return video
+
+
+class UserFixture:
+    """aicu 上一个用户的空间信息与全部评论，评论按时间倒序排列，按页生成。"""
+
+    def __init__(
+        self,
+        uid: int,
+        comment_count: int,
+        seed: int = 0,
+        oids: Optional[List[int]] = None,
+    ):
+        rng = random.Random(seed * 1_000_003 + uid)
+        self.uid = uid
+        self.seed = seed
+        self.comment_count = comment_count
+        self.card = {
+            "mid": str(uid),
+            "name": f"user_{uid}",
+            "sex": ["男", "女", "保密"][uid % 3],
+            "face": f"https://i0.hdslb.com/bfs/face/{uid}.jpg",
+            "fans": rng.randint(0, 100000),
+            "friend": rng.randint(0, 1000),
+            "sign": f"sign of {uid}",
+            "vip": {"vipStatus": 1 if uid % 3 == 0 else 0},
+        }
+        self.like_num = rng.randint(0, 1000000)
+        self.oids = oids or [rng.randint(1, 10**9) for _ in range(20)]
+
+    def _make_reply(self, index: int) -> dict:
+        # 评论内容只取决于序号 seq（最早的评论为 1），增加 comment_count 相当于用户发了新评论
+        seq = self.comment_count - index
+        rng = random.Random((self.seed * 1_000_003 + self.uid) * 1_000_000_007 + seq)
+        rpid = self.uid * 10_000_000 + seq
+        is_root = rng.random() < 0.5
+        parent = 0 if is_root else rpid - rng.randint(1, 5000)
+        return {
+            "rpid": str(rpid),
+            "message": f"用户 {self.uid} 的评论 {rpid}",
+            "time": 1700000000 + seq * 30,
+            "rank": 1,
+            "parent": {} if is_root else {"parentid": parent, "rootid": parent},
+            "dyn": {"oid": rng.choice(self.oids), "type": 1},
+        }
+
+    def get_replies(self, start: int, stop: int) -> List[dict]:
+        stop = min(stop, self.comment_count)
+        return [self._make_reply(i) for i in range(start, stop)]
+
+
+class StubServer:
+    """在后台线程中运行的桩服务，可作为上下文管理器使用。"""
+
+    def __init__(
+        self,
+        videos: List[VideoFixture],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        users: Optional[List[UserFixture]] = None,
+        error_rate: float = 0,
+        rate_limit: float = 0,
+        seed: int = 0,
+        uploaders: Optional[Dict[int, List[int]]] = None,
+    ):
+        """
+        :param latency_ms: 每个请求在响应前等待的毫秒数
+        :param error_rate: 随机返回 HTTP 500 的请求比例
+        :param rate_limit: 每秒允许的请求数，超出的请求返回 HTTP 412，0 表示不限流
+        :param uploaders: UP 主 mid 到其投稿视频 oid 列表（按发布时间倒序）的映射
+        """
+        self.videos_by_oid = {video.oid: video for video in videos}
+        self.videos_by_bvid = {video.bvid: video for video in videos}
+        self.users_by_uid = {user.uid: user for user in users or []}
+        self.uploaders = uploaders or {}
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._recent_requests = deque()
+        self.request_count = 0
+        self.connection_count = 0
+        self.error_count = 0
+        self.throttled_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def admit_request(self) -> Optional[int]:
+        """
+        记录一次请求并决定是否注入故障。
+        :return: 需要返回的错误状态码 (412 限流 / 500 随机错误)，正常处理时返回 None
+        """
+        with self._lock:
+            self.request_count += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._recent_requests and now - self._recent_requests[0] >= 1:
+                    self._recent_requests.popleft()
+                if len(self._recent_requests) >= self.rate_limit:
+                    self.throttled_count += 1
+                    return 412
+                self._recent_requests.append(now)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.error_count += 1
+                return 500
+        return None
+
+    def count_connection(self):
+        with self._lock:
+            self.connection_count += 1
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 长连接下响应头与响应体分两次写出，关闭 Nagle 以免与客户端的延迟确认叠加出 40ms 停顿
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count_connection()
+
+    def do_GET(self):
+        stub: StubServer = self.server.stub
+        fault = stub.admit_request()
+        if stub.latency_ms:
+            time.sleep(stub.latency_ms / 1000)
+        if fault == 412:
+            self._send_json({"code": -412, "message": "请求被拦截"}, status=412)
+            return
+        if fault == 500:
+            self._send_body(b"internal error", "text/plain", status=500)
+            return
+
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if parsed.path == "/x/v2/reply/wbi/main":
+            self._main_page(stub, query)
+        elif parsed.path == "/x/v2/reply/reply":
+            self._sub_page(stub, query)
+        elif parsed.path == "/x/v2/reply/detail":
+            self._detail(stub, query)
+        elif parsed.path == "/x/space/wbi/arc/search":
+            self._space_videos(stub, query)
+        elif parsed.path == "/api/v3/search/getreply":
+            self._aicu_replies(stub, query)
+        elif parsed.path == "/api/bili/space":
+            self._aicu_space(stub, query)
+        elif parsed.path == "/x/web-interface/view":
+            self._video_view(stub, query)
+        else:
+            self._send_json({"code": -404, "message": "啥都木有"}, status=404)
+
+    def _main_page(self, stub: StubServer, query: dict):
+        video = stub.videos_by_oid.get(int(query.get("oid", 0)))
+        if video is None:
+            self._send_json({"code": -404, "message": "啥都木有"})
+            return
+
+        offset = json.loads(query.get("pagination_str", '{"offset":""}'))["offset"]
+        page = json.loads(offset)["Data"]["cursor"] if offset else 1
+        start = (page - 1) * MAIN_PAGE_SIZE
+        replies = video.roots[start : start + MAIN_PAGE_SIZE]
+        is_end = start + MAIN_PAGE_SIZE >= len(video.roots)
+        self._send_json(
+            {
+                "code": 0,
+                "message": "0",
+                "data": {
+                    "cursor": {
+                        "is_begin": page == 1,
+                        "is_end": is_end,
+                        "mode": 2,
+                        "next": 0 if is_end else page + 1,
+                        "all_count": video.total_comments,
+                    },
+                    "replies": replies,
+                },
+            }
+        )
+
+    def _sub_page(self, stub: StubServer, query: dict):
+        video = stub.videos_by_oid.get(int(query.get("oid", 0)))
+        root = int(query.get("root", 0))
+        if video is None or not video.has_root(root):
+            self._send_json({"code": 12022, "message": "已经被删除了"})
+            return
+
+        ps = int(query.get("ps", 10))
+        pn = int(query.get("pn", 1))
+        count = video.sub_reply_count(root)
+        self._send_json(
+            {
+                "code": 0,
+                "message": "0",
+                "data": {
+                    "page": {"num": pn, "size": ps, "count": count},
+                    "replies": video.get_sub_replies(root, (pn - 1) * ps, pn * ps),
+                },
+            }
+        )
+
+    def _detail(self, stub: StubServer, query: dict):
+        video = stub.videos_by_oid.get(int(query.get("oid", 0)))
+        reply = video.find_reply(int(query.get("root", 0))) if video else None
+        if reply is None:
+            self._send_json({"code": 12022, "message": "已经被删除了"})
+            return
+        self._send_json({"code": 0, "message": "0", "data": {"root": reply}})
+
+    def _space_videos(self, stub: StubServer, query: dict):
+        unsigned = {k: v for k, v in query.items() if k not in ("wts", "w_rid")}
+        if query.get("w_rid") != sign_wbi_params(unsigned, int(query.get("wts", 0)))["w_rid"]:
+            self._send_json({"code": -403, "message": "访问权限不足"})
+            return
+        oids = stub.uploaders.get(int(query.get("mid", 0)), [])
+        ps = int(query.get("ps", 30))
+        pn = int(query.get("pn", 1))
+        vlist = []
+        for index in range((pn - 1) * ps, min(pn * ps, len(oids))):
+            video = stub.videos_by_oid[oids[index]]
+            vlist.append(
+                {
+                    "aid": video.oid,
+                    "bvid": video.bvid,
+                    "title": video.title,
+                    "comment": video.total_comments,
+                    # 列表按发布时间倒序，在列表前面加入新视频不改变已有视频的发布时间
+                    "created": 1700000000 + (len(oids) - index) * 3600,
+                }
+            )
+        self._send_json(
+            {
+                "code": 0,
+                "message": "0",
+                "data": {
+                    "list": {"vlist": vlist},
+                    "page": {"pn": pn, "ps": ps, "count": len(oids)},
+                },
+            }
+        )
+
+    def _aicu_replies(self, stub: StubServer, query: dict):
+        user = stub.users_by_uid.get(int(query.get("uid", 0)))
+        total = user.comment_count if user else 0
+        ps = int(query.get("ps", 20))
+        pn = int(query.get("pn", 1))
+        page = user.get_replies((pn - 1) * ps, pn * ps) if user else []
+        self._send_json(
+            {
+                "code": 0,
+                "message": "",
+                "data": {
+                    "cursor": {
+                        "all_count": total,
+                        "is_end": pn * ps >= total,
+                    },
+                    "replies": page,
+                },
+            }
+        )
+
+    def _aicu_space(self, stub: StubServer, query: dict):
+        user = stub.users_by_uid.get(int(query.get("mid", 0)))
+        if user is None:
+            self._send_json({"code": -404, "message": "用户不存在"})
+            return
+        self._send_json(
+            {"code": 0, "data": {"card": user.card, "like_num": user.like_num}}
+        )
+
+    def _video_view(self, stub: StubServer, query: dict):
+        video = stub.videos_by_bvid.get(query.get("bvid", ""))
+        if video is None:
+            self._send_json({"code": -404, "message": "啥都木有"})
+            return
+        self._send_json(
+            {
+                "code": 0,
+                "message": "0",
+                "data": {
+                    "aid": video.oid,
+                    "bvid": video.bvid,
+                    "title": video.title,
+                    "stat": {"aid": video.oid, "view": 0, "reply": video.total_comments},
+                },
+            }
+        )
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_body(body, "application/json; charset=utf-8", status)
+
+    def _send_body(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 B 站评论接口桩服务")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--oid", type=int, default=1001)
+    parser.add_argument("--bvid", default="BV1stub00001")
+    parser.add_argument("--roots", type=int, default=200)
+    parser.add_argument("--replies", type=int, default=30)
+    parser.add_argument(
+        "--rcount-only-every", type=int, default=0,
+        help="每隔多少条一级评论生成一条只有 rcount、不带 \"共N条回复\" 的评论",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--uid", type=int, default=2001)
+    parser.add_argument("--user-comments", type=int, default=2000)
+    parser.add_argument(
+        "--archive-dir", help="从该页面存档目录加载 --oid 对应视频，而不是随机生成"
+    )
+    args = parser.parse_args()
+
+    if args.archive_dir:
+        video = VideoFixture.from_archive(
+            PageArchive(args.archive_dir), args.oid, args.bvid
+        )
+    else:
+        video = VideoFixture(
+            args.oid,
+            args.bvid,
+            "桩服务视频",
+            args.roots,
+            args.replies,
+            rcount_only_every=args.rcount_only_every,
+        )
+    user = UserFixture(args.uid, args.user_comments, oids=[args.oid])
+    server = StubServer(
+        [video],
+        port=args.port,
+        latency_ms=args.latency_ms,
+        users=[user],
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    print(
+        f"桩服务已启动: {server.url} (视频 {video.bvid} 共 {video.total_comments} 条评论, "
+        f"用户 {user.uid} 共 {user.comment_count} 条评论)"
+    )
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
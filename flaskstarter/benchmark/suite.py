@@ -0,0 +1,337 @@
+"""
+端到端爬取压测套件：在本地桩服务上运行三个爬虫，记录评论/秒、请求/秒、数据库提交耗时与峰值内存，
+结果写入 JSON，并可与上一次的结果对比以发现性能回退。
+
+数据集形态:
+    flat  只有一级评论，没有回复
+    deep  少量一级评论，每条下挂数百条回复（长楼）
+    10k   约 1 万条评论的常规视频
+    1m    约 100 万条评论，耗时较长，默认不运行
+
+每个场景在独立的子进程中运行，峰值内存只统计爬虫本身，不含桩服务。
+导入 flaskstarter 包（pandas、jieba 等）本身就会占用数百 MB，因此同时记录爬取开始前的常驻内存，
+回退检测比较的是爬取期间的内存增量 crawl_rss_mb。
+
+用法:
+    python -m flaskstarter.benchmark.suite --shapes flat,deep,10k --output benchmark_results.json
+    python -m flaskstarter.benchmark.suite --baseline benchmark_results.json
+    flask bench --shapes 1m
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+from ..crawler.get_single_video_comment import BilibiliCommentCrawler
+from ..crawler.get_user_all_comment import BilibiliUserCommentsCrawler
+from ..crawler.get_user_information import BilibiliUserCrawler
+from ..crawler.rate_limiter import RateLimiter
+from ..database.connection import get_connection_manager
+from ..database.db_manage import init_bilibili_db
+from ..tools.config import SUB_REPLY_CONCURRENCY
+from ..tools.http_client import HttpClient
+from .crawl_throughput import UNTHROTTLED_LIMITS
+from .stub_server import StubServer, UserFixture, VideoFixture
+
+SHAPES = {
+    "flat": {"roots": 5000, "replies_per_root": 0, "user_comments": 5000},
+    "deep": {"roots": 20, "replies_per_root": 250, "user_comments": 5000},
+    "10k": {"roots": 500, "replies_per_root": 19, "user_comments": 10000},
+    "1m": {"roots": 20000, "replies_per_root": 49, "user_comments": 1000000},
+}
+DEFAULT_SHAPES = ["flat", "deep", "10k"]
+
+VIDEO_OID = 1001
+VIDEO_BVID = "BV1bench0001"
+USER_UID = 2001
+BATCH_FIRST_UID = 3001
+MIN_RSS_DELTA_MB = 16
+
+
+def _reset_peak_rss():
+    """Linux 下清零内核记录的常驻内存峰值 (VmHWM)，之后的峰值只反映爬取过程。"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _rss_mb() -> Tuple[Optional[float], Optional[float]]:
+    """返回 (当前常驻内存, 峰值常驻内存)，单位 MB，无法获取时为 None。"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return (
+            int(status["VmRSS"].split()[0]) / 1024,
+            int(status["VmHWM"].split()[0]) / 1024,
+        )
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KiB，macOS 上是字节
+    return None, peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def _run_scenario(
+    scenario: str, shape: str, server_url: str, concurrency: int, batch_users: int
+) -> dict:
+    """在子进程中运行一个场景，返回该场景的指标。"""
+    with tempfile.TemporaryDirectory() as tmp_dir, open(
+        os.devnull, "w"
+    ) as devnull, contextlib.redirect_stdout(devnull):
+        db_path = os.path.join(tmp_dir, "bench.db")
+        init_bilibili_db(db_path)
+        http = HttpClient(
+            cookie_path=os.devnull, rate_limiter=RateLimiter(UNTHROTTLED_LIMITS)
+        )
+        connections = get_connection_manager(db_path)
+        commits_before = connections.commit_count
+        commit_seconds_before = connections.commit_seconds
+        _reset_peak_rss()
+        baseline_rss, _ = _rss_mb()
+
+        started = time.perf_counter()
+        if scenario == "video_comments":
+            crawler = BilibiliCommentCrawler(
+                bv=VIDEO_BVID, db_name=db_path, concurrency=concurrency
+            )
+            crawler.api_base = server_url
+            crawler.http = http
+            count = crawler.crawl()
+        elif scenario == "user_comments":
+            crawler = BilibiliUserCommentsCrawler(db_path)
+            crawler.base_url = f"{server_url}/api/v3/search/getreply"
+            crawler.http = http
+            count = crawler.crawl_user_all_comments(USER_UID)
+        else:
+            crawler = BilibiliUserCrawler(db_path)
+            crawler.base_url = f"{server_url}/api/bili/space"
+            crawler.http = http
+            count = crawler.crawl_users_batch(
+                list(range(BATCH_FIRST_UID, BATCH_FIRST_UID + batch_users))
+            )
+        elapsed = time.perf_counter() - started
+        _, peak_rss = _rss_mb()
+
+        requests = sum(stats["count"] for stats in http.get_latency_stats().values())
+        result = {
+            "scenario": scenario,
+            "shape": shape,
+            "items": count,
+            "requests": requests,
+            "seconds": round(elapsed, 4),
+            "items_per_sec": round(count / elapsed, 1) if elapsed else 0.0,
+            "requests_per_sec": round(requests / elapsed, 1) if elapsed else 0.0,
+            "commits": connections.commit_count - commits_before,
+            "commit_seconds": round(
+                connections.commit_seconds - commit_seconds_before, 4
+            ),
+            "baseline_rss_mb": _round(baseline_rss),
+            "peak_rss_mb": _round(peak_rss),
+            "crawl_rss_mb": (
+                _round(peak_rss - baseline_rss)
+                if peak_rss is not None and baseline_rss is not None
+                else None
+            ),
+        }
+        if scenario == "video_comments":
+            result["user_cache_hit_rate"] = round(
+                crawler.write_buffer.user_cache.hit_rate, 4
+            )
+        connections.close_all()
+    return result
+
+
+def _run_isolated(repeat: int, *args) -> dict:
+    """重复运行 repeat 次，取吞吐最高的一次，减少短时间场景的抖动。"""
+    runs = []
+    for _ in range(repeat):
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            runs.append(pool.apply(_run_scenario, args))
+    best = max(runs, key=lambda result: result["items_per_sec"])
+    best["runs"] = repeat
+    return best
+
+
+def run_suite(
+    shapes: List[str],
+    concurrency: int = SUB_REPLY_CONCURRENCY,
+    batch_users: int = 1000,
+    latency_ms: float = 0,
+    repeat: int = 3,
+) -> dict:
+    results = []
+    for shape in shapes:
+        params = SHAPES[shape]
+        video = VideoFixture(
+            VIDEO_OID,
+            VIDEO_BVID,
+            f"压测视频 {shape}",
+            params["roots"],
+            params["replies_per_root"],
+        )
+        user = UserFixture(USER_UID, params["user_comments"], oids=[VIDEO_OID])
+        with StubServer([video], users=[user], latency_ms=latency_ms) as server:
+            for scenario in ("video_comments", "user_comments"):
+                print(f"运行 {scenario} / {shape} ...")
+                results.append(
+                    _run_isolated(
+                        repeat, scenario, shape, server.url, concurrency, batch_users
+                    )
+                )
+
+    users = [
+        UserFixture(uid, 0)
+        for uid in range(BATCH_FIRST_UID, BATCH_FIRST_UID + batch_users)
+    ]
+    with StubServer([], users=users, latency_ms=latency_ms) as server:
+        print("运行 users_batch ...")
+        results.append(
+            _run_isolated(
+                repeat, "users_batch", "batch", server.url, concurrency, batch_users
+            )
+        )
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "concurrency": concurrency,
+        "latency_ms": latency_ms,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    与基线结果对比：吞吐下降或峰值内存上升超过 tolerance 比例的场景视为回退。
+    只比较两次都运行过的场景。
+    """
+    baseline_results = {
+        (result["scenario"], result["shape"]): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in report["results"]:
+        base = baseline_results.get((result["scenario"], result["shape"]))
+        if base is None:
+            continue
+        name = f"{result['scenario']}/{result['shape']}"
+        if result["items_per_sec"] < base["items_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: 吞吐 {result['items_per_sec']}/s，基线 {base['items_per_sec']}/s"
+            )
+        # 内存增量很小时比例波动大，低于 MIN_RSS_DELTA_MB 的增长不算回退
+        rss, base_rss = result.get("crawl_rss_mb"), base.get("crawl_rss_mb")
+        if (
+            rss is not None
+            and base_rss is not None
+            and rss > base_rss * (1 + tolerance)
+            and rss - base_rss >= MIN_RSS_DELTA_MB
+        ):
+            regressions.append(
+                f"{name}: 爬取内存增量 {rss:.1f}MB，基线 {base_rss:.1f}MB"
+            )
+    return regressions
+
+
+def run_benchmarks(
+    shapes: List[str],
+    output: Optional[str],
+    baseline: Optional[str] = None,
+    tolerance: float = 0.2,
+    concurrency: int = SUB_REPLY_CONCURRENCY,
+    batch_users: int = 1000,
+    latency_ms: float = 0,
+    repeat: int = 3,
+) -> int:
+    """运行压测、打印结果并写入 JSON；与基线对比发现回退时返回 1，否则返回 0。"""
+    unknown = [shape for shape in shapes if shape not in SHAPES]
+    if unknown:
+        print(f"未知的数据集形态: {', '.join(unknown)}，可选: {', '.join(SHAPES)}")
+        return 2
+
+    # 先读取基线，便于直接用新结果覆盖同一个文件
+    baseline_report = None
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            baseline_report = json.load(f)
+
+    report = run_suite(shapes, concurrency, batch_users, latency_ms, repeat)
+    for result in report["results"]:
+        rss = (
+            f"+{result['crawl_rss_mb']:.1f}MB"
+            if result["crawl_rss_mb"] is not None
+            else "-"
+        )
+        print(
+            f"{result['scenario']:<15} {result['shape']:<6} {result['items']:>8} 条 "
+            f"{result['seconds']:>8.2f}s {result['items_per_sec']:>10.1f} 条/s "
+            f"{result['requests_per_sec']:>8.1f} 请求/s "
+            f"提交 {result['commits']} 次 {result['commit_seconds']:.2f}s 内存 {rss}"
+        )
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {output}")
+
+    if baseline_report is not None:
+        regressions = find_regressions(report, baseline_report, tolerance)
+        for regression in regressions:
+            print(f"性能回退 {regression}")
+        if regressions:
+            return 1
+        print("与基线相比没有性能回退。")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端爬取压测套件")
+    parser.add_argument("--shapes", default=",".join(DEFAULT_SHAPES))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="上一次的结果文件，用于检测性能回退")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=SUB_REPLY_CONCURRENCY)
+    parser.add_argument("--batch-users", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(
+        run_benchmarks(
+            args.shapes.split(","),
+            args.output,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+            concurrency=args.concurrency,
+            batch_users=args.batch_users,
+            latency_ms=args.latency_ms,
+            repeat=args.repeat,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
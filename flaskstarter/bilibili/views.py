@@ -6,30 +6,27 @@ from flask import (
     url_for,
     send_file,
     request,
+    jsonify,
+    Response,
+    stream_with_context,
 )
 from flask_login import login_required
+import json
 import os
+import queue
 
 from flaskstarter.tools.get_link_and_details import generate_links
 from .forms import BVCrawlerForm, UIDCrawlerForm, ModeSelectForm
 import pandas as pd
 
 
-from ..analyzer.analyze_comment import CommentAnalyzer
-from ..crawler.get_single_video_comment import BilibiliCommentCrawler
-from ..crawler.get_user_all_comment import BilibiliUserCommentsCrawler
-from ..crawler.get_user_information import BilibiliUserCrawler
 from ..database.db_manage import init_bilibili_db
+from ..entity.job import Job, JOB_FAILED, JOB_SUCCEEDED
+from ..jobs.job_queue import job_topic
+from ..jobs.tasks import cleanup_job_outputs, get_job_queue
 from ..tools.config import *
-from ..repository.comment_repository import CommentRepository
-from ..tools.get_csv import (
-    export_comments_by_oid_to_csv,
-    export_comments_by_mid_to_csv_mini,
-)
-from ..repository.bv_repository import BvRepository
-from ..tools import get_user_all_bv
-import requests
-from ..tools.get_link_and_details import get_comment_details
+from ..tools.progress_bus import get_progress_bus
+from ..tools.response_cache import get_user_avatar
 
 bilibili = Blueprint("bilibili", __name__, url_prefix="/bilibili")
 
@@ -37,21 +34,8 @@ bilibili = Blueprint("bilibili", __name__, url_prefix="/bilibili")
 @bilibili.route("/select_mode", methods=["GET", "POST"])
 @login_required
 def select_mode():
-    for filename in os.listdir(IMAGE_DIR):
-        if filename == ORIGIN_FACE_NAME:
-            continue
-        file_path = os.path.join(IMAGE_DIR, filename)
-        if os.path.isfile(file_path):
-            try:
-                os.remove(file_path)
-            except OSError as e:
-                print(f"  错误：无法删除文件 '{filename}': {e}")
-
-    if os.path.isfile(OUTPUT_CSV_PATH):
-        try:
-            os.remove(OUTPUT_CSV_PATH)
-        except OSError as e:
-            print(f"  错误：无法删除文件 '{filename}': {e}")
+    # 只清理早已结束的任务留下的文件，其他任务的导出与分析不受影响
+    cleanup_job_outputs()
 
     form = ModeSelectForm()
     if form.validate_on_submit():
@@ -64,7 +48,6 @@ def select_mode():
 @login_required
 def bv_crawler():
     form = BVCrawlerForm()
-    bv_repo = BvRepository(BILI_DB_PATH)
     if form.validate_on_submit():
         try:
             bv_input = form.bv.data
@@ -73,21 +56,10 @@ def bv_crawler():
             if not bv_list:
                 flash("请输入至少一个BV号", "warning")
                 return render_template("bilibili/bv_crawler.html", form=form)
-            for bv in bv_list:
-                crawler = BilibiliCommentCrawler(bv=bv, is_second=is_second)
-                crawler.crawl()
-            try:
-                video_oids = bv_repo.get_oids_by_bids(bv_list)
-                export_comments_by_oid_to_csv(
-                    output_filepath=OUTPUT_CSV_PATH,
-                    oids=video_oids,
-                    db_name=BILI_DB_PATH,
-                )
-            except Exception as e:
-                print(f"失败: {e}")
-                flash("爬取失败，请检查BV号或稍后再试。", "danger")
-                return render_template("bilibili/bv_crawler.html", form=form)
-            return redirect(url_for("bilibili.upload_file", name="bv"))
+            job_id = get_job_queue().enqueue(
+                "bv_crawl", bv_list=bv_list, is_second=is_second
+            )
+            return redirect(url_for("bilibili.job_status", job_id=job_id))
         except Exception as e:
             flash(f"发生错误: {str(e)}", "danger")
     return render_template("bilibili/bv_crawler.html", form=form)
@@ -96,7 +68,6 @@ def bv_crawler():
 @bilibili.route("/up_crawler", methods=["GET", "POST"])
 @login_required
 def up_crawler():
-    bv_repo = BvRepository(BILI_DB_PATH)
     form = UIDCrawlerForm()
     if form.validate_on_submit():
         try:
@@ -105,24 +76,8 @@ def up_crawler():
             if not uid:
                 flash("请输入UID", "warning")
                 return render_template("bilibili/up_crawler.html", form=form)
-            crawler = get_user_all_bv.GetInfo(uid, headless=True)
-            video_ids = crawler.next_page()
-            print(f"共获取到 {len(video_ids)} 个视频，开始批量爬取评论...")
-            for bv in video_ids:
-                crawler = BilibiliCommentCrawler(bv=bv, is_second=is_second)
-                crawler.crawl()
-            try:
-                video_oids = bv_repo.get_oids_by_bids(video_ids)
-                export_comments_by_oid_to_csv(
-                    output_filepath=OUTPUT_CSV_PATH,
-                    oids=video_oids,
-                    db_name=BILI_DB_PATH,
-                )
-            except Exception as e:
-                print(f"失败: {e}")
-                flash("爬取失败，请检查UID或稍后再试。", "danger")
-                return render_template("bilibili/up_crawler.html", form=form)
-            return redirect(url_for("bilibili.upload_file", name="up"))
+            job_id = get_job_queue().enqueue("up_crawl", uid=uid, is_second=is_second)
+            return redirect(url_for("bilibili.job_status", job_id=job_id))
         except Exception as e:
             flash(f"发生错误: {str(e)}", "danger")
     return render_template("bilibili/up_crawler.html", form=form)
@@ -135,44 +90,117 @@ def uid_crawler():
     if form.validate_on_submit():
         try:
             uid = form.uid.data
-            mids = []
-            mids.append(uid)
             if not uid:
                 flash("请输入UID", "warning")
                 return render_template("bilibili/up_crawler.html", form=form)
-            crawler = BilibiliUserCrawler(db_name=BILI_DB_PATH)
-            for single_mid in mids:
-                crawler.crawl_user_info(single_mid)
-            crawler = BilibiliUserCommentsCrawler(db_name=BILI_DB_PATH)
-            for single_mid in mids:
-                crawler.crawl_user_all_comments(single_mid, delay_seconds=0.5)
-            try:
-                export_comments_by_mid_to_csv_mini(
-                    output_filepath=OUTPUT_CSV_PATH,
-                    mids=mids,
-                    db_name=BILI_DB_PATH,
-                )
-            except Exception as e:
-                print(f"失败: {e}")
-                flash("爬取失败，请检查UID或稍后再试。", "danger")
-                return render_template("bilibili/uid_crawler.html", form=form)
-            return redirect(url_for("bilibili.upload_file", name="uid"))
+            job_id = get_job_queue().enqueue("uid_crawl", uid=uid)
+            return redirect(url_for("bilibili.job_status", job_id=job_id))
         except Exception as e:
             flash(f"发生错误: {str(e)}", "danger")
     return render_template("bilibili/uid_crawler.html", form=form)
 
 
-@bilibili.route("/upload/<name>")
+def _job_result_url(job: Job):
+    """任务成功后跳转的页面"""
+    if job.kind == "analyze":
+        return url_for("bilibili.analysis_result", job_id=job.id)
+    return url_for("bilibili.upload_file", job_id=job.id)
+
+
+def _get_job_csv(job_id: int):
+    """返回爬取任务及其导出的 CSV 路径，任务未成功或文件已不存在时返回 (None, None)"""
+    job = get_job_queue().get_job(job_id)
+    if job is None or job.kind == "analyze" or job.status != JOB_SUCCEEDED:
+        return None, None
+    csv_path = job.result.get("csv_path")
+    if not csv_path or not os.path.exists(csv_path):
+        return None, None
+    return job, csv_path
+
+
+@bilibili.route("/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    """任务进度页面，轮询任务状态，完成后跳转到结果页"""
+    job = get_job_queue().get_job(job_id)
+    if job is None:
+        flash("任务不存在", "danger")
+        return redirect(url_for("bilibili.select_mode"))
+    return render_template("bilibili/job_status.html", job=job)
+
+
+def _job_payload(job: Job) -> dict:
+    data = job.to_dict()
+    if job.status == JOB_SUCCEEDED:
+        data["result_url"] = _job_result_url(job)
+    return data
+
+
+@bilibili.route("/jobs/<int:job_id>/status")
+@login_required
+def job_status_json(job_id):
+    job = get_job_queue().get_job(job_id)
+    if job is None:
+        return jsonify({"error": "任务不存在"}), 404
+    return jsonify(_job_payload(job))
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@bilibili.route("/jobs/<int:job_id>/events")
 @login_required
-def upload_file(name):
+def job_events(job_id):
+    """
+    任务进度事件流 (Server-Sent Events)。
+    job 事件为任务状态，video 事件为各视频的爬取进度；任务结束后发送最终状态并关闭。
+    """
+    job_queue = get_job_queue()
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "任务不存在"}), 404
+
+    def generate():
+        with get_progress_bus().subscribe(job_topic(job_id)) as events:
+            current = job_queue.get_job(job_id)
+            yield _sse("job", _job_payload(current))
+            while not current.is_finished:
+                try:
+                    event = events.get(timeout=JOB_EVENTS_HEARTBEAT)
+                except queue.Empty:
+                    current = job_queue.get_job(job_id)
+                    yield _sse("job", _job_payload(current))
+                    continue
+                if event["type"] != "job":
+                    yield _sse(event["type"], event)
+                    continue
+                if event["status"] in (JOB_SUCCEEDED, JOB_FAILED):
+                    current = job_queue.get_job(job_id)
+                    yield _sse("job", _job_payload(current))
+                else:
+                    yield _sse("job", event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bilibili.route("/upload/<int:job_id>")
+@login_required
+def upload_file(job_id):
     """处理爬取完成后的操作选择页面"""
     try:
-        if not os.path.exists(OUTPUT_CSV_PATH):
+        job, csv_path = _get_job_csv(job_id)
+        if job is None:
             flash("评论文件不存在", "danger")
             return redirect(url_for("bilibili.select_mode"))
 
-        file_size = os.path.getsize(OUTPUT_CSV_PATH) / 1024
-        df = pd.read_csv(OUTPUT_CSV_PATH, encoding="utf-8")
+        name = job.result["name"]
+        file_size = os.path.getsize(csv_path) / 1024
+        df = pd.read_csv(csv_path, encoding="utf-8")
         data_records_count = len(df)
         page = request.args.get("page", 1, type=int)
         per_page = 10
@@ -200,6 +228,7 @@ def upload_file(name):
         return render_template(
             "bilibili/upload_success.html",
             name=name,
+            crawl_job_id=job_id,
             file_info={
                 "size": round(file_size, 2),
                 "line_count": data_records_count,
@@ -215,13 +244,17 @@ def upload_file(name):
         return redirect(url_for("bilibili.select_mode"))
 
 
-@bilibili.route("/download")
+@bilibili.route("/download/<int:job_id>")
 @login_required
-def download_file():
-    """直接下载CSV文件"""
+def download_file(job_id):
+    """直接下载爬取任务导出的CSV文件"""
     try:
+        job, csv_path = _get_job_csv(job_id)
+        if job is None:
+            flash("评论文件不存在", "danger")
+            return redirect(url_for("bilibili.select_mode"))
         return send_file(
-            OUTPUT_CSV_PATH1,
+            os.path.abspath(csv_path),
             as_attachment=True,
             download_name=OUTPUT_CSV_NAME,
             mimetype="text/csv",
@@ -231,97 +264,61 @@ def download_file():
         return redirect(url_for("bilibili.select_mode"))
 
 
-@bilibili.route("/analyze/<name>")
+@bilibili.route("/analyze/<int:job_id>")
 @login_required
-def analyze_file(name):
-    """分析评论数据并展示结果"""
+def analyze_file(job_id):
+    """提交评论分析任务，分析爬取任务 job_id 导出的评论，完成后展示结果"""
     try:
-        if not os.path.exists(OUTPUT_CSV_PATH):
+        job, _ = _get_job_csv(job_id)
+        if job is None:
             flash("评论文件不存在", "danger")
             return redirect(url_for("bilibili.select_mode"))
-        analyzer = CommentAnalyzer(csv_path=OUTPUT_CSV_PATH)
-        if name == "bv" or name == "up":
-            analyzer.run_all_analysis()
-            chart_files = {
-                "ip_distribution": "user_ip_top10_distribution.png",
-                "vip_status": "user_vip_status.png",
-                "comment_comparison": "comment_radar_chart.png",
-                "gender_distribution": "user_gender_distribution.png",
-                "level_distribution": "user_level_distribution.png",
-                "time_trend": "comment_time_trend.png",
-                "hour_distribution": "comment_hour_distribution.png",
-                "sentiment": "comment_sentiment_distribution.png",
-                "wordcloud": "comment_wordcloud.png",
-            }
-            stats = {
-                "total_comments": len(analyzer.df),
-                "unique_users": (
-                    len(analyzer.df_unique_users)
-                    if analyzer.df_unique_users is not None
-                    else 0
-                ),
-                "file_size": os.path.getsize(OUTPUT_CSV_PATH) / 1024,
-            }
-            return render_template(
-                "bilibili/comment_analysis_result.html",
-                name=name,
-                stats=stats,
-                chart_files=chart_files,
-                static_path=STATIC_IMAGE_DIR,
-            )
-        elif name == "uid":
-            analyzer.run_mini_analysis()
-            chart_files = {
-                "time_trend": "comment_time_trend.png",
-                "hour_distribution": "comment_hour_distribution.png",
-                "sentiment": "comment_sentiment_distribution.png",
-                "wordcloud": "comment_wordcloud.png",
-            }
-            user_mid = None
-            if analyzer.df is not None and not analyzer.df.empty:
-                user_mid = (
-                    int(analyzer.df["用户ID"].iloc[0])
-                    if "用户ID" in analyzer.df.columns
-                    else None
-                )
-            user_detail = None
-            if user_mid:
-                comment_repo = CommentRepository(db_name=BILI_DB_PATH)
-                latest_comment = comment_repo.get_latest_comment_by_mid(user_mid)
-                if latest_comment:
-                    user_detail = get_comment_details(
-                        latest_comment["oid"],
-                        latest_comment["type"],
-                        latest_comment["rpid"],
-                    )
-            try:
-                response = requests.get(
-                    user_detail["comment_info"]["face"], stream=True
-                )
-                response.raise_for_status()
-                with open(USER_FACE_PATH, "wb") as file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        file.write(chunk)
-                user_detail["comment_info"]["face"] = USER_FACE_NAME
-            except requests.exceptions.RequestException as e:
-                user_detail["comment_info"]["face"] = ORIGIN_FACE_NAME
-            stats = {
-                "total_comments": len(analyzer.df),
-                "unique_users": (
-                    len(analyzer.df_unique_users)
-                    if analyzer.df_unique_users is not None
-                    else 0
-                ),
-                "file_size": os.path.getsize(OUTPUT_CSV_PATH) / 1024,
-            }
-            return render_template(
-                "bilibili/uid_analysis_result.html",
-                name=name,
-                stats=stats,
-                chart_files=chart_files,
-                static_path=STATIC_IMAGE_DIR,
-                user_detail=user_detail,
-            )
+        analysis_job_id = get_job_queue().enqueue("analyze", crawl_job_id=job_id)
+        return redirect(url_for("bilibili.job_status", job_id=analysis_job_id))
     except Exception as e:
         flash(f"分析失败: {str(e)}", "danger")
-        return redirect(url_for("bilibili.upload_file", name=name))
+        return redirect(url_for("bilibili.upload_file", job_id=job_id))
+
+
+@bilibili.route("/avatar/<int:mid>")
+@login_required
+def user_avatar(mid):
+    """按用户ID返回缓存的头像，没有缓存时跳转到默认头像"""
+    avatar = get_user_avatar(mid)
+    if avatar is None:
+        return redirect(STATIC_IMAGE_DIR + ORIGIN_FACE_NAME)
+    body, content_type = avatar
+    response = Response(body, mimetype=content_type)
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
+@bilibili.route("/analysis/<int:job_id>")
+@login_required
+def analysis_result(job_id):
+    """展示分析任务的结果"""
+    job = get_job_queue().get_job(job_id)
+    if job is None or job.kind != "analyze" or job.status != JOB_SUCCEEDED:
+        flash("分析结果不存在", "danger")
+        return redirect(url_for("bilibili.select_mode"))
+    result = job.result
+    name = result["name"]
+    static_path = f"{STATIC_JOB_IMAGE_DIR}{job.id}/"
+    if name == "uid":
+        return render_template(
+            "bilibili/uid_analysis_result.html",
+            name=name,
+            crawl_job_id=result["crawl_job_id"],
+            stats=result["stats"],
+            chart_files=result["chart_files"],
+            static_path=static_path,
+            user_detail=result.get("user_detail"),
+        )
+    return render_template(
+        "bilibili/comment_analysis_result.html",
+        name=name,
+        crawl_job_id=result["crawl_job_id"],
+        stats=result["stats"],
+        chart_files=result["chart_files"],
+        static_path=static_path,
+    )
@@ -0,0 +1,131 @@
+import time
+from typing import Dict, List, Optional
+
+from ..database.connection import get_connection_manager
+from ..entity.comment import Comment
+from ..entity.user import User
+from ..repository.comment_repository import CommentRepository
+from ..repository.user_repository import UserRepository
+from ..tools.config import BILI_DB_PATH
+from .get_single_video_comment import parse_reply
+from .get_user_all_comment import parse_user_reply
+from .get_user_information import parse_user_card
+from .page_archive import PageArchive, USER_ARCHIVE, VIDEO_ARCHIVE
+
+
+class ArchiveReplayer:
+    """
+    从原始页面存档重建 comment / user 表，不访问网络。
+    解析逻辑与爬虫共用，修正解析代码后重放即可修复已入库的数据；
+    每攒满 batch_rows 行就在一个事务里批量 upsert 一次。
+    """
+
+    def __init__(
+        self,
+        db_name: str = BILI_DB_PATH,
+        archive: Optional[PageArchive] = None,
+        batch_rows: int = 5000,
+    ):
+        self.connections = get_connection_manager(db_name)
+        self.comment_repo = CommentRepository(db_name)
+        self.user_repo = UserRepository(db_name)
+        self.archive = archive or PageArchive()
+        self.batch_rows = batch_rows
+        self._users: Dict[int, User] = {}
+        self._comments: Dict[int, Comment] = {}
+        self._mini_comments: Dict[int, Comment] = {}
+        self.records = 0
+        self.rows = 0
+        self.errors = 0
+
+    def _pending_rows(self) -> int:
+        return len(self._users) + len(self._comments) + len(self._mini_comments)
+
+    def _flush(self):
+        if not self._pending_rows():
+            return
+        with self.connections.transaction():
+            self.rows += self.user_repo.bulk_upsert_users(list(self._users.values()))
+            self.rows += self.comment_repo.bulk_upsert_comments(
+                list(self._comments.values())
+            )
+            self.rows += self.comment_repo.bulk_upsert_comments(
+                list(self._mini_comments.values()), mode="mini"
+            )
+        self._users.clear()
+        self._comments.clear()
+        self._mini_comments.clear()
+
+    def _add_reply(self, oid: int, reply: dict, is_secondary: bool, parent_rpid: int):
+        try:
+            user, comment = parse_reply(reply, oid, is_secondary, parent_rpid)
+        except (KeyError, TypeError, ValueError) as e:
+            self.errors += 1
+            print(f"解析存档评论失败 (oid={oid}, rpid={reply.get('rpid')}): {e}")
+            return
+        self._users[user.mid] = user
+        self._comments[comment.rpid] = comment
+
+    def _replay_video(self, oid: int):
+        for record in self.archive.iter_records(VIDEO_ARCHIVE, oid):
+            self.records += 1
+            is_secondary = record["endpoint"] == "sub"
+            parent_rpid = record.get("root", 0) if is_secondary else 0
+            for reply in (record["data"] or {}).get("replies") or []:
+                self._add_reply(oid, reply, is_secondary, parent_rpid)
+                if not is_secondary:
+                    # 一级评论内嵌的二级评论预览，爬取时直接入库
+                    for preview in reply.get("replies") or []:
+                        self._add_reply(oid, preview, True, reply["rpid"])
+            if self._pending_rows() >= self.batch_rows:
+                self._flush()
+
+    def _replay_user(self, uid: int):
+        for record in self.archive.iter_records(USER_ARCHIVE, uid):
+            self.records += 1
+            data = record["data"] or {}
+            try:
+                if record["endpoint"] == "aicu_space":
+                    user = parse_user_card(data)
+                    if user is not None:
+                        self._users[user.mid] = user
+                else:
+                    for reply in data.get("replies") or []:
+                        comment = parse_user_reply(reply, uid)
+                        self._mini_comments[comment.rpid] = comment
+            except (KeyError, TypeError, ValueError) as e:
+                self.errors += 1
+                print(f"解析存档记录失败 (uid={uid}, endpoint={record['endpoint']}): {e}")
+            if self._pending_rows() >= self.batch_rows:
+                self._flush()
+
+    def replay(
+        self, oids: Optional[List[int]] = None, uids: Optional[List[int]] = None
+    ) -> dict:
+        """
+        重放指定 oid / uid 的存档，两者都不指定时重放全部存档。
+        视频存档先于用户存档重放，与完整评论相比只含基础字段的 aicu 评论只更新基础字段。
+        :return: 统计信息，包括写入行数与每秒写入行数
+        """
+        if oids is None and uids is None:
+            oids = self.archive.list_keys(VIDEO_ARCHIVE)
+            uids = self.archive.list_keys(USER_ARCHIVE)
+
+        self.records = self.rows = self.errors = 0
+        started = time.perf_counter()
+        for oid in oids or []:
+            self._replay_video(oid)
+        for uid in uids or []:
+            self._replay_user(uid)
+        self._flush()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "videos": len(oids or []),
+            "users": len(uids or []),
+            "records": self.records,
+            "rows": self.rows,
+            "errors": self.errors,
+            "seconds": elapsed,
+            "rows_per_sec": self.rows / elapsed if elapsed else 0.0,
+        }
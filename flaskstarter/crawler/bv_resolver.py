@@ -0,0 +1,129 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from ..entity.bv import Bv
+from ..repository.bv_repository import BvRepository
+from ..repository.cache_repository import CacheRepository
+from ..repository.serial_writer import SerialWriter
+from ..tools.config import *
+from ..tools.http_client import get_http_client
+
+# 视频信息接口表示视频不存在或不可见的返回码：-404 不存在，62002 稿件不可见，
+# 62004 稿件审核中，62012 仅 UP 主自己可见；其余错误（风控、鉴权、服务端错误等）不记入否定缓存
+VIDEO_MISSING_CODES = {-404, 62002, 62004, 62012}
+
+
+class BvResolver:
+    """
+    把 BV 号解析为视频信息 (oid、标题、评论数)。
+    先查 bv 表，查不到的再并发请求视频信息接口 (x/web-interface/view)，不下载视频页面；
+    解析到的视频写入 bv 表，接口明确返回视频不存在或不可见时在一段时间内记住这一结果。
+    """
+
+    def __init__(
+        self,
+        db_name: str = BILI_DB_PATH,
+        concurrency: int = BV_RESOLVE_CONCURRENCY,
+        writer: Optional[SerialWriter] = None,
+    ):
+        """
+        :param writer: 与爬虫共用的写线程，设置后写库操作都交给它执行
+        """
+        self.api_base = BILI_API_BASE
+        self.bv_repo = BvRepository(db_name)
+        self.cache = CacheRepository(db_name)
+        self.http = get_http_client()
+        self.concurrency = concurrency
+        self.writer = writer
+        # 最近一次 resolve 中无法解析的 BV 号及原因
+        self.errors: Dict[str, str] = {}
+
+    def _write(self, fn, *args):
+        if self.writer is not None:
+            return self.writer.run(fn, *args)
+        return fn(*args)
+
+    @staticmethod
+    def _missing_key(bv: str) -> str:
+        return f"bv_missing:{bv}"
+
+    def _fetch(self, bv: str) -> Optional[Bv]:
+        """请求一个视频的信息，失败时把原因记到 errors 并返回 None。可在多个线程中同时调用。"""
+        try:
+            data = self.http.get_json(
+                f"{self.api_base}/x/web-interface/view",
+                family="video_view",
+                params={"bvid": bv},
+                timeout=10,
+            )
+        except requests.exceptions.RequestException as e:
+            self.errors[bv] = f"请求视频信息失败: {e}"
+            return None
+        except json.JSONDecodeError as e:
+            self.errors[bv] = f"解析视频信息失败: {e}"
+            return None
+
+        code = data.get("code")
+        if code != 0:
+            message = data.get("message", "未知错误")
+            self.errors[bv] = f"视频信息接口返回错误 ({code}): {message}"
+            if code in VIDEO_MISSING_CODES:
+                self._write(
+                    self.cache.put,
+                    self._missing_key(bv),
+                    message.encode("utf-8"),
+                    "text/plain",
+                    RESPONSE_CACHE_MAX_BYTES,
+                )
+            return None
+
+        info = data.get("data") or {}
+        return Bv(
+            oid=int(info["aid"]),
+            bid=bv,
+            title=info.get("title") or f"视频 {bv}",
+            reply_count=(info.get("stat") or {}).get("reply"),
+        )
+
+    def resolve(self, bv_list: List[str], use_stored: bool = True) -> Dict[str, Bv]:
+        """
+        解析一批 BV 号，返回 {BV号: Bv}，无法解析的 BV 号不在结果中，原因见 errors。
+        :param use_stored: 为 False 时不使用 bv 表中已有的信息，全部重新请求，以取得最新的评论数
+        """
+        self.errors = {}
+        bv_list = list(dict.fromkeys(bv_list))
+        resolved: Dict[str, Bv] = {}
+        if use_stored:
+            for video in self.bv_repo.get_information_by_bids(bv_list):
+                resolved[video.bid] = video
+
+        stored = len(resolved)
+        to_fetch = []
+        for bv in bv_list:
+            if bv in resolved:
+                continue
+            missing = self.cache.get(self._missing_key(bv), max_age=BV_NEGATIVE_CACHE_TTL)
+            if missing is not None:
+                self.errors[bv] = f"视频不存在或不可见: {missing[0].decode('utf-8')}"
+                continue
+            to_fetch.append(bv)
+
+        if to_fetch:
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="bv-resolve"
+            ) as executor:
+                fetched = [
+                    video for video in executor.map(self._fetch, to_fetch) if video
+                ]
+            self._write(self.bv_repo.bulk_upsert_bvs, fetched)
+            for video in fetched:
+                resolved[video.bid] = video
+
+        print(
+            f"解析 {len(bv_list)} 个BV号：{stored} 个来自数据库，"
+            f"请求接口 {len(to_fetch)} 个，{len(self.errors)} 个无法解析。"
+        )
+        return resolved
@@ -0,0 +1,218 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from ..entity.bv import Bv
+from ..repository.bv_repository import BvRepository
+from ..repository.serial_writer import SerialWriter
+from ..tools.config import *
+from .bv_resolver import BvResolver
+from .get_single_video_comment import BilibiliCommentCrawler
+
+
+class VideoCrawlResult:
+    def __init__(self, bv: str):
+        self.bv = bv
+        self.oid: Optional[int] = None
+        self.title: Optional[str] = None
+        self.expected_count: Optional[int] = None
+        self.count = 0
+        self.saved_requests = 0
+        self.user_cache_hit_rate = 0.0
+        self.seconds = 0.0
+        self.finished = False
+        self.skipped = False
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "bv": self.bv,
+            "oid": self.oid,
+            "title": self.title,
+            "expected_count": self.expected_count,
+            "count": self.count,
+            "saved_requests": self.saved_requests,
+            "user_cache_hit_rate": self.user_cache_hit_rate,
+            "seconds": self.seconds,
+            "finished": self.finished,
+            "skipped": self.skipped,
+            "error": self.error,
+        }
+
+
+class CrawlScheduler:
+    """
+    并发爬取多个视频的评论。
+    先批量解析每个视频的信息（oid、标题与评论数，见 BvResolver），再按评论数从多到少依次提交，
+    同时最多爬取 max_workers 个视频，大视频先开始可以缩短整批的总耗时。
+    所有爬虫共用进程内的限速器与同一个写线程，数据库始终只有一个写连接。
+    """
+
+    def __init__(
+        self,
+        is_second: bool = True,
+        db_name: str = BILI_DB_PATH,
+        max_workers: int = CRAWL_VIDEO_WORKERS,
+        concurrency: int = SUB_REPLY_CONCURRENCY,
+        archive: bool = PAGE_ARCHIVE_ENABLED,
+        progress_topic: Optional[str] = None,
+    ):
+        """
+        :param progress_topic: 进度事件总线的主题，每个视频的爬虫都向它发布进度事件
+        """
+        self.is_second = is_second
+        self.db_name = db_name
+        self.max_workers = max_workers
+        self.concurrency = concurrency
+        self.archive = archive
+        self.progress_topic = progress_topic
+        self.bv_repo = BvRepository(db_name)
+        self.total_seconds = 0.0
+
+    def _new_crawler(self, bv: str, writer: SerialWriter) -> BilibiliCommentCrawler:
+        return BilibiliCommentCrawler(
+            bv=bv,
+            is_second=self.is_second,
+            db_name=self.db_name,
+            concurrency=self.concurrency,
+            archive=self.archive,
+            writer=writer,
+            progress_topic=self.progress_topic,
+        )
+
+    def _new_resolver(self, writer: SerialWriter) -> BvResolver:
+        return BvResolver(self.db_name, writer=writer)
+
+    def _prepare(
+        self,
+        crawler: BilibiliCommentCrawler,
+        result: VideoCrawlResult,
+        video: Optional[Bv],
+        error: Optional[str],
+    ):
+        if video is None:
+            result.error = f"获取视频信息失败: {error or '无法解析BV号'}"
+            print(f"{crawler.bv} {result.error}")
+            return
+        # 爬虫拿到 oid 后不再自己获取视频信息
+        crawler.oid = video.oid
+        crawler.title = video.title
+        crawler.expected_count = video.reply_count
+        result.oid = int(crawler.oid)
+        result.title = crawler.title
+        result.expected_count = crawler.expected_count
+
+    def _crawl_one(
+        self,
+        crawler: BilibiliCommentCrawler,
+        result: VideoCrawlResult,
+        fresh: bool,
+        incremental: bool,
+        writer: SerialWriter,
+    ):
+        started = time.perf_counter()
+        try:
+            result.count = crawler.crawl(fresh=fresh, incremental=incremental)
+            result.finished = crawler.finished
+            result.saved_requests = crawler.saved_requests
+            result.user_cache_hit_rate = crawler.write_buffer.user_cache.hit_rate
+            if crawler.finished and result.expected_count is not None:
+                # 记下爬完时的评论数，之后评论数不变时可以跳过该视频
+                writer.run(self.bv_repo.mark_crawled, result.oid, result.expected_count)
+        except Exception as e:
+            result.error = str(e)
+            print(f"爬取视频 {crawler.bv} 失败: {e}")
+        result.seconds = time.perf_counter() - started
+
+    def crawl_all(
+        self,
+        bv_list: List[str],
+        fresh: bool = False,
+        incremental: bool = False,
+        progress: Optional[Callable[[int, int, VideoCrawlResult], None]] = None,
+        known_videos: Optional[Dict[str, Bv]] = None,
+        skip_unchanged: bool = False,
+    ) -> List[VideoCrawlResult]:
+        """
+        爬取一批视频，参数含义同 BilibiliCommentCrawler.crawl。
+        :param progress: 每个视频结束（包括获取信息失败）后调用 progress(已结束数, 视频总数, 该视频结果)
+        :param known_videos: BV号到已知视频信息 (oid、标题、评论数) 的映射，其中的视频不再解析
+        :param skip_unchanged: 跳过评论数与上次爬完时相同的视频，fresh 为 True 时不跳过
+        :return: 与 bv_list 顺序一致的每个视频的爬取结果与耗时
+        """
+        started = time.perf_counter()
+        bv_list = list(dict.fromkeys(bv_list))
+        results = [VideoCrawlResult(bv) for bv in bv_list]
+        done_count = 0
+        done_lock = threading.Lock()
+
+        def video_done(result: VideoCrawlResult):
+            nonlocal done_count
+            with done_lock:
+                done_count += 1
+                done = done_count
+            if progress is not None:
+                progress(done, len(bv_list), result)
+
+        with SerialWriter() as writer, ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="video-crawl"
+        ) as executor:
+            crawlers = [self._new_crawler(bv, writer) for bv in bv_list]
+            known_videos = dict(known_videos or {})
+            errors = {}
+            to_resolve = [bv for bv in bv_list if bv not in known_videos]
+            if to_resolve:
+                resolver = self._new_resolver(writer)
+                # 跳过未变化的视频需要最新的评论数，这时不使用 bv 表中保存的评论数
+                known_videos.update(
+                    resolver.resolve(
+                        to_resolve, use_stored=not (skip_unchanged and not fresh)
+                    )
+                )
+                errors = resolver.errors
+            for crawler, result in zip(crawlers, results):
+                self._prepare(
+                    crawler, result, known_videos.get(result.bv), errors.get(result.bv)
+                )
+            for result in results:
+                if result.error is not None:
+                    video_done(result)
+            if skip_unchanged and not fresh:
+                crawled_counts = self.bv_repo.get_crawled_reply_counts(
+                    [result.oid for result in results if result.error is None]
+                )
+                for result in results:
+                    if (
+                        result.error is None
+                        and result.expected_count is not None
+                        and crawled_counts.get(result.oid) == result.expected_count
+                    ):
+                        result.skipped = True
+                        result.finished = True
+                        print(f"视频 {result.bv} 的评论数 ({result.expected_count}) 与上次爬完时相同，跳过。")
+                        video_done(result)
+
+            # 线程池按提交顺序取任务，评论数未知的视频排在最后
+            pending = [
+                (crawler, result)
+                for crawler, result in zip(crawlers, results)
+                if result.error is None and not result.skipped
+            ]
+            pending.sort(key=lambda item: item[1].expected_count or -1, reverse=True)
+            futures = []
+            for crawler, result in pending:
+                future = executor.submit(
+                    self._crawl_one, crawler, result, fresh, incremental, writer
+                )
+                future.add_done_callback(lambda _, result=result: video_done(result))
+                futures.append(future)
+            for future in futures:
+                future.result()
+
+        self.total_seconds = time.perf_counter() - started
+        total = sum(result.count for result in results)
+        print(
+            f"共爬取 {len(bv_list)} 个视频、{total} 条评论，耗时 {self.total_seconds:.1f} 秒。"
+        )
+        return results
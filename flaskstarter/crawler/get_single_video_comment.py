@@ -5,13 +5,100 @@ from urllib.parse import quote
 import hashlib
 import urllib
 import time
-from ..entity.bv import Bv
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from ..entity.comment import Comment
 from ..entity.user import User
+from ..entity.crawl_checkpoint import CrawlCheckpoint
 from ..repository.comment_repository import CommentRepository
 from ..repository.user_repository import UserRepository
-from ..repository.bv_repository import BvRepository
+from ..repository.checkpoint_repository import CheckpointRepository
+from ..repository.serial_writer import SerialWriter
+from ..repository.write_buffer import WriteBuffer
 from ..tools.config import *
+from ..tools.http_client import get_http_client
+from ..tools.progress_bus import get_progress_bus
+from .bv_resolver import BvResolver
+from .page_archive import PageArchive, VIDEO_ARCHIVE
+
+
+def get_rereply_count(reply: dict) -> int:
+    """
+    取一级评论的回复数：优先解析 "共N条回复"，回复较少时接口不返回该文本，以 rcount 为准。
+    入库的回复数与决定补爬哪些二级评论页都用这一结果。
+    """
+    entry_text = reply.get("reply_control", {}).get("sub_reply_entry_text")
+    if entry_text:
+        match = re.findall(r"\d+", entry_text)
+        return int(match[0]) if match else 0
+    return int(reply.get("rcount") or 0)
+
+
+def parse_reply(
+    raw_comment_data: dict, oid: int, is_secondary: bool = False, parent_rpid: int = 0
+) -> Tuple[User, Comment]:
+    """
+    把接口返回的一条评论解析为 User 与 Comment，不做任何写库操作，
+    爬取与从原始页面存档重放共用这一解析逻辑。
+    """
+    member_info = raw_comment_data["member"]
+    user_mid = member_info["mid"]
+    user_name = member_info["uname"]
+    user_sex = member_info["sex"]
+    user_face = member_info["avatar"]
+    user_sign = member_info.get("sign", None)
+    user_fans = None
+    user_friend = None
+    user_like_num = None
+    user_vip_status = 1 if member_info["vip"]["vipStatus"] == 1 else 0
+
+    user_obj = User(
+        mid=user_mid,
+        name=user_name,
+        sex=user_sex,
+        face=user_face,
+        sign=user_sign,
+        fans=user_fans,
+        friend=user_friend,
+        like_num=user_like_num,
+        vip=user_vip_status,
+    )
+
+    rpid = raw_comment_data["rpid"]
+    comment_parentid = parent_rpid if is_secondary else raw_comment_data.get("parent", 0)
+    comment_rootid = parent_rpid if is_secondary else raw_comment_data.get("root", 0)
+    comment_level = member_info["level_info"]["current_level"]
+    comment_info = raw_comment_data["content"]["message"]
+    comment_time = int(raw_comment_data["ctime"])
+    single_reply_num = get_rereply_count(raw_comment_data)
+
+    single_like_num = raw_comment_data["like"]
+    ip_location = raw_comment_data.get("reply_control", {}).get("location", "")
+    if ip_location.startswith("IP属地："):
+        ip_location = ip_location[5:]
+    type = int(raw_comment_data["type"])
+    comment_obj = Comment(
+        rpid=rpid,
+        parentid=comment_parentid,
+        rootid=comment_rootid,
+        mid=user_mid,
+        name=user_name,
+        level=comment_level,
+        sex=user_sex,
+        information=comment_info,
+        time=comment_time,
+        single_reply_num=single_reply_num,
+        single_like_num=single_like_num,
+        sign=user_sign,
+        ip_location=ip_location,
+        vip=user_vip_status,
+        face=user_face,
+        oid=oid,
+        type=type,
+    )
+    return user_obj, comment_obj
 
 
 class BilibiliCommentCrawler:
@@ -21,155 +108,114 @@ class BilibiliCommentCrawler:
         bv: str = None,
         is_second: bool = True,
         db_name: str = BILI_DB_PATH,
+        concurrency: int = 1,
+        archive: bool = PAGE_ARCHIVE_ENABLED,
+        writer: Optional[SerialWriter] = None,
+        progress_topic: Optional[str] = None,
     ):
+        """
+        :param concurrency: 二级评论请求并发数，大于 1 时使用异步爬取模式
+        :param archive: 是否把接口返回的原始页面追加到页面存档，供离线重放
+        :param writer: 多个爬虫并发时共用的写线程，所有写库操作都交给它执行
+        :param progress_topic: 进度事件总线的主题，有订阅者时发布爬取进度事件
+        """
         self.bv = bv
         self.is_second = is_second
-        self.cookie_path = COOKIE_PATH
+        self.concurrency = concurrency
+        self.api_base = BILI_API_BASE
         self.oid = None
         self.title = None
+        self.expected_count = None
         self.next_pageID = ""
         self.count = 0
+        self.pending_roots = {}
+        self.finished = False
+        self.incremental = False
+        self.high_water_mark = None
+        self.reached_high_water = False
+        # 本次爬取（含从检查点继续之前的部分）见到的最新一级评论 (time, rpid)，爬完后记为高水位
+        self.latest_root = None
+
+        self.progress_topic = progress_topic
+        self.progress_bus = get_progress_bus()
+        self.pages = 0
+        self.sub_backlog = 0
+        # 主评论页内嵌的二级评论预览：直接保存的回复数与因此省下的二级评论请求数
+        self.preview_replies = 0
+        self.saved_requests = 0
+        self._pages_lock = threading.Lock()
+        self._started = time.monotonic()
+        self._start_count = 0
+        self._last_progress = None
 
         self.comment_repo = CommentRepository(db_name)
         self.user_repo = UserRepository(db_name)
-        self.bv_repo = BvRepository(db_name)
-
-    def get_Header(self) -> dict:
-        try:
-            with open(self.cookie_path, "r") as f:
-                cookie = f.read()
-        except FileNotFoundError:
-            print(
-                f"Error: Cookie file not found at {self.cookie_path}. Please check the path and ensure you have a valid Bilibili cookie."
-            )
-            cookie = ""
-
-        header = {
-            "Cookie": cookie,
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0",
-        }
-        return header
-
-    def get_information(self) -> tuple[str, str]:
-        resp = requests.get(
-            f"https://www.bilibili.com/video/{self.bv}/",
-            headers=self.get_Header(),
-            timeout=10,
+        self.checkpoint_repo = CheckpointRepository(db_name)
+        self.bv_resolver = BvResolver(db_name, concurrency=1, writer=writer)
+        self.http = get_http_client()
+        self.archive = PageArchive() if archive else None
+        self.writer = writer
+        self.write_buffer = WriteBuffer(
+            db_name,
+            max_rows=WRITE_BUFFER_MAX_ROWS,
+            max_delay_ms=WRITE_BUFFER_MAX_DELAY_MS,
+            writer=writer,
+            user_cache_size=WRITE_BUFFER_USER_CACHE_SIZE,
         )
-        resp.raise_for_status()
 
-        obj_oid = re.compile(f'"aid":(?P<id>.*?),"bvid":"{re.escape(self.bv)}"')
-        match_oid = obj_oid.search(resp.text)
-        if not match_oid:
-            raise ValueError(
-                f"无法从页面中提取 BV号: {self.bv} 对应的 OID。页面响应可能异常。"
-            )
-        self.oid = match_oid.group("id")
+    def _write(self, fn, *args):
+        """执行一次写库操作，设置了共用写线程时交给写线程执行。"""
+        if self.writer is not None:
+            return self.writer.run(fn, *args)
+        return fn(*args)
 
-        obj_title = re.compile(r'<title data-vue-meta="true">(?P<title>.*?)</title>')
-        match_title = obj_title.search(resp.text)
-        if not match_title:
-            self.title = f"视频 {self.bv}"
-            print(f"Warning: 无法提取视频标题，使用默认值: {self.title}")
-        else:
-            self.title = (
-                match_title.group("title").replace("_哔哩哔哩_bilibili", "").strip()
+    def get_information(self, use_stored: bool = True) -> tuple[int, str]:
+        """
+        获取视频的 oid、标题与评论数：优先使用 bv 表中已有的信息，否则请求视频信息接口。
+        :param use_stored: 为 False 时总是请求接口，以取得最新的评论数
+        """
+        # 测试或压测时会替换爬虫的接口地址与 HTTP 客户端，解析器与爬虫保持一致
+        self.bv_resolver.api_base = self.api_base
+        self.bv_resolver.http = self.http
+        video = self.bv_resolver.resolve([self.bv], use_stored=use_stored).get(self.bv)
+        if video is None:
+            raise ValueError(
+                self.bv_resolver.errors.get(self.bv, f"无法解析 BV号: {self.bv}")
             )
+        self.oid = video.oid
+        self.title = video.title
+        # 视频的评论数，调度多个视频时用来估计爬取量
+        self.expected_count = video.reply_count
 
         print(f"获取视频信息成功：OID={self.oid}, Title='{self.title}'")
-        bv_obj = Bv(
-            oid=self.oid,
-            bid=self.bv,
-            title=self.title,
-        )
-        self.bv_repo.add_or_update_bv(bv_obj)
         return self.oid, self.title
 
     def _parse_and_save_comment(
         self, raw_comment_data: dict, is_secondary: bool = False, parent_rpid: int = 0
     ):
-        member_info = raw_comment_data["member"]
-        user_mid = member_info["mid"]
-        user_name = member_info["uname"]
-        user_sex = member_info["sex"]
-        user_face = member_info["avatar"]
-        user_sign = member_info.get("sign", None)
-        user_fans = None
-        user_friend = None
-        user_like_num = None
-        user_vip_status = 1 if member_info["vip"]["vipStatus"] == 1 else 0
-
-        user_obj = User(
-            mid=user_mid,
-            name=user_name,
-            sex=user_sex,
-            face=user_face,
-            sign=user_sign,
-            fans=user_fans,
-            friend=user_friend,
-            like_num=user_like_num,
-            vip=user_vip_status,
-        )
-
-        self.user_repo.add_or_update_user(user_obj)
-
-        rpid = raw_comment_data["rpid"]
-        comment_parentid = (
-            parent_rpid if is_secondary else raw_comment_data.get("parent", 0)
-        )
-        comment_rootid = (
-            parent_rpid if is_secondary else raw_comment_data.get("root", 0)
-        )
-        comment_level = member_info["level_info"]["current_level"]
-        comment_info = raw_comment_data["content"]["message"]
-        comment_time = int(raw_comment_data["ctime"])
-        rereply_text = raw_comment_data.get("reply_control", {}).get(
-            "sub_reply_entry_text"
+        user_obj, comment_obj = parse_reply(
+            raw_comment_data, int(self.oid), is_secondary, parent_rpid
         )
-        if rereply_text:
-            match = re.findall(r"\d+", rereply_text)
-            single_reply_num = int(match[0]) if match else 0
-        else:
-            single_reply_num = 0
-
-        single_like_num = raw_comment_data["like"]
-        ip_location = raw_comment_data.get("reply_control", {}).get("location", "")
-        if ip_location.startswith("IP属地："):
-            ip_location = ip_location[5:]
-        type = int(raw_comment_data["type"])
-        comment_obj = Comment(
-            rpid=rpid,
-            parentid=comment_parentid,
-            rootid=comment_rootid,
-            mid=user_mid,
-            name=user_name,
-            level=comment_level,
-            sex=user_sex,
-            information=comment_info,
-            time=comment_time,
-            single_reply_num=single_reply_num,
-            single_like_num=single_like_num,
-            sign=user_sign,
-            ip_location=ip_location,
-            vip=user_vip_status,
-            face=user_face,
-            oid=int(self.oid),
-            type=type,
-        )
-        self.comment_repo.add_comment(comment_obj, overwrite=True)
+        self.write_buffer.add_user(user_obj)
+        self.write_buffer.add_comment(comment_obj)
 
-    def start(self) -> bool:
-        mode = 2
+    def _get_main_page(self, next_page_id) -> Optional[dict]:
+        """
+        请求一页一级评论。
+        :param next_page_id: 游标，空字符串表示第一页
+        :return: 接口返回的 data 字段，请求或解析失败时返回 None
+        """
+        mode = 2  # 按时间倒序翻页，增量模式依赖这一顺序
         plat = 1
         type = 1
         web_location = 1315875
 
         wts = int(time.time())
 
-        if self.next_pageID != "":
+        if next_page_id != "":
             pagination_str = (
                 '{"offset":"{\\"type\\":3,\\"direction\\":1,\\"Data\\":{\\"cursor\\":%d}}"}'
-                % self.next_pageID
+                % next_page_id
             )
         else:
             pagination_str = '{"offset":""}'
@@ -182,20 +228,16 @@ class BilibiliCommentCrawler:
         MD5.update(code.encode("utf-8"))
         w_rid = MD5.hexdigest()
 
-        url = f"https://api.bilibili.com/x/v2/reply/wbi/main?oid={self.oid}&type={type}&mode={mode}&pagination_str={urllib.parse.quote(pagination_str, safe=':')}&plat=1&seek_rpid=&web_location=1315875&w_rid={w_rid}&wts={wts}"
+        url = f"{self.api_base}/x/v2/reply/wbi/main?oid={self.oid}&type={type}&mode={mode}&pagination_str={urllib.parse.quote(pagination_str, safe=':')}&plat=1&seek_rpid=&web_location=1315875&w_rid={w_rid}&wts={wts}"
 
         try:
-            response = requests.get(url=url, headers=self.get_Header(), timeout=15)
-            response.raise_for_status()
-            comment_data = json.loads(response.content.decode("utf-8"))
+            comment_data = self.http.get_json(url, family="main_reply", timeout=15)
         except requests.exceptions.RequestException as e:
             print(f"请求评论API失败: {e}")
-            return False
+            return None
         except json.JSONDecodeError as e:
-            print(
-                f"解析评论JSON失败: {e}, 响应内容: {response.content.decode('utf-8', errors='ignore')[:200]}..."
-            )
-            return False
+            print(f"解析评论JSON失败: {e}")
+            return None
 
         if comment_data.get("code") != 0:
             print(f"API返回错误: {comment_data.get('message', '未知错误信息')}")
@@ -203,119 +245,476 @@ class BilibiliCommentCrawler:
                 print(
                     "Hint: WBI签名可能已失效，请检查BilibiliCommentCrawler的WBI签名逻辑或更新Cookie。"
                 )
-            return False
+            return None
 
-        cursor_info = comment_data["data"]["cursor"]
-        if cursor_info["mode"] == 3:
+        if self.archive:
+            self.archive.append(
+                VIDEO_ARCHIVE, self.oid, "main", comment_data["data"], cursor=next_page_id
+            )
+        self._count_page()
+        return comment_data["data"]
+
+    def _get_page_replies(self, page_data: dict) -> Optional[list]:
+        """取出一页中的一级评论，评论已爬取完时返回 None。"""
+        if page_data["cursor"]["mode"] == 3:
+            self.finished = True
             print(f"评论爬取完成！总共爬取{self.count}条。")
-            return False
+            return None
 
-        replies = comment_data["data"].get("replies", [])
+        replies = page_data.get("replies", [])
         if not replies:
+            self.finished = True
             print(f"当前页无评论数据 (可能已爬取完或API返回空).")
-            return False
+            return None
+        return replies
 
-        for reply in replies:
-            self.count += 1
-            if self.count % 1000 == 0:
-                print(f"已爬取 {self.count} 条评论，暂停 {20} 秒以避免反爬。")
-                time.sleep(20)
-
-            self._parse_and_save_comment(reply, is_secondary=False)
+    def _get_sub_page(self, root_rpid: int, page_num: int) -> Optional[list]:
+        """
+        请求某条一级评论下的一页二级评论。
+        :return: 二级评论列表，请求失败或接口报错时返回 None
+        """
+        second_url = f"{self.api_base}/x/v2/reply/reply?oid={self.oid}&type=1&root={root_rpid}&ps=10&pn={page_num}&web_location=333.788"
+        try:
+            second_comment_data = self.http.get_json(
+                second_url, family="sub_reply", timeout=10
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"请求二级评论API失败 (rpid={root_rpid}, page={page_num}): {e}")
+            return None
+        except json.JSONDecodeError as e:
+            print(f"解析二级评论JSON失败 (rpid={root_rpid}, page={page_num}): {e}")
+            return None
 
-            single_reply_num = reply.get("reply_control", {}).get(
-                "sub_reply_entry_text"
+        if second_comment_data.get("code") != 0:
+            print(
+                f"API返回二级评论错误 (rpid={root_rpid}, page={page_num}): {second_comment_data.get('message', '未知错误')}"
             )
-            if single_reply_num:
-                match = re.findall(r"\d+", single_reply_num)
-                rereply_count = int(match[0]) if match else 0
-            else:
-                rereply_count = 0
+            return None
+
+        if self.archive:
+            self.archive.append(
+                VIDEO_ARCHIVE,
+                self.oid,
+                "sub",
+                second_comment_data["data"],
+                root=root_rpid,
+                pn=page_num,
+            )
+        self._count_page()
+        return second_comment_data["data"].get("replies", [])
+
+    def _count_page(self):
+        with self._pages_lock:
+            self.pages += 1
+
+    def _emit_progress(self, force: bool = False, min_interval: float = 0.5):
+        """
+        有订阅者时发布一条进度事件，两次发布至少间隔 min_interval 秒。
+        没有订阅者时直接返回，不构造事件。
+        """
+        if self.progress_topic is None or not self.progress_bus.has_subscribers(
+            self.progress_topic
+        ):
+            return
+        now = time.monotonic()
+        last = self._last_progress
+        if last is None:
+            last = self._last_progress = (self._started, self._start_count, 0.0)
+        elif not force and now - last[0] < min_interval:
+            return
+        last_time, last_count, rate = last
+        if now > last_time:
+            current_rate = (self.count - last_count) / (now - last_time)
+            # 指数平滑，避免翻页间隙让速率跳动
+            rate = current_rate if rate == 0.0 else 0.7 * rate + 0.3 * current_rate
+        self._last_progress = (now, self.count, rate)
+        eta = None
+        if self.expected_count and rate > 0:
+            eta = max(self.expected_count - self.count, 0) / rate
+        self.progress_bus.publish(
+            self.progress_topic,
+            {
+                "type": "video",
+                "bv": self.bv,
+                "oid": int(self.oid) if self.oid is not None else None,
+                "title": self.title,
+                "pages": self.pages,
+                "comments": self.count,
+                "expected": self.expected_count,
+                "sub_backlog": self.sub_backlog,
+                "saved_requests": self.saved_requests,
+                "rate": round(rate, 1),
+                "eta": round(eta) if eta is not None else None,
+                "finished": self.finished,
+            },
+        )
+
+    @staticmethod
+    def _get_sub_page_total(rereply_count: int) -> int:
+        return (rereply_count // 10) + (1 if rereply_count % 10 != 0 else 0)
+
+    def _is_known_root(self, reply: dict) -> bool:
+        return (int(reply["ctime"]), reply["rpid"]) <= self.high_water_mark
+
+    def _get_known_reply_counts(self, replies: list) -> dict:
+        """
+        增量模式下查询本页中已入库的一级评论的回复数，并标记已到达高水位。
+        """
+        if not self.incremental or self.high_water_mark is None:
+            return {}
+        known_rpids = [reply["rpid"] for reply in replies if self._is_known_root(reply)]
+        if not known_rpids:
+            return {}
+        self.reached_high_water = True
+        return self.comment_repo.get_reply_counts(known_rpids)
+
+    def _get_first_sub_page(self, reply: dict, known_reply_counts: dict) -> int:
+        """
+        返回该评论的二级评论需要从第几页开始爬取，0 表示无需爬取。
+        已入库的评论只在回复数增长时补爬新增回复所在的页；
+        内嵌预览已包含的回复不再请求，预览覆盖全部回复时不请求二级评论。
+        """
+        rereply_count = get_rereply_count(reply)
+        if not self.is_second or rereply_count <= 0:
+            return 0
+        if reply["rpid"] not in known_reply_counts:
+            first_page = 1
+        else:
+            stored_count = known_reply_counts[reply["rpid"]]
+            if rereply_count <= stored_count:
+                return 0
+            first_page = stored_count // 10 + 1
+
+        total_pages = self._get_sub_page_total(rereply_count)
+        preview_count = len(reply.get("replies") or [])
+        if rereply_count <= preview_count:
+            self.saved_requests += total_pages - first_page + 1
+            return 0
+        preview_first_page = preview_count // 10 + 1
+        if preview_first_page > first_page:
+            self.saved_requests += preview_first_page - first_page
+            first_page = preview_first_page
+        return first_page
+
+    def _save_preview_replies(self, reply: dict) -> set:
+        """保存一级评论内嵌的二级评论预览，返回已保存的 rpid，翻页时跳过这些回复。"""
+        if not self.is_second:
+            return set()
+        preview = reply.get("replies") or []
+        for second_reply in preview:
+            self._save_reply(second_reply, is_secondary=True, parent_rpid=reply["rpid"])
+        self.preview_replies += len(preview)
+        return {second_reply["rpid"] for second_reply in preview}
+
+    def _save_reply(
+        self, reply: dict, is_secondary: bool = False, parent_rpid: int = 0
+    ):
+        self.count += 1
+        if not is_secondary:
+            root = (int(reply["ctime"]), reply["rpid"])
+            if self.latest_root is None or root > self.latest_root:
+                self.latest_root = root
+        self._parse_and_save_comment(
+            reply, is_secondary=is_secondary, parent_rpid=parent_rpid
+        )
 
-            if self.is_second and rereply_count > 0:
-                total_second_pages = (rereply_count // 10) + (
-                    1 if rereply_count % 10 != 0 else 0
+    def _crawl_sub_pages(
+        self,
+        root_rpid: int,
+        first_page: int,
+        total_pages: int,
+        saved_rpids: set = frozenset(),
+    ):
+        """
+        逐页爬取某条一级评论的第 first_page 到 total_pages 页二级评论。
+        请求失败时把该评论及失败的页码记入 pending_roots，留待下次继续。
+        :param saved_rpids: 已从预览保存的回复，不再重复保存
+        """
+        for page_num in range(first_page, total_pages + 1):
+            self.sub_backlog = total_pages - page_num + 1
+            second_replies = self._get_sub_page(root_rpid, page_num)
+            if second_replies is None:
+                self.pending_roots[root_rpid] = [page_num, total_pages]
+                break
+            if not second_replies:
+                break
+            for second_reply in second_replies:
+                if second_reply["rpid"] in saved_rpids:
+                    continue
+                self._save_reply(
+                    second_reply, is_secondary=True, parent_rpid=root_rpid
                 )
+            self._emit_progress()
+        self.sub_backlog = 0
 
-                for page_num in range(1, total_second_pages + 1):
-                    time.sleep(0.1)
-                    second_url = f"https://api.bilibili.com/x/v2/reply/reply?oid={self.oid}&type=1&root={reply['rpid']}&ps=10&pn={page_num}&web_location=333.788"
-                    try:
-                        second_response = requests.get(
-                            url=second_url, headers=self.get_Header(), timeout=10
-                        )
-                        second_response.raise_for_status()
-                        second_comment_data = json.loads(
-                            second_response.content.decode("utf-8")
-                        )
-                        if second_comment_data.get("code") != 0:
-                            print(
-                                f"API返回二级评论错误 (rpid={reply['rpid']}, page={page_num}): {second_comment_data.get('message', '未知错误')}"
-                            )
-                            break
-
-                        second_replies = second_comment_data["data"].get("replies", [])
-                        if not second_replies:
-                            break
-
-                        for second_reply in second_replies:
-                            self.count += 1
-                            if self.count % 1000 == 0:
-                                print(
-                                    f"已爬取 {self.count} 条评论，暂停 {20} 秒以避免反爬。"
-                                )
-                                time.sleep(20)
-                            self._parse_and_save_comment(
-                                second_reply,
-                                is_secondary=True,
-                                parent_rpid=reply["rpid"],
-                            )
-                    except requests.exceptions.RequestException as e:
-                        print(
-                            f"请求二级评论API失败 (rpid={reply['rpid']}, page={page_num}): {e}"
-                        )
-                        break
-                    except json.JSONDecodeError as e:
-                        print(
-                            f"解析二级评论JSON失败 (rpid={reply['rpid']}, page={page_num}): {e}"
-                        )
-                        break
+    def _restore_checkpoint(self) -> bool:
+        """从检查点恢复爬取进度，没有检查点时返回 False。"""
+        checkpoint = self.checkpoint_repo.get_checkpoint(int(self.oid))
+        if checkpoint is None:
+            return False
+        self.next_pageID = checkpoint.cursor if checkpoint.cursor is not None else ""
+        self.count = checkpoint.count
+        self.pending_roots = checkpoint.pending_roots
+        self.latest_root = checkpoint.latest_root
+        print(
+            f"从检查点继续爬取：已爬取 {self.count} 条，"
+            f"{len(self.pending_roots)} 条评论的回复待补全。"
+        )
+        return True
+
+    def _save_checkpoint(self):
+        """
+        先把缓冲区写入数据库再记录检查点，保证检查点不会超前于已落库的数据。
+        增量爬取中途不记录检查点：中断后下次增量爬取从第一页重新开始，
+        而不是把剩余的旧评论当作完整爬取继续翻完。
+        """
+        if not self.write_buffer.flush():
+            return
+        if self.incremental and self.next_pageID != 0:
+            return
+        self._write(
+            self.checkpoint_repo.save_checkpoint,
+            CrawlCheckpoint(
+                oid=int(self.oid),
+                cursor=self.next_pageID if self.next_pageID != "" else None,
+                pending_roots=self.pending_roots,
+                count=self.count,
+                latest_root=self.latest_root,
+            ),
+        )
+
+    def _resume_pending_roots(self):
+        pending_roots = self.pending_roots
+        self.pending_roots = {}
+        for root_rpid, (next_page, total_pages) in pending_roots.items():
+            self._crawl_sub_pages(root_rpid, next_page, total_pages)
+        self._save_checkpoint()
+
+    def start(self) -> bool:
+        page_data = self._get_main_page(self.next_pageID)
+        if page_data is None:
+            return False
 
-        self.next_pageID = cursor_info["next"]
+        replies = self._get_page_replies(page_data)
+        if replies is None:
+            return False
+
+        known_reply_counts = self._get_known_reply_counts(replies)
+        for reply in replies:
+            self._save_reply(reply)
+            saved_rpids = self._save_preview_replies(reply)
+
+            first_page = self._get_first_sub_page(reply, known_reply_counts)
+            if first_page:
+                self._crawl_sub_pages(
+                    reply["rpid"],
+                    first_page,
+                    self._get_sub_page_total(get_rereply_count(reply)),
+                    saved_rpids,
+                )
 
-        if self.next_pageID == 0:
+        self.next_pageID = page_data["cursor"]["next"]
+
+        if self.next_pageID == 0 or self.reached_high_water:
+            self.finished = True
             print(f"评论爬取完成！总共爬取{self.count}条。")
             return False
         else:
-            time.sleep(0.5)
+            self._save_checkpoint()
+            self._emit_progress()
             print(f"当前爬取{self.count}条，正在准备下一页。")
             return True
 
-    def crawl(self, bv: str = None) -> int:
+    async def _crawl_async(self):
+        """
+        异步爬取模式：一级评论游标继续向后翻页的同时，并发请求当前页各条评论的二级评论。
+        二级评论按页序拼接，遇到失败或空页即截断，写库顺序与同步模式保持一致。
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1) as executor:
+
+            async def fetch_sub_page(root_rpid: int, page_num: int):
+                async with semaphore:
+                    page = await loop.run_in_executor(
+                        executor, self._get_sub_page, root_rpid, page_num
+                    )
+                self.sub_backlog -= 1
+                self._emit_progress()
+                return page
+
+            async def fetch_sub_replies(
+                root_rpid: int, first_page: int, rereply_count: int
+            ) -> list:
+                total_second_pages = self._get_sub_page_total(rereply_count)
+                self.sub_backlog += total_second_pages - first_page + 1
+                pages = await asyncio.gather(
+                    *(
+                        fetch_sub_page(root_rpid, page_num)
+                        for page_num in range(first_page, total_second_pages + 1)
+                    )
+                )
+                second_replies = []
+                for page_num, page in enumerate(pages, start=first_page):
+                    if page is None:
+                        self.pending_roots[root_rpid] = [page_num, total_second_pages]
+                        break
+                    if not page:
+                        break
+                    second_replies.extend(page)
+                return second_replies
+
+            async def no_sub_replies() -> list:
+                return []
+
+            main_task = loop.run_in_executor(
+                executor, self._get_main_page, self.next_pageID
+            )
+            while True:
+                page_data = await main_task
+                if page_data is None:
+                    break
+
+                replies = self._get_page_replies(page_data)
+                if replies is None:
+                    break
+
+                known_reply_counts = self._get_known_reply_counts(replies)
+                next_page_id = page_data["cursor"]["next"]
+                if next_page_id != 0 and not self.reached_high_water:
+                    main_task = loop.run_in_executor(
+                        executor, self._get_main_page, next_page_id
+                    )
+
+                sub_tasks = []
+                for reply in replies:
+                    first_page = self._get_first_sub_page(reply, known_reply_counts)
+                    if first_page:
+                        sub_tasks.append(
+                            fetch_sub_replies(
+                                reply["rpid"],
+                                first_page,
+                                get_rereply_count(reply),
+                            )
+                        )
+                    else:
+                        sub_tasks.append(no_sub_replies())
+                sub_results = await asyncio.gather(*sub_tasks)
+
+                for reply, second_replies in zip(replies, sub_results):
+                    self._save_reply(reply)
+                    saved_rpids = self._save_preview_replies(reply)
+                    for second_reply in second_replies:
+                        if second_reply["rpid"] in saved_rpids:
+                            continue
+                        self._save_reply(
+                            second_reply, is_secondary=True, parent_rpid=reply["rpid"]
+                        )
+
+                self.next_pageID = next_page_id
+                if self.next_pageID == 0 or self.reached_high_water:
+                    self.finished = True
+                    print(f"评论爬取完成！总共爬取{self.count}条。")
+                    break
+                self._save_checkpoint()
+                self._emit_progress()
+                print(f"当前爬取{self.count}条，正在准备下一页。")
+
+    def _save_sync_mark(self):
+        mark = self.checkpoint_repo.get_video_sync_mark(int(self.oid))
+        if self.latest_root is not None and (mark is None or self.latest_root > mark):
+            mark = self.latest_root
+        if mark is not None:
+            self._write(self.checkpoint_repo.save_video_sync_mark, int(self.oid), mark)
+
+    def crawl(
+        self, bv: str = None, fresh: bool = False, incremental: bool = False
+    ) -> int:
         """
-        开始爬取评论并保存到数据库。
+        开始爬取评论并保存到数据库。默认从该视频上次中断时的检查点继续。
         :param bv: 视频的BV号，如果不提供则使用初始化时的BV号
+        :param fresh: 为 True 时丢弃已有检查点，从第一页重新爬取
+        :param incremental: 增量模式，按时间倒序翻页，遇到上次完整爬取时已见到的一级评论
+            （不晚于高水位）所在页后停止，且只为回复数增长的评论补爬新增回复；
+            该视频有未完成的检查点时先从检查点继续完整爬取，本次不做增量爬取
         :return: 爬取的评论总数量
         """
-        if bv:
+        if bv and bv != self.bv:
             self.bv = bv
+            self.oid = None
 
         if not self.bv:
             raise ValueError("请提供视频BV号")
 
         print(f"开始爬取视频 BV号: {self.bv} 的评论。")
 
-        try:
-            self.get_information()
-        except Exception as e:
-            print(f"获取视频信息失败: {e}")
-            return 0
+        # 调度器预先获取过视频信息时不再重复请求视频页面
+        if self.oid is None:
+            try:
+                self.get_information()
+            except Exception as e:
+                print(f"获取视频信息失败: {e}")
+                return 0
 
         self.next_pageID = ""
         self.count = 0
+        self.pending_roots = {}
+        self.finished = False
+        self.latest_root = None
+        if fresh:
+            self._write(self.checkpoint_repo.delete_checkpoint, int(self.oid))
+        elif self._restore_checkpoint() and incremental:
+            # 高水位只在完整爬取结束时记录，未爬完的部分必须先补全
+            print("该视频有未完成的爬取，先从检查点继续完整爬取，本次不做增量爬取。")
+            incremental = False
+        self.incremental = incremental
+        self.reached_high_water = False
+        self.high_water_mark = (
+            self.checkpoint_repo.get_video_sync_mark(int(self.oid)) if incremental else None
+        )
+        self.pages = 0
+        self.sub_backlog = 0
+        self.preview_replies = 0
+        self.saved_requests = 0
+        self._started = time.monotonic()
+        self._start_count = self.count
+        self._last_progress = None
+        self._emit_progress(force=True)
 
-        while True:
-            should_continue = self.start()
-            if not should_continue:
-                break
+        try:
+            if self.pending_roots:
+                self._resume_pending_roots()
+            if self.next_pageID == 0:
+                # 检查点表明一级评论已翻完，只剩二级评论待补全
+                self.finished = True
+            elif self.concurrency > 1:
+                asyncio.run(self._crawl_async())
+            else:
+                while True:
+                    should_continue = self.start()
+                    if not should_continue:
+                        break
+        finally:
+            flushed = self.write_buffer.flush()
+        if flushed and self.finished:
+            # 一级评论已全部翻完（二级评论可能仍待补全），记录高水位
+            self._save_sync_mark()
+            if self.pending_roots:
+                self.next_pageID = 0
+                self._save_checkpoint()
+            else:
+                self._write(self.checkpoint_repo.delete_checkpoint, int(self.oid))
+        self.sub_backlog = 0
+        if self.preview_replies:
+            print(
+                f"从评论预览直接保存 {self.preview_replies} 条回复，"
+                f"省去 {self.saved_requests} 次二级评论请求。"
+            )
+        user_cache = self.write_buffer.user_cache
+        print(
+            f"用户缓存命中率 {user_cache.hit_rate:.1%}，"
+            f"跳过 {user_cache.hits} 次重复的用户写入。"
+        )
+        self._emit_progress(force=True)
         return self.count
@@ -0,0 +1,169 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+import requests
+
+from ..entity.bv import Bv
+from ..repository.bv_repository import BvRepository
+from ..repository.uploader_repository import UploaderRepository
+from ..tools.config import *
+from ..tools.http_client import get_http_client
+from ..tools.wbi import sign_wbi_params
+
+
+def parse_uploader_videos(data: dict) -> List[Tuple[Bv, int]]:
+    """
+    把 UP 主视频列表接口的 data 解析为 (Bv, 发布时间) 列表，Bv 带上视频标题与评论数。
+    """
+    videos = []
+    for item in (data.get("list") or {}).get("vlist") or []:
+        video = Bv(
+            oid=int(item["aid"]),
+            bid=item["bvid"],
+            title=item.get("title"),
+            reply_count=item.get("comment"),
+        )
+        videos.append((video, int(item.get("created") or 0)))
+    return videos
+
+
+class UploaderVideoLister:
+    """
+    通过 UP 主空间的视频列表接口 (x/space/wbi/arc/search) 获取投稿视频，并维护 UP 主的视频索引。
+    完整获取时第一页返回视频总数后，其余页在线程池中并发请求；
+    索引未过期时只按发布时间倒序翻页到已知的视频为止。
+    """
+
+    def __init__(
+        self, db_name: str = BILI_DB_PATH, concurrency: int = UPLOADER_PAGE_CONCURRENCY
+    ):
+        self.api_base = BILI_API_BASE
+        self.bv_repo = BvRepository(db_name)
+        self.uploader_repo = UploaderRepository(db_name)
+        self.http = get_http_client()
+        self.page_size = 50
+        self.concurrency = concurrency
+        # 最近一次获取中评论数来自本次请求的视频 (BV号)，其余视频的评论数是上次获取时的
+        self.refreshed: Set[str] = set()
+
+    def _fetch_page(self, mid: int, pn: int) -> Optional[dict]:
+        """请求第 pn 页视频列表，返回接口的 data 字段，失败时返回 None。"""
+        params = sign_wbi_params(
+            {"mid": mid, "ps": self.page_size, "pn": pn, "order": "pubdate"}
+        )
+        try:
+            data = self.http.get_json(
+                f"{self.api_base}/x/space/wbi/arc/search",
+                family="space_arc",
+                params=params,
+                timeout=15,
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"请求UP主 {mid} 第 {pn} 页视频列表失败: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            print(f"解析UP主 {mid} 第 {pn} 页视频列表失败: {e}")
+            return None
+        if data.get("code") != 0:
+            print(f"UP主 {mid} 第 {pn} 页视频列表返回错误: {data.get('message', '未知错误')}")
+            return None
+        return data.get("data") or {}
+
+    @staticmethod
+    def _video_count(data: dict) -> int:
+        return int((data.get("page") or {}).get("count") or 0)
+
+    def _save(self, mid: int, videos: List[Tuple[Bv, int]], video_count: int, full: bool):
+        # 翻页期间发布了新视频时，相邻两页会出现同一个视频
+        unique = {video.oid: (video, created) for video, created in videos}
+        self.bv_repo.bulk_upsert_bvs(video for video, _ in unique.values())
+        self.uploader_repo.save_videos(
+            mid,
+            [(oid, created) for oid, (_, created) in unique.items()],
+            video_count,
+            full,
+        )
+
+    def list_videos(self, mid: int) -> List[Bv]:
+        """
+        完整获取 UP 主的全部视频（按发布时间倒序），写入 bv 表与视频索引，
+        之后爬取评论时不必再请求视频页面。
+        某一页失败时跳过该页，返回其余页的视频，索引只增不删；第一页失败时返回空列表。
+        """
+        self.refreshed = set()
+        first_page = self._fetch_page(mid, 1)
+        if first_page is None:
+            return []
+
+        videos = parse_uploader_videos(first_page)
+        total = self._video_count(first_page)
+        total_pages = -(-total // self.page_size)
+        print(f"UP主 {mid} 共 {total} 个视频，{max(total_pages, 1)} 页。")
+        complete = True
+        if total_pages > 1:
+            pages = range(2, total_pages + 1)
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="space-arc"
+            ) as executor:
+                for pn, page in zip(
+                    pages, executor.map(lambda pn: self._fetch_page(mid, pn), pages)
+                ):
+                    if page is None:
+                        print(f"UP主 {mid} 第 {pn} 页视频列表获取失败，已跳过。")
+                        complete = False
+                        continue
+                    videos.extend(parse_uploader_videos(page))
+
+        self._save(mid, videos, total, full=complete)
+        result = list({video.bid: video for video, _ in videos}.values())
+        self.refreshed = {video.bid for video in result}
+        print(f"获取到UP主 {mid} 的 {len(result)} 个视频。")
+        return result
+
+    def refresh_videos(
+        self, mid: int, max_age: int = UPLOADER_INDEX_TTL, fresh_counts: bool = False
+    ) -> List[Bv]:
+        """
+        返回 UP 主的全部视频（按发布时间倒序）。索引从未完整获取过或完整获取已超过 max_age 秒时
+        完整获取一次（同时更新所有视频的评论数）；否则从第一页起逐页获取，
+        翻到包含已知视频的页为止，只补上新发布的视频与这些页上视频的评论数。
+        本次取得评论数的视频记在 refreshed 中。
+        :param fresh_counts: 调用方需要所有视频的最新评论数时为 True：增量获取后评论数未更新的视频
+            多于完整获取所需的页数时改为完整获取，否则由调用方逐个请求这些视频的信息
+        """
+        refresh_times = self.uploader_repo.get_refresh_times(mid)
+        if refresh_times is None or refresh_times[1] < int(time.time()) - max_age:
+            return self.list_videos(mid)
+
+        self.refreshed = set()
+        known_oids = self.uploader_repo.get_video_oids(mid)
+        videos: List[Tuple[Bv, int]] = []
+        total = None
+        pn = 1
+        while True:
+            page = self._fetch_page(mid, pn)
+            if page is None:
+                print(f"UP主 {mid} 第 {pn} 页视频列表获取失败，使用已有的视频索引。")
+                break
+            page_videos = parse_uploader_videos(page)
+            videos.extend(page_videos)
+            total = self._video_count(page)
+            if not page_videos or pn * self.page_size >= total:
+                break
+            if any(video.oid in known_oids for video, _ in page_videos):
+                break
+            pn += 1
+
+        if videos:
+            self._save(mid, videos, total, full=False)
+        new_count = sum(1 for video, _ in videos if video.oid not in known_oids)
+        print(f"UP主 {mid} 的视频索引已增量刷新，请求 {pn} 页，新增 {new_count} 个视频。")
+        self.refreshed = {video.bid for video, _ in videos}
+        result = self.uploader_repo.get_videos(mid)
+        stale = sum(1 for video in result if video.bid not in self.refreshed)
+        if fresh_counts and stale > -(-len(result) // self.page_size):
+            print(f"UP主 {mid} 有 {stale} 个视频的评论数未更新，改为完整获取视频列表。")
+            return self.list_videos(mid)
+        return result
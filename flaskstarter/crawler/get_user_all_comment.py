@@ -1,19 +1,61 @@
 import requests
 import json
-import time
-from typing import List, Optional, Dict, Any
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 from ..entity.comment import Comment
+from ..repository.checkpoint_repository import CheckpointRepository
 from ..repository.comment_repository import CommentRepository
 from ..tools.config import *
+from ..tools.http_client import get_http_client
+from .page_archive import PageArchive, USER_ARCHIVE
 
-class BilibiliUserCommentsCrawler:
 
-    def __init__(self, db_name: str = BILI_DB_PATH):
+def parse_user_reply(raw_comment_data: Dict[str, Any], user_id: int) -> Comment:
+    """把 aicu 返回的一条评论解析为只含基础字段的 Comment，爬取与存档重放共用。"""
+    rpid = int(raw_comment_data.get("rpid"))
+    message = raw_comment_data.get("message", "")
+    comment_time = int(raw_comment_data.get("time"))
+
+    parent_data = raw_comment_data.get("parent", {})
+    parentid = int(parent_data.get("parentid", 0)) if parent_data else 0
+    rootid = int(parent_data.get("rootid", 0)) if parent_data else 0
+
+    dyn_data = raw_comment_data.get("dyn", {})
+    oid = int(dyn_data.get("oid", 0))
+    type= int(dyn_data.get("type", 0))
+
+    return Comment(
+        rpid=rpid,
+        parentid=parentid,
+        rootid=rootid,
+        mid=user_id,
+        information=message,
+        time=comment_time,
+        oid=oid,
+        type=type,
+    )
+
 
-        self.base_url = "https://api.aicu.cc/api/v3/search/getreply"
+class BilibiliUserCommentsCrawler:
+
+    def __init__(
+        self,
+        db_name: str = BILI_DB_PATH,
+        archive: bool = PAGE_ARCHIVE_ENABLED,
+        concurrency: int = AICU_PAGE_CONCURRENCY,
+    ):
+        """
+        :param concurrency: 第一页得到评论总数后，同时请求的后续页数
+        """
+        self.base_url = f"{AICU_API_BASE}/api/v3/search/getreply"
         self.comment_repo = CommentRepository(db_name)
+        self.checkpoint_repo = CheckpointRepository(db_name)
         self.crawled_comment_count = 0
         self.page_size = 500
+        self.concurrency = concurrency
+        self.http = get_http_client()
+        self.archive = PageArchive() if archive else None
 
     def _get_comments_page_from_api(
         self, uid: str, pn: int
@@ -26,16 +68,19 @@ class BilibiliUserCommentsCrawler:
             "keyword": "",
         }
         try:
-            response = requests.get(self.base_url, params=params, timeout=15)
-            response.raise_for_status() 
-            data = response.json()
+            data = self.http.get_json(
+                self.base_url,
+                family="aicu_search",
+                params=params,
+                timeout=15,
+                with_cookie=False,
+            )
 
             if data.get("code") != 0:
                 print(
                     f"API返回错误 for uid {uid}, page {pn}: {data.get('message', '未知错误')}"
                 )
                 return None
-
             return data.get("data")
 
         except requests.exceptions.RequestException as e:
@@ -43,73 +88,122 @@ class BilibiliUserCommentsCrawler:
             return None
         except json.JSONDecodeError as e:
             print(
-                f"解析用户评论JSON失败 for uid {uid}, page {pn}: {e}, 响应内容: {response.text[:200]}..."
+                f"解析用户评论JSON失败 for uid {uid}, page {pn}: {e}"
             )
             return None
 
-    def _parse_and_save_comment(self, raw_comment_data: Dict[str, Any], user_id: int):
-        try:
-            rpid = int(raw_comment_data.get("rpid"))
-            message = raw_comment_data.get("message", "")
-            comment_time = int(raw_comment_data.get("time"))
-
-            parent_data = raw_comment_data.get("parent", {})
-            parentid = int(parent_data.get("parentid", 0)) if parent_data else 0
-            rootid = int(parent_data.get("rootid", 0)) if parent_data else 0
-
-            dyn_data = raw_comment_data.get("dyn", {})
-            oid = int(dyn_data.get("oid", 0))
-            type= int(dyn_data.get("type", 0))
-
-            comment_obj = Comment(
-                rpid=rpid,
-                parentid=parentid,
-                rootid=rootid,
-                mid=user_id,
-                information=message,
-                time=comment_time,
-                oid=oid,
-                type=type,
-            )
-            self.comment_repo.add_mini_comment(comment_obj, overwrite=True)
-
-            self.crawled_comment_count += 1
-        except Exception as e:
-            print(f"处理或存储评论数据失败 (rpid: {raw_comment_data.get('rpid')}): {e}")
-
-    def crawl_user_all_comments(self, uid: int, delay_seconds: float = 0.5) -> int:
+    def _fetch_page(
+        self, uid: int, pn: int
+    ) -> Optional[Tuple[Dict[str, Any], List[Comment]]]:
+        """请求并解析一页评论，在线程池中执行；返回 (原始 data, 解析出的评论)，请求失败时返回 None。"""
+        data = self._get_comments_page_from_api(uid, pn)
+        if not data:
+            return None
+        comments = []
+        for reply in data.get("replies") or []:
+            try:
+                comments.append(parse_user_reply(reply, uid))
+            except Exception as e:
+                print(f"处理评论数据失败 (rpid: {reply.get('rpid')}): {e}")
+        return data, comments
+
+    def _save_page(self, uid: int, pn: int, data: Dict[str, Any], comments: List[Comment]):
+        if self.archive:
+            self.archive.append(USER_ARCHIVE, uid, "aicu_reply", data, pn=pn)
+        written = self.comment_repo.bulk_upsert_comments(comments, mode="mini")
+        if written != len(comments):
+            print(f"用户 {uid} 第 {pn} 页评论只写入了 {written}/{len(comments)} 条。")
+        self.crawled_comment_count += written
+
+    def crawl_user_all_comments(self, uid: int, incremental: bool = False) -> int:
+        """
+        爬取用户的全部评论。第一页返回评论总数后，后续页在线程池中并发请求与解析，
+        再按页码顺序逐页批量写入：同一条评论出现在多页时以后面的页为准，
+        某一页失败时停止，之后的页不再写入，与逐页爬取的结果一致。
+        :param incremental: 增量模式，评论按时间倒序，逐页翻到上次完整同步时最新的评论
+            (time, rpid) 所在页为止；从未完整同步过的用户仍爬取全部评论
+        :return: 本次写入的评论数
+        """
         if not uid:
             print("请提供用户ID。")
             return 0
 
         self.crawled_comment_count = 0
-        current_page = 1
-        is_end = False
-
-        while not is_end:
-            print(f"正在爬取用户 {uid} 的第 {current_page} 页评论...")
-            data = self._get_comments_page_from_api(uid, current_page)
-
-            if not data:
-                print(f"获取用户 {uid} 第 {current_page} 页评论失败，停止爬取。")
-                break
-
-            replies = data.get("replies", [])
-            if not replies:
-                is_end = True
-                break
-
-            for reply in replies:
-                self._parse_and_save_comment(reply, uid)
-
-            cursor_info = data.get("cursor", {})
-            is_end = cursor_info.get("is_end", True)
+        sync_mark = self.checkpoint_repo.get_user_sync_mark(int(uid))
+        stop_mark = sync_mark if incremental else None
+        newest_mark = None
+        completed = False
+        print(f"正在爬取用户 {uid} 的第 1 页评论...")
+        first_page = self._fetch_page(uid, 1)
+        if first_page is None:
+            print(f"获取用户 {uid} 第 1 页评论失败，停止爬取。")
+            return 0
 
-            if not is_end:
-                time.sleep(delay_seconds)
-                current_page += 1
-            else:
-                print(f"用户 {uid} 的评论已全部爬取。")
+        data, comments = first_page
+        cursor_info = data.get("cursor", {})
+        total_pages = 1
+        if stop_mark is not None:
+            # 增量模式通常一两页就能到达上次同步的位置，逐页请求，不预取
+            print(f"用户 {uid} 增量同步，翻到 {stop_mark} 为止...")
+        elif comments and not cursor_info.get("is_end", True):
+            all_count = int(cursor_info.get("all_count") or 0)
+            total_pages = max(2, -(-all_count // self.page_size))
+            print(f"用户 {uid} 共 {all_count} 条评论，{total_pages} 页，开始并发爬取...")
+
+        pending = deque([(1, first_page)])
+        next_page = 2
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="aicu-page"
+        ) as executor:
+            while pending or next_page <= total_pages:
+                # 最多同时有 concurrency * 2 页在请求或等待写入，内存占用有上限
+                while next_page <= total_pages and len(pending) < self.concurrency * 2:
+                    pending.append(
+                        (next_page, executor.submit(self._fetch_page, uid, next_page))
+                    )
+                    next_page += 1
+
+                pn, page = pending.popleft()
+                if isinstance(page, Future):
+                    page = page.result()
+                if page is None:
+                    print(f"获取用户 {uid} 第 {pn} 页评论失败，停止爬取。")
+                    break
+
+                data, comments = page
+                if not data.get("replies"):
+                    completed = True
+                    break
+                self._save_page(uid, pn, data, comments)
+                if comments:
+                    page_newest = max((c.time, c.rpid) for c in comments)
+                    newest_mark = max(newest_mark or page_newest, page_newest)
+
+                if stop_mark is not None and any(
+                    (c.time, c.rpid) <= stop_mark for c in comments
+                ):
+                    completed = True
+                    print(f"用户 {uid} 已同步到上次的位置，共请求 {pn} 页。")
+                    break
+
+                is_end = data.get("cursor", {}).get("is_end", True)
+                if is_end:
+                    completed = True
+                    print(f"用户 {uid} 的评论已全部爬取。")
+                    break
+                if pn == total_pages:
+                    # 爬取期间用户发了新评论，总页数比第一页报告的多
+                    total_pages += 1
+
+            for _, page in pending:
+                if isinstance(page, Future):
+                    page.cancel()
+
+        # 只有完整翻完（或增量到达上次位置）才推进同步位置，失败中断时下次仍从头补齐
+        if completed and newest_mark is not None:
+            if sync_mark is not None:
+                newest_mark = max(newest_mark, sync_mark)
+            self.checkpoint_repo.save_user_sync_mark(int(uid), newest_mark)
 
         print(
             f"用户 {uid} 的评论爬取完成。总计爬取 {self.crawled_comment_count} 条评论。"
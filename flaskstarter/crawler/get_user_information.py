@@ -1,29 +1,61 @@
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from ..entity.user import User
 from ..repository.user_repository import UserRepository
 from ..tools.config import *
+from ..tools.http_client import get_http_client
+from .page_archive import PageArchive, USER_ARCHIVE
+
+
+def parse_user_card(raw_data: dict) -> Optional[User]:
+    """把 aicu 用户空间接口的 data 解析为 User，缺少 card 时返回 None，爬取与存档重放共用。"""
+    card_data = raw_data.get("card", {})
+    if not card_data:
+        return None
+    return User(
+        mid=int(card_data.get("mid")),
+        face=card_data.get("face"),
+        fans=card_data.get("fans"),
+        friend=card_data.get("friend"),
+        name=card_data.get("name"),
+        sex=card_data.get("sex"),
+        sign=card_data.get("sign"),
+        like_num=raw_data.get("like_num"),
+        vip=1 if card_data.get("vip", {}).get("vipStatus") == 1 else 0,
+    )
+
 
 class BilibiliUserCrawler:
 
-    def __init__(self, db_name: str = BILI_DB_PATH):
-        self.base_url = "https://worker.aicu.cc/api/bili/space"
+    def __init__(
+        self,
+        db_name: str = BILI_DB_PATH,
+        archive: bool = PAGE_ARCHIVE_ENABLED,
+        workers: int = USER_ENRICH_WORKERS,
+    ):
+        self.base_url = f"{AICU_WORKER_BASE}/api/bili/space"
         self.user_repo = UserRepository(db_name)
         self.crawled_count = 0
+        self.workers = workers
+        self.http = get_http_client()
+        self.archive = PageArchive() if archive else None
 
     def _get_user_data_from_api(self, mid: str) -> Optional[dict]:
         url = f"{self.base_url}?mid={mid}"
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self.http.get_json(
+                url, family="aicu_space", timeout=10, with_cookie=False
+            )
 
             if data.get("code") != 0:
                 print(f"API返回错误 for mid {mid}: {data.get('message', '未知错误')}")
                 return None
 
+            if self.archive:
+                self.archive.append(USER_ARCHIVE, mid, "aicu_space", data.get("data"))
             return data.get("data")
 
         except requests.exceptions.RequestException as e:
@@ -31,60 +63,85 @@ class BilibiliUserCrawler:
             return None
         except json.JSONDecodeError as e:
             print(
-                f"解析用户JSON失败 for mid {mid}: {e}, 响应内容: {response.text[:200]}..."
+                f"解析用户JSON失败 for mid {mid}: {e}"
             )
             return None
 
-    def crawl_user_info(self, mid: str) -> Optional[User]:
+    def _fetch_user(self, mid: str) -> Optional[User]:
+        """请求并解析一个用户的资料，不写库；失败时返回 None。可在多个线程中同时调用。"""
         raw_data = self._get_user_data_from_api(mid)
         if not raw_data:
             return None
 
-        card_data = raw_data.get("card", {})
-        like_num = raw_data.get("like_num")
-
-        if not card_data:
+        try:
+            user_obj = parse_user_card(raw_data)
+        except Exception as e:
+            print(f"解析用户 {mid} 数据失败: {e}")
+            return None
+        if user_obj is None:
             print(f"Warning: No 'card' data found for mid {mid}.")
             return None
+        user_obj.fetched_at = int(time.time())
+        return user_obj
 
-        try:
-            user_obj = User(
-                mid=int(card_data.get("mid")),
-                face=card_data.get("face"),
-                fans=card_data.get("fans"),
-                friend=card_data.get("friend"),
-                name=card_data.get("name"),
-                sex=card_data.get("sex"),
-                sign=card_data.get("sign"),
-                like_num=like_num,
-                vip=1 if card_data.get("vip", {}).get("vipStatus") == 1 else 0,
-            )
-            print(f"成功获得用户信息: {user_obj.name} (mid: {user_obj.mid})")
-            self.user_repo.add_or_update_user(user_obj)
-            self.crawled_count += 1
-
-            return user_obj
-        except Exception as e:
-            print(f"处理或存储用户 {mid} 数据失败: {e}")
+    def crawl_user_info(self, mid: str) -> Optional[User]:
+        user_obj = self._fetch_user(mid)
+        if user_obj is None:
             return None
 
-    def crawl_users_batch(self, mids: List[str], delay_seconds: float = 0.5) -> int:
+        print(f"成功获得用户信息: {user_obj.name} (mid: {user_obj.mid})")
+        if not self.user_repo.add_or_update_user(user_obj):
+            return None
+        self.crawled_count += 1
+        return user_obj
+
+    def crawl_users_batch(self, mids: List[str]) -> int:
+        """
+        在线程池中并发请求多个用户的资料，每攒满 USER_ENRICH_BATCH_ROWS 个用户批量写库一次。
+        请求速率由共享的 aicu_space 限速控制，workers 只决定同时等待响应的请求数。
+        返回成功写入的用户数。
+        """
         if not mids:
             print("没有提供用户ID列表。")
             return 0
 
         print(f"开始批量爬取 {len(mids)} 个用户的信息...")
         successful_crawls = 0
-        for i, mid in enumerate(mids):
-            user = self.crawl_user_info(mid)
-            if user:
-                successful_crawls += 1
-
-            if i < len(mids) - 1:
-                time.sleep(delay_seconds)
-
-            if (i + 1) % 10 == 0:
-                print(f"已处理 {i + 1}/{len(mids)} 个用户。成功: {successful_crawls}")
-
+        processed = 0
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="aicu-space"
+        ) as executor:
+            for start in range(0, len(mids), USER_ENRICH_BATCH_ROWS):
+                chunk = mids[start : start + USER_ENRICH_BATCH_ROWS]
+                users = [user for user in executor.map(self._fetch_user, chunk) if user]
+                written = self.user_repo.bulk_upsert_users(users)
+                successful_crawls += written
+                processed += len(chunk)
+                print(f"已处理 {processed}/{len(mids)} 个用户。成功: {successful_crawls}")
+                if written != len(users):
+                    print("写入用户资料失败，停止批量爬取。")
+                    break
+
+        self.crawled_count += successful_crawls
         print(f"批量爬取完成。总计成功爬取 {successful_crawls} 个用户。")
         return successful_crawls
+
+    def enrich_users(
+        self,
+        ttl: int = USER_ENRICH_TTL,
+        oids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+    ) -> int:
+        """
+        补全评论者的粉丝数/关注数/获赞数：只请求资料从未获取过或获取时间超过 ttl 秒的用户。
+        :param oids: 只补全这些视频下的评论者，为空时补全所有评论者
+        :param limit: 本次最多补全的用户数
+        :return: 成功补全的用户数
+        """
+        mids = self.user_repo.get_mids_to_enrich(
+            int(time.time()) - ttl, oids=oids, limit=limit
+        )
+        if not mids:
+            print("所有评论者的资料都在有效期内，无需补全。")
+            return 0
+        return self.crawl_users_batch(mids)
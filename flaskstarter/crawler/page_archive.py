@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Iterator, List
+
+from ..tools.config import PAGE_ARCHIVE_DIR
+
+# 存档类别：video 按视频 oid 分段，user 按用户 uid 分段
+VIDEO_ARCHIVE = "video"
+USER_ARCHIVE = "user"
+
+
+class PageArchive:
+    """
+    接口原始页面存档。每个 oid / uid 对应一个只追加的 gzip 分段文件
+    {root}/{kind}/{key}.jsonl.gz，每页数据作为一条 JSON 记录追加为一个新的 gzip 成员，
+    已写入的内容不会被改写；进程中途退出最多损坏最后一条记录，读取时会跳过。
+
+    记录格式: {"endpoint": 接口名, "fetched_at": 时间戳, "data": 接口返回的 data, ...其他参数}
+    """
+
+    def __init__(self, root: str = PAGE_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _segment_path(self, kind: str, key) -> str:
+        return os.path.join(self.root, kind, f"{key}.jsonl.gz")
+
+    def append(self, kind: str, key, endpoint: str, data, **params):
+        record = {"endpoint": endpoint, "fetched_at": int(time.time()), **params}
+        record["data"] = data
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        path = self._segment_path(kind, key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(path, "ab") as f:
+                f.write(line.encode("utf-8"))
+
+    def iter_records(self, kind: str, key) -> Iterator[dict]:
+        path = self._segment_path(kind, key)
+        if not os.path.exists(path):
+            return
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, OSError, zlib.error, json.JSONDecodeError) as e:
+                print(f"存档分段 {path} 末尾记录不完整，已跳过: {e}")
+
+    def list_keys(self, kind: str) -> List[int]:
+        directory = os.path.join(self.root, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            int(name[: -len(".jsonl.gz")])
+            for name in os.listdir(directory)
+            if name.endswith(".jsonl.gz")
+        )
@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Dict
+
+from ..tools.config import RATE_LIMITS
+
+# B 站风控返回的状态：HTTP 412，或 JSON code 为 -352 / -412
+THROTTLED_STATUS_CODES = {412}
+THROTTLED_API_CODES = {-352, -412}
+
+
+def is_throttled(status_code: int = None, api_code: int = None) -> bool:
+    return status_code in THROTTLED_STATUS_CODES or api_code in THROTTLED_API_CODES
+
+
+class TokenBucket:
+    """
+    自适应令牌桶：被风控时速率减半并清空令牌，
+    连续成功 success_window 次后速率增加 increase_step，直到 max_rate。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int = 1,
+        success_window: int = 20,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.success_window = success_window
+        self.increase_step = max(rate * 0.1, min_rate)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self):
+        """取一个令牌，没有可用令牌时阻塞等待。"""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def report_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.success_window:
+                self._successes = 0
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def report_throttled(self):
+        with self._lock:
+            self._successes = 0
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._updated_at = time.monotonic()
+
+
+class RateLimiter:
+    """
+    进程内所有爬虫共享的限速器，每个接口族一个令牌桶：
+    main_reply (一级评论)、sub_reply (二级评论)、aicu_search (aicu 评论搜索)、aicu_space (aicu 用户信息)。
+    """
+
+    def __init__(self, limits: Dict[str, dict] = RATE_LIMITS):
+        self.buckets = {family: TokenBucket(**config) for family, config in limits.items()}
+
+    def acquire(self, family: str):
+        self.buckets[family].acquire()
+
+    def report_success(self, family: str):
+        self.buckets[family].report_success()
+
+    def report_throttled(self, family: str):
+        bucket = self.buckets[family]
+        bucket.report_throttled()
+        print(f"接口 {family} 触发风控，速率降至 {bucket.rate:.2f} 次/秒。")
+
+    def report(self, family: str, status_code: int = None, api_code: int = None):
+        """根据 HTTP 状态码或接口 code 判断是否被风控并调整速率。"""
+        if is_throttled(status_code, api_code):
+            self.report_throttled(family)
+        else:
+            self.report_success(family)
+
+    def get_rates(self) -> Dict[str, float]:
+        return {family: bucket.rate for family, bucket in self.buckets.items()}
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,182 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple, Union
+
+from ..tools.config import BILI_DB_STORAGE_PROFILE
+
+# 存储调优预设，新建连接时逐条执行 PRAGMA。
+# journal_mode=WAL 写入数据库文件后持久生效，读写可以并发而互不阻塞；
+# 其余参数只对当前连接生效。cache_size 为负数时单位是 KiB。
+STORAGE_PROFILES: Dict[str, Dict[str, Union[str, int]]] = {
+    # SQLite 默认的回滚日志模式，每次提交完整 fsync
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    # 爬取与网页导出同时进行时的折中配置
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16384,
+        "mmap_size": 67108864,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # 大批量爬取入库：不等待 fsync，断电时可能丢失最近的提交（可重新爬取），但不会损坏数据库
+    "bulk-ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+    # 以导出、分析等读操作为主
+    "read-mostly": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 536870912,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+
+def apply_storage_profile(conn: sqlite3.Connection, profile: str):
+    for pragma, value in STORAGE_PROFILES[profile].items():
+        try:
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        except sqlite3.Error as e:
+            # 例如其他连接正持有锁时无法切换 journal_mode，沿用当前设置
+            print(f"设置 PRAGMA {pragma} = {value} 失败: {e}")
+
+
+class ConnectionManager:
+    """
+    同一个数据库文件的连接管理器：每个线程持有一条长连接，跨调用复用，
+    避免每次读写都重新建立连接、重新预热页缓存。
+
+    连接以 autocommit 模式打开，写操作统一通过 transaction() 显式开启事务；
+    嵌套调用 transaction() 时内层使用 SAVEPOINT，只有最外层负责提交。
+    """
+
+    def __init__(self, db_name: str, storage_profile: str = BILI_DB_STORAGE_PROFILE):
+        if storage_profile not in STORAGE_PROFILES:
+            raise ValueError(f"未知的存储配置: {storage_profile}")
+        self.db_name = db_name
+        self.storage_profile = storage_profile
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        # 最外层事务 COMMIT 的次数与耗时，供压测统计
+        self.commit_count = 0
+        self.commit_seconds = 0.0
+
+    def get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_name, isolation_level=None, check_same_thread=False
+            )
+            apply_storage_profile(conn, self.storage_profile)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._close_dead_thread_connections()
+                self._connections[threading.get_ident()] = (
+                    threading.current_thread(),
+                    conn,
+                )
+        return conn
+
+    def _close_dead_thread_connections(self):
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        开启一个写事务，正常退出时提交，抛出异常时回滚并继续抛出。
+        """
+        conn = self.get_connection()
+        depth = self._local.depth
+        savepoint = f"sp_{depth}"
+        conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if depth == 0:
+                started = time.perf_counter()
+                conn.execute("COMMIT")
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.commit_count += 1
+                    self.commit_seconds += elapsed
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        finally:
+            self._local.depth = depth
+
+    def set_storage_profile(self, storage_profile: str):
+        """切换存储配置，已有连接会被关闭，之后新建的连接使用新配置。"""
+        if storage_profile not in STORAGE_PROFILES:
+            raise ValueError(f"未知的存储配置: {storage_profile}")
+        self.storage_profile = storage_profile
+        self.close_all()
+
+    def close_thread_connection(self):
+        """关闭当前线程的连接，下次使用时会重新建立。"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        conn.close()
+        self._local.conn = None
+
+    def close_all(self):
+        with self._lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_name: str) -> ConnectionManager:
+    """按数据库路径取得共享的连接管理器，同一文件的所有仓库共用一个。"""
+    key = os.path.abspath(db_name)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_name)
+            _managers[key] = manager
+        return manager
+
+
+def close_all_connections():
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close_all()
+
+
+atexit.register(close_all_connections)
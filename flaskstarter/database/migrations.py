@@ -0,0 +1,250 @@
+import sqlite3
+import time
+from typing import List, Tuple
+
+from .connection import get_connection_manager
+
+# (版本号, 说明, SQL 语句列表)，按版本号递增追加，已发布的迁移不要再修改
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "创建 user/comment/bv 表",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user (
+                mid INTEGER PRIMARY KEY,  -- 用户ID，唯一标识，主键
+                face TEXT,                -- 用户头像URL
+                fans INTEGER,             -- 粉丝数
+                friend INTEGER,           -- 关注数
+                name TEXT,                -- 用户昵称
+                sex TEXT,                 -- 性别
+                sign TEXT,                -- 个性签名
+                like_num INTEGER,         -- 获赞数
+                vip INTEGER               -- VIP状态 (0: 非VIP, 1: VIP)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS comment (
+                rpid INTEGER PRIMARY KEY,           -- 评论ID，唯一标识，主键
+                parentid INTEGER,                   -- 父评论ID
+                rootid INTEGER,                     -- root评论ID
+                mid INTEGER,                        -- 发布评论的用户ID
+                name TEXT,                          -- 发布评论的用户昵称
+                level INTEGER,                      -- 用户等级
+                sex TEXT,                           -- 用户性别
+                information TEXT,                   -- 评论内容
+                time INTEGER,                       -- 评论发布时间戳
+                single_reply_num INTEGER,           -- 单条评论的回复数
+                single_like_num INTEGER,            -- 单条评论的点赞数
+                sign TEXT,                          -- 评论者个性签名 (可能与user表重复，但为了评论快照完整性保留)
+                ip_location TEXT,                   -- IP归属地
+                vip INTEGER,                        -- 评论者VIP状态 (0: 非VIP, 1: VIP)
+                face TEXT,                          -- 评论者头像URL (可能与user表重复，但为了评论快照完整性保留)
+                oid INTEGER,                        -- 视频或内容的ID (AV号或BV号对应的整数ID)
+                type INTEGER
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS bv (
+                oid INTEGER PRIMARY KEY,  -- 视频ID，唯一标识，主键
+                bid TEXT,                  -- BV号
+                title TEXT                -- 视频标题
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "为评论流式导出、最新评论查询和 BV 号查询添加索引",
+        [
+            # get_comments_by_oid_stream: WHERE oid IN (...) AND type = 1 ORDER BY time
+            "CREATE INDEX IF NOT EXISTS idx_comment_oid_type_time ON comment (oid, type, time)",
+            # get_comments_by_mid_stream / get_latest_comment_by_mid，带上 oid、type 以覆盖后者
+            "CREATE INDEX IF NOT EXISTS idx_comment_mid_time ON comment (mid, time, oid, type)",
+            # get_oids_by_bids / get_information_by_bids
+            "CREATE INDEX IF NOT EXISTS idx_bv_bid ON bv (bid, oid)",
+        ],
+    ),
+    (
+        3,
+        "添加视频评论爬取检查点表",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS crawl_checkpoint (
+                oid INTEGER PRIMARY KEY,  -- 视频ID
+                cursor INTEGER,           -- 下一页一级评论游标，NULL 表示第一页
+                pending_roots TEXT,       -- 二级评论未爬完的一级评论 (JSON: {rpid: [下一页, 总页数]})
+                count INTEGER,            -- 已爬取评论数
+                updated_at INTEGER        -- 更新时间戳
+            )
+            """,
+        ],
+    ),
+    (
+        4,
+        "添加后台任务队列表",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS job (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,  -- 任务ID
+                kind TEXT NOT NULL,        -- 任务类型，对应 jobs/tasks.py 中的处理函数
+                params TEXT,               -- 任务参数 (JSON)
+                status TEXT NOT NULL,      -- queued / running / succeeded / failed
+                done INTEGER DEFAULT 0,    -- 已完成的步骤数
+                total INTEGER DEFAULT 0,   -- 总步骤数，0 表示未知
+                message TEXT,              -- 当前进度说明
+                result TEXT,               -- 执行结果 (JSON)
+                error TEXT,                -- 失败原因
+                worker TEXT,               -- 执行任务的工作线程 (主机:进程号:线程名)
+                created_at INTEGER,        -- 入队时间戳
+                started_at INTEGER,        -- 开始执行时间戳
+                updated_at INTEGER,        -- 最近一次进度更新时间戳
+                finished_at INTEGER        -- 结束时间戳
+            )
+            """,
+            # claim_next_job: WHERE status = 'queued' ORDER BY id
+            "CREATE INDEX IF NOT EXISTS idx_job_status_id ON job (status, id)",
+        ],
+    ),
+    (
+        5,
+        "添加用户评论同步高水位表",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user_comment_sync (
+                mid INTEGER PRIMARY KEY,  -- 用户ID
+                latest_time INTEGER,      -- 上次完整同步时最新一条评论的发布时间戳
+                latest_rpid INTEGER,      -- 上次完整同步时最新一条评论的ID
+                synced_at INTEGER         -- 同步完成时间戳
+            )
+            """,
+        ],
+    ),
+    (
+        6,
+        "为用户表添加资料获取时间",
+        [
+            # 评论爬取只写入昵称、头像等，粉丝数/关注数/获赞数由用户空间接口补全，
+            # fetched_at 为 NULL 表示从未补全过
+            "ALTER TABLE user ADD COLUMN fetched_at INTEGER",
+        ],
+    ),
+    (
+        7,
+        "添加接口响应缓存表",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,     -- 缓存键，例如 detail:<mid>、avatar:<头像URL>
+                body BLOB,                -- 响应内容
+                content_type TEXT,        -- 响应类型
+                size INTEGER,             -- 响应内容字节数
+                fetched_at INTEGER,       -- 获取时间戳，超过有效期后重新请求
+                accessed_at INTEGER       -- 最近一次读取时间戳，超出容量时先淘汰最久未读取的
+            )
+            """,
+            # evict: ORDER BY accessed_at
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache (accessed_at)",
+        ],
+    ),
+    (
+        8,
+        "为视频表添加评论数",
+        [
+            # 视频页面或 UP 主视频列表中的评论数，调度多个视频时用来估计爬取量
+            "ALTER TABLE bv ADD COLUMN reply_count INTEGER",
+        ],
+    ),
+    (
+        9,
+        "添加 UP 主视频索引表，记录视频上次爬完时的评论数",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS uploader (
+                mid INTEGER PRIMARY KEY,     -- UP主ID
+                video_count INTEGER,         -- 最近一次获取视频列表时的视频总数
+                refreshed_at INTEGER,        -- 最近一次刷新（完整或增量）视频列表的时间戳
+                full_refreshed_at INTEGER    -- 最近一次完整获取视频列表的时间戳
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS uploader_video (
+                mid INTEGER,                 -- UP主ID
+                oid INTEGER,                 -- 视频ID，视频信息在 bv 表中
+                created INTEGER,             -- 视频发布时间戳
+                PRIMARY KEY (mid, oid)
+            )
+            """,
+            # get_videos: WHERE mid = ? ORDER BY created DESC
+            "CREATE INDEX IF NOT EXISTS idx_uploader_video_created ON uploader_video (mid, created)",
+            # 视频上次完整爬取时的评论数，与当前评论数相同时可以跳过该视频
+            "ALTER TABLE bv ADD COLUMN crawled_reply_count INTEGER",
+        ],
+    ),
+    (
+        10,
+        "添加视频评论同步高水位表",
+        [
+            # 视频上次完整爬取时最新一条一级评论，增量爬取翻到这里为止；
+            # 爬取完成时才写入，不由 comment 表推算（用户评论同步也会写入该视频的评论）
+            """
+            CREATE TABLE IF NOT EXISTS video_comment_sync (
+                oid INTEGER PRIMARY KEY,  -- 视频ID
+                latest_time INTEGER,      -- 上次完整爬取时最新一条一级评论的发布时间戳
+                latest_rpid INTEGER,      -- 上次完整爬取时最新一条一级评论的ID
+                synced_at INTEGER         -- 爬取完成时间戳
+            )
+            """,
+            # 中断的爬取已见到的最新一级评论，从检查点继续并爬完后记为高水位
+            "ALTER TABLE crawl_checkpoint ADD COLUMN latest_time INTEGER",
+            "ALTER TABLE crawl_checkpoint ADD COLUMN latest_rpid INTEGER",
+        ],
+    ),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,  -- 已执行的迁移版本号
+            description TEXT,             -- 迁移说明
+            applied_at INTEGER            -- 执行时间戳
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(db_name: str) -> int:
+    """
+    按版本号顺序执行尚未执行的迁移，每个迁移一个事务。
+    返回执行后的 schema 版本号；某个迁移失败时停在上一个版本。
+    """
+    connections = get_connection_manager(db_name)
+    try:
+        current_version = get_schema_version(connections.get_connection())
+    except sqlite3.Error as e:
+        print(f"读取数据库版本失败: {e}")
+        return 0
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current_version:
+            continue
+        try:
+            with connections.transaction() as conn:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, int(time.time())),
+                )
+        except sqlite3.Error as e:
+            print(f"数据库迁移 {version} ({description}) 失败: {e}")
+            break
+        current_version = version
+        print(f"数据库迁移 {version} 已执行: {description}")
+    return current_version
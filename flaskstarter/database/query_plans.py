@@ -0,0 +1,62 @@
+import sqlite3
+from typing import Dict, List
+
+from .connection import get_connection_manager
+
+# 热点查询，与各仓库方法中的 SQL 保持一致。
+# 按 oid / mid 流式查询时每个 ID 单独查询再归并，这里检查的就是单个 ID 的查询；
+# 带 IN (?) 的查询会同时按单值与多值两种形式检查。
+HOT_QUERIES: Dict[str, str] = {
+    "CommentRepository.get_comments_by_oid_stream": """
+        SELECT * FROM comment
+        WHERE oid = ?
+        AND type = 1
+        ORDER BY time ASC
+    """,
+    "CommentRepository.get_comments_by_mid_stream": """
+        SELECT * FROM comment
+        WHERE mid = ?
+        ORDER BY time ASC
+    """,
+    "CommentRepository.get_latest_comment_by_mid": """
+        SELECT rpid, oid, type FROM comment
+        WHERE mid = ?
+        ORDER BY time DESC
+        LIMIT 1
+    """,
+    "BvRepository.get_oids_by_bids": "SELECT oid FROM bv WHERE bid IN (?)",
+}
+
+
+def explain_query(conn: sqlite3.Connection, sql: str) -> List[str]:
+    params = (None,) * sql.count("?")
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[3] for row in rows]
+
+
+def query_forms(sql: str) -> List[str]:
+    """返回需要检查的 SQL：原样一条，带 IN (?) 时再加一条多值 IN (?, ?, ?) 的形式。"""
+    forms = [sql]
+    if "IN (?)" in sql:
+        forms.append(sql.replace("IN (?)", "IN (?, ?, ?)"))
+    return forms
+
+
+def is_regressed(plan: List[str]) -> bool:
+    return any(detail.startswith("SCAN") or "TEMP B-TREE" in detail for detail in plan)
+
+
+def find_plan_regressions(db_name: str) -> Dict[str, List[str]]:
+    """
+    对每条热点查询执行 EXPLAIN QUERY PLAN，出现全表扫描 (SCAN) 或
+    额外排序 (USE TEMP B-TREE) 的查询视为退化，返回 {查询名: 执行计划}。
+    """
+    conn = get_connection_manager(db_name).get_connection()
+    regressions = {}
+    for name, sql in HOT_QUERIES.items():
+        for form in query_forms(sql):
+            plan = explain_query(conn, form)
+            if is_regressed(plan):
+                regressions[name] = plan
+                break
+    return regressions
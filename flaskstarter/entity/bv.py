@@ -4,16 +4,23 @@ class Bv:
         oid: int,
         bid: str = None,
         title: str = None,
+        reply_count: int = None,
     ):
         self.oid = oid
         self.bid = bid
         self.title = title
+        self.reply_count = reply_count  # 获取视频信息时的评论数，用来估计爬取量
 
     def to_tuple(self):
-        return (self.oid, self.bid, self.title)
+        return (self.oid, self.bid, self.title, self.reply_count)
 
     @classmethod
     def from_db_row(cls, row: tuple):
         if row is None:
             return None
-        return cls(oid=row[0], bid=row[1], title=row[2])
+        return cls(
+            oid=row[0],
+            bid=row[1],
+            title=row[2],
+            reply_count=row[3] if len(row) > 3 else None,
+        )
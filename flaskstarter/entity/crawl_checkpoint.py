@@ -0,0 +1,54 @@
+import json
+from typing import Optional, Tuple
+
+
+class CrawlCheckpoint:
+
+    def __init__(
+        self,
+        oid: int,
+        cursor: int = None,
+        pending_roots: dict = None,
+        count: int = 0,
+        updated_at: int = None,
+        latest_root: Optional[Tuple[int, int]] = None,
+    ):
+        """
+        :param cursor: 下一页一级评论的游标，None 表示从第一页开始
+        :param pending_roots: 二级评论尚未爬完的一级评论 {rpid: [下一页页码, 总页数]}
+        :param count: 截至该检查点已爬取的评论数
+        :param latest_root: 截至该检查点见到的最新一条一级评论的 (time, rpid)
+        """
+        self.oid = oid
+        self.cursor = cursor
+        self.pending_roots = pending_roots or {}
+        self.count = count
+        self.updated_at = updated_at
+        self.latest_root = latest_root
+
+    def to_tuple(self):
+        latest_time, latest_rpid = self.latest_root or (None, None)
+        return (
+            self.oid,
+            self.cursor,
+            json.dumps(self.pending_roots),
+            self.count,
+            self.updated_at,
+            latest_time,
+            latest_rpid,
+        )
+
+    @classmethod
+    def from_db_row(cls, row: tuple):
+        if row is None:
+            return None
+        return cls(
+            oid=row[0],
+            cursor=row[1],
+            pending_roots={
+                int(rpid): pages for rpid, pages in json.loads(row[2] or "{}").items()
+            },
+            count=row[3],
+            updated_at=row[4],
+            latest_root=(row[5], row[6]) if row[5] is not None else None,
+        )
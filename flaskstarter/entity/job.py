@@ -0,0 +1,85 @@
+import json
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class Job:
+
+    def __init__(
+        self,
+        id: int = None,
+        kind: str = None,
+        params: dict = None,
+        status: str = JOB_QUEUED,
+        done: int = 0,
+        total: int = 0,
+        message: str = None,
+        result: dict = None,
+        error: str = None,
+        worker: str = None,
+        created_at: int = None,
+        started_at: int = None,
+        updated_at: int = None,
+        finished_at: int = None,
+    ):
+        """
+        :param params: 传给任务处理函数的关键字参数
+        :param done: 已完成的步骤数，与 total 一起表示进度
+        :param result: 处理函数的返回值，任务成功后写入
+        """
+        self.id = id
+        self.kind = kind
+        self.params = params or {}
+        self.status = status
+        self.done = done
+        self.total = total
+        self.message = message
+        self.result = result
+        self.error = error
+        self.worker = worker
+        self.created_at = created_at
+        self.started_at = started_at
+        self.updated_at = updated_at
+        self.finished_at = finished_at
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_db_row(cls, row: tuple):
+        if row is None:
+            return None
+        return cls(
+            id=row[0],
+            kind=row[1],
+            params=json.loads(row[2] or "{}"),
+            status=row[3],
+            done=row[4],
+            total=row[5],
+            message=row[6],
+            result=json.loads(row[7]) if row[7] else None,
+            error=row[8],
+            worker=row[9],
+            created_at=row[10],
+            started_at=row[11],
+            updated_at=row[12],
+            finished_at=row[13],
+        )
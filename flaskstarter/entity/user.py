@@ -11,6 +11,7 @@ class User:
         sign: str = None,
         like_num: int = None,
         vip: int = None,
+        fetched_at: int = None,
     ):
         self.mid = mid
         self.face = face
@@ -21,6 +22,7 @@ class User:
         self.sign = sign
         self.like_num = like_num
         self.vip = vip
+        self.fetched_at = fetched_at  # 最近一次从用户空间接口获取粉丝数等资料的时间戳
 
     def to_tuple(self):
         return (
@@ -33,6 +35,7 @@ class User:
             self.sign,
             self.like_num,
             self.vip,
+            self.fetched_at,
         )
 
     @classmethod
@@ -49,4 +52,5 @@ class User:
             sign=row[6],
             like_num=row[7],
             vip=row[8],
+            fetched_at=row[9] if len(row) > 9 else None,
         )
@@ -0,0 +1,166 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from ..entity.job import Job, JOB_RUNNING
+from ..repository.job_repository import JobRepository
+from ..tools.config import JOB_POLL_INTERVAL, JOB_WORKERS
+from ..tools.progress_bus import get_progress_bus
+
+
+def job_topic(job_id: int) -> str:
+    """任务在进度事件总线上的主题"""
+    return f"job:{job_id}"
+
+
+def publish_job_event(job: Job):
+    bus = get_progress_bus()
+    topic = job_topic(job.id)
+    if bus.has_subscribers(topic):
+        bus.publish(topic, {"type": "job", **job.to_dict()})
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """
+    传给任务处理函数的上下文，处理函数通过 progress() 汇报进度。
+    两次写库之间至少间隔 min_interval 秒，完成最后一步时总会写入；
+    写库的同时向进度事件总线发布任务事件，爬虫等可以用 topic 发布更细的进度。
+    """
+
+    def __init__(self, job: Job, repo: JobRepository, min_interval: float = 0.5):
+        self.job = job
+        self.repo = repo
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+
+    @property
+    def topic(self) -> str:
+        return job_topic(self.job.id)
+
+    def progress(self, done: int, total: int, message: str = None):
+        with self._lock:
+            now = time.monotonic()
+            if done < total and now - self._last_update < self.min_interval:
+                return
+            self._last_update = now
+            self.job.done, self.job.total, self.job.message = done, total, message
+            self.repo.update_progress(self.job.id, done, total, message)
+            publish_job_event(self.job)
+
+
+class JobQueue:
+    """
+    基于 SQLite 的本地任务队列。enqueue() 把任务写入 job 表后立即返回，
+    workers 个后台线程依次领取任务并调用 handlers 中对应的处理函数 handler(context, **params)，
+    返回值作为任务结果保存，抛出的异常作为失败原因保存。
+
+    任务状态保存在数据库里，网页进程重启后仍可查询；启动时会把本机已退出进程留下的
+    运行中任务重新排队，爬虫可以从检查点继续。
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        handlers: Dict[str, Callable],
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.repo = JobRepository(db_name)
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def enqueue(self, kind: str, **params) -> int:
+        if kind not in self.handlers:
+            raise ValueError(f"未知的任务类型: {kind}")
+        job_id = self.repo.enqueue_job(kind, params)
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        return self.repo.get_job(job_id)
+
+    def start(self):
+        """启动工作线程，可重复调用。"""
+        with self._lock:
+            if self._threads:
+                return
+            self._requeue_orphaned_jobs()
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"job-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        """通知工作线程在当前任务结束后退出。"""
+        with self._lock:
+            self._stop.set()
+            self._wakeup.set()
+            for thread in self._threads:
+                thread.join(timeout)
+            self._threads = []
+
+    def _requeue_orphaned_jobs(self):
+        hostname = socket.gethostname()
+        for job in self.repo.get_jobs_by_status(JOB_RUNNING):
+            host, _, rest = (job.worker or "").partition(":")
+            pid = rest.partition(":")[0]
+            if host != hostname or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            if self.repo.requeue_job(job.id):
+                print(f"任务 {job.id} ({job.kind}) 所在进程已退出，重新排队")
+
+    def _work(self):
+        worker = f"{self._worker_prefix}:{threading.current_thread().name}"
+        while not self._stop.is_set():
+            try:
+                job = self.repo.claim_next_job(worker)
+            except Exception as e:
+                print(f"领取任务失败: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.repo.fail_job(job.id, f"未知的任务类型: {job.kind}")
+            return
+        print(f"开始执行任务 {job.id} ({job.kind})")
+        started = time.perf_counter()
+        try:
+            result = handler(JobContext(job, self.repo), **job.params)
+        except Exception as e:
+            traceback.print_exc()
+            self.repo.fail_job(job.id, str(e) or type(e).__name__)
+            publish_job_event(self.repo.get_job(job.id) or job)
+            print(f"任务 {job.id} ({job.kind}) 失败: {e}")
+            return
+        self.repo.finish_job(job.id, result or {})
+        publish_job_event(self.repo.get_job(job.id) or job)
+        print(f"任务 {job.id} ({job.kind}) 完成，耗时 {time.perf_counter() - started:.1f} 秒")
@@ -0,0 +1,258 @@
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..analyzer.analyze_comment import CommentAnalyzer
+from ..entity.bv import Bv
+from ..entity.job import JOB_SUCCEEDED
+from ..crawler.crawl_scheduler import CrawlScheduler, VideoCrawlResult
+from ..crawler.get_uploader_videos import UploaderVideoLister
+from ..crawler.get_user_all_comment import BilibiliUserCommentsCrawler
+from ..crawler.get_user_information import BilibiliUserCrawler
+from ..repository.bv_repository import BvRepository
+from ..repository.comment_repository import CommentRepository
+from ..repository.job_repository import JobRepository
+from ..tools.config import *
+from ..tools.get_csv import (
+    export_comments_by_oid_to_csv,
+    export_comments_by_mid_to_csv_mini,
+)
+from ..tools.response_cache import get_cached_avatar, get_cached_comment_details
+from .job_queue import JobContext, JobQueue
+
+# matplotlib 的 pyplot 不是线程安全的，同一时间只运行一个分析任务；
+# 爬取与导出各自写任务自己的文件，可以并发
+_plot_lock = threading.Lock()
+
+BV_CHART_FILES = {
+    "ip_distribution": "user_ip_top10_distribution.png",
+    "vip_status": "user_vip_status.png",
+    "comment_comparison": "comment_radar_chart.png",
+    "gender_distribution": "user_gender_distribution.png",
+    "level_distribution": "user_level_distribution.png",
+    "time_trend": "comment_time_trend.png",
+    "hour_distribution": "comment_hour_distribution.png",
+    "sentiment": "comment_sentiment_distribution.png",
+    "wordcloud": "comment_wordcloud.png",
+}
+
+UID_CHART_FILES = {
+    "time_trend": "comment_time_trend.png",
+    "hour_distribution": "comment_hour_distribution.png",
+    "sentiment": "comment_sentiment_distribution.png",
+    "wordcloud": "comment_wordcloud.png",
+}
+
+
+def job_csv_path(job_id: int) -> str:
+    """任务导出的评论 CSV 路径"""
+    return os.path.join(JOB_OUTPUT_DIR, str(job_id), OUTPUT_CSV_NAME)
+
+
+def job_image_dir(job_id: int) -> str:
+    """分析任务保存图表的目录"""
+    return os.path.join(JOB_IMAGE_DIR, str(job_id))
+
+
+def cleanup_job_outputs(max_age: int = JOB_OUTPUT_TTL, db_name: str = BILI_DB_PATH) -> int:
+    """
+    删除结束已超过 max_age 秒的任务留下的 CSV 与图表目录，返回删除的目录数。
+    排队中与运行中的任务的文件不受影响。
+    """
+    repo = JobRepository(db_name)
+    cutoff = int(time.time()) - max_age
+    removed = 0
+    for base_dir in (JOB_OUTPUT_DIR, JOB_IMAGE_DIR):
+        if not os.path.isdir(base_dir):
+            continue
+        for entry in os.listdir(base_dir):
+            if not entry.isdigit():
+                continue
+            job = repo.get_job(int(entry))
+            if job is not None and not (job.is_finished and job.finished_at < cutoff):
+                continue
+            shutil.rmtree(os.path.join(base_dir, entry), ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _crawl_and_export(
+    context: JobContext,
+    name: str,
+    bv_list: List[str],
+    is_second: bool,
+    known_videos: Optional[Dict[str, Bv]] = None,
+    skip_unchanged: bool = False,
+) -> dict:
+    def on_video_done(done: int, total: int, result: VideoCrawlResult):
+        if result.skipped:
+            message = f"{result.bv} 评论数未变化，已跳过"
+        else:
+            message = f"{result.bv} 已爬取 {result.count} 条评论"
+        context.progress(done, total + 1, message)
+
+    context.progress(0, len(bv_list) + 1, f"开始爬取 {len(bv_list)} 个视频")
+    scheduler = CrawlScheduler(is_second=is_second, progress_topic=context.topic)
+    results = scheduler.crawl_all(
+        bv_list,
+        progress=on_video_done,
+        known_videos=known_videos,
+        skip_unchanged=skip_unchanged,
+    )
+
+    context.progress(len(bv_list), len(bv_list) + 1, "正在导出 CSV")
+    video_oids = BvRepository(BILI_DB_PATH).get_oids_by_bids(bv_list)
+    if not video_oids:
+        raise RuntimeError("没有爬取到任何视频，请检查输入或稍后再试")
+    csv_path = job_csv_path(context.job.id)
+    export_comments_by_oid_to_csv(
+        output_filepath=csv_path,
+        oids=video_oids,
+        db_name=BILI_DB_PATH,
+    )
+    context.progress(len(bv_list) + 1, len(bv_list) + 1, "爬取完成")
+    return {
+        "name": name,
+        "csv_path": csv_path,
+        "videos": [result.to_dict() for result in results],
+    }
+
+
+def run_bv_crawl(context: JobContext, bv_list: List[str], is_second: bool) -> dict:
+    """爬取若干视频的评论并导出 CSV。"""
+    return _crawl_and_export(context, "bv", bv_list, is_second)
+
+
+def run_up_crawl(context: JobContext, uid: str, is_second: bool) -> dict:
+    """
+    获取 UP 主的全部视频，爬取评论并导出 CSV。
+    视频列表优先使用 UP 主视频索引，评论数与上次爬完时相同的视频不再重新爬取。
+    """
+    context.progress(0, 0, "正在获取UP主的视频列表")
+    lister = UploaderVideoLister(BILI_DB_PATH)
+    videos = lister.refresh_videos(int(uid), fresh_counts=True)
+    if not videos:
+        raise RuntimeError("没有获取到UP主的视频，请检查UID或稍后再试")
+    print(f"共获取到 {len(videos)} 个视频，开始批量爬取评论...")
+    return _crawl_and_export(
+        context,
+        "up",
+        [video.bid for video in videos],
+        is_second,
+        # 评论数不是这次取得的视频由调度器重新请求视频信息，不用旧的评论数判断是否跳过
+        known_videos={
+            video.bid: video for video in videos if video.bid in lister.refreshed
+        },
+        skip_unchanged=True,
+    )
+
+
+def run_uid_crawl(context: JobContext, uid: str) -> dict:
+    """爬取用户信息与用户的全部评论并导出 CSV。"""
+    mids = [uid]
+    context.progress(0, 3, "正在获取用户信息")
+    crawler = BilibiliUserCrawler(db_name=BILI_DB_PATH)
+    for single_mid in mids:
+        crawler.crawl_user_info(single_mid)
+    context.progress(1, 3, "正在爬取用户评论")
+    crawler = BilibiliUserCommentsCrawler(db_name=BILI_DB_PATH)
+    count = 0
+    for single_mid in mids:
+        count += crawler.crawl_user_all_comments(single_mid, incremental=True)
+    context.progress(2, 3, "正在导出 CSV")
+    csv_path = job_csv_path(context.job.id)
+    export_comments_by_mid_to_csv_mini(
+        output_filepath=csv_path,
+        mids=mids,
+        db_name=BILI_DB_PATH,
+    )
+    context.progress(3, 3, "爬取完成")
+    return {"name": "uid", "csv_path": csv_path, "count": count}
+
+
+def _get_user_detail(analyzer: CommentAnalyzer) -> Optional[dict]:
+    user_mid = None
+    if analyzer.df is not None and not analyzer.df.empty:
+        user_mid = (
+            int(analyzer.df["用户ID"].iloc[0])
+            if "用户ID" in analyzer.df.columns
+            else None
+        )
+    user_detail = None
+    if user_mid:
+        comment_repo = CommentRepository(db_name=BILI_DB_PATH)
+        latest_comment = comment_repo.get_latest_comment_by_mid(user_mid)
+        if latest_comment:
+            user_detail = get_cached_comment_details(
+                user_mid,
+                latest_comment["oid"],
+                latest_comment["type"],
+                latest_comment["rpid"],
+            )
+    if user_detail and user_detail.get("comment_info"):
+        # 预先缓存头像，结果页通过 bilibili.user_avatar 按用户ID读取
+        get_cached_avatar(user_detail["comment_info"]["face"])
+    return user_detail
+
+
+def run_analysis(context: JobContext, crawl_job_id: int) -> dict:
+    """
+    分析爬取任务 crawl_job_id 导出的评论 CSV，图表保存到本任务的图表目录，
+    返回结果页需要的统计数据。
+    """
+    crawl_job = context.repo.get_job(crawl_job_id)
+    if crawl_job is None or crawl_job.status != JOB_SUCCEEDED:
+        raise RuntimeError("爬取任务不存在或尚未完成")
+    csv_path = crawl_job.result.get("csv_path")
+    if not csv_path or not os.path.exists(csv_path):
+        raise RuntimeError("评论文件不存在")
+    name = crawl_job.result["name"]
+    with _plot_lock:
+        context.progress(0, 2, "正在分析评论")
+        analyzer = CommentAnalyzer(
+            csv_path=csv_path, output_dir=job_image_dir(context.job.id)
+        )
+        result = {"name": name, "crawl_job_id": crawl_job_id}
+        if name == "bv" or name == "up":
+            analyzer.run_all_analysis()
+            result["chart_files"] = BV_CHART_FILES
+        elif name == "uid":
+            analyzer.run_mini_analysis()
+            result["chart_files"] = UID_CHART_FILES
+            context.progress(1, 2, "正在获取用户详情")
+            result["user_detail"] = _get_user_detail(analyzer)
+        else:
+            raise ValueError(f"未知的分析类型: {name}")
+        result["stats"] = {
+            "total_comments": len(analyzer.df),
+            "unique_users": (
+                len(analyzer.df_unique_users)
+                if analyzer.df_unique_users is not None
+                else 0
+            ),
+            "file_size": os.path.getsize(csv_path) / 1024,
+        }
+    context.progress(2, 2, "分析完成")
+    return result
+
+
+JOB_HANDLERS = {
+    "bv_crawl": run_bv_crawl,
+    "up_crawl": run_up_crawl,
+    "uid_crawl": run_uid_crawl,
+    "analyze": run_analysis,
+}
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """进程内共享的任务队列，工作线程需要调用 start() 启动。"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(BILI_DB_PATH, JOB_HANDLERS)
+        return _job_queue
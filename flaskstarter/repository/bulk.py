@@ -0,0 +1,14 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+def iter_chunks(iterable: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """把任意可迭代对象切成长度不超过 chunk_size 的列表，供分块 executemany 使用。"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
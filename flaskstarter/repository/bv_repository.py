@@ -1,58 +1,71 @@
 import sqlite3
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Iterable
 from ..entity.bv import Bv
+from ..database.connection import get_connection_manager
+from .bulk import iter_chunks
 
 
 class BvRepository:
     def __init__(self, db_name):
         self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
 
     def _get_connection(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_name)
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        return self.connections.transaction()
 
     def add_or_update_bv(self, bv: Bv) -> bool:
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            insert_or_replace_sql = """
-            INSERT OR REPLACE INTO bv (
-                oid, bid, title
-            ) VALUES (?, ?, ?)
-            """
-            cursor.execute(insert_or_replace_sql, bv.to_tuple())
-            conn.commit()
+            with self._transaction() as conn:
+                insert_or_replace_sql = """
+                INSERT OR REPLACE INTO bv (
+                    oid, bid, title, reply_count
+                ) VALUES (?, ?, ?, ?)
+                """
+                conn.execute(insert_or_replace_sql, bv.to_tuple())
             return True
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"添加/更新失败: {e}")
             return False
-        finally:
-            conn.close()
+
+    def bulk_upsert_bvs(self, bvs: Iterable[Bv], chunk_size: int = 1000) -> int:
+        upsert_sql = """
+        INSERT INTO bv (
+            oid, bid, title, reply_count
+        ) VALUES (?, ?, ?, ?)
+        ON CONFLICT(oid) DO UPDATE SET
+            bid = excluded.bid, title = excluded.title,
+            reply_count = COALESCE(excluded.reply_count, bv.reply_count)
+        """
+        written = 0
+        try:
+            for chunk in iter_chunks((bv.to_tuple() for bv in bvs), chunk_size):
+                with self._transaction() as conn:
+                    conn.executemany(upsert_sql, chunk)
+                written += len(chunk)
+        except sqlite3.Error as e:
+            print(f"批量添加/更新失败: {e}")
+        return written
 
     def delete_bvs_by_oids(self, oids: List[int]) -> int:
         if not oids:
             return 0
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            placeholders = ",".join(["?"] * len(oids))
-            delete_sql = f"DELETE FROM bv WHERE oid IN ({placeholders})"
-            cursor.execute(delete_sql, tuple(oids))
-            deleted_count = cursor.rowcount
-            conn.commit()
+            with self._transaction() as conn:
+                placeholders = ",".join(["?"] * len(oids))
+                delete_sql = f"DELETE FROM bv WHERE oid IN ({placeholders})"
+                deleted_count = conn.execute(delete_sql, tuple(oids)).rowcount
             return deleted_count
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"删除 bv 失败: {e}")
             return 0
-        finally:
-            conn.close()
 
     def get_information_by_oids(self, oids: List[int]) -> List[Bv]:
         if not oids:
             return []
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         bvs = []
         try:
             placeholders = ",".join(["?"] * len(oids))
@@ -63,14 +76,13 @@ class BvRepository:
         except sqlite3.Error as e:
             print(f"查询失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return bvs
 
     def get_information_by_bids(self, bids: List[str]) -> List[Bv]:
         if not bids:
             return []
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         bvs = []
         try:
             placeholders = ",".join(["?"] * len(bids))
@@ -81,14 +93,13 @@ class BvRepository:
         except sqlite3.Error as e:
             print(f"查询失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return bvs
 
     def get_oids_by_bids(self, bids: List[str]) -> List[int]:
         if not bids:
             return []
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         oids = []
         try:
             placeholders = ",".join(["?"] * len(bids))
@@ -99,14 +110,13 @@ class BvRepository:
         except sqlite3.Error as e:
             print(f"查询失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return oids
 
     def get_bids_by_oids(self, oids: List[int]) -> List[str]:
         if not oids:
             return []
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         bids = []
         try:
             placeholders = ",".join(["?"] * len(oids))
@@ -117,5 +127,39 @@ class BvRepository:
         except sqlite3.Error as e:
             print(f"查询失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return bids
+
+    def mark_crawled(self, oid: int, reply_count: Optional[int]) -> bool:
+        """记录视频完整爬取时的评论数，reply_count 为 None 时清除记录。"""
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "UPDATE bv SET crawled_reply_count = ? WHERE oid = ?",
+                    (reply_count, oid),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"记录视频 {oid} 爬取时的评论数失败: {e}")
+            return False
+
+    def get_crawled_reply_counts(self, oids: List[int]) -> Dict[int, int]:
+        """查询视频上次完整爬取时的评论数，返回 {oid: 评论数}，没有记录的视频不在结果中。"""
+        if not oids:
+            return {}
+        cursor = self._get_connection().cursor()
+        counts = {}
+        try:
+            placeholders = ",".join(["?"] * len(oids))
+            query_sql = (
+                f"SELECT oid, crawled_reply_count FROM bv "
+                f"WHERE oid IN ({placeholders}) AND crawled_reply_count IS NOT NULL"
+            )
+            cursor.execute(query_sql, tuple(oids))
+            for row in cursor.fetchall():
+                counts[row[0]] = row[1]
+        except sqlite3.Error as e:
+            print(f"查询失败: {e}")
+        finally:
+            cursor.close()
+        return counts
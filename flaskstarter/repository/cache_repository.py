@@ -0,0 +1,83 @@
+import sqlite3
+import time
+from typing import Optional, Tuple
+from ..database.connection import get_connection_manager
+
+
+class CacheRepository:
+    """
+    负责 response_cache 表的读写：按键缓存接口响应，过期的条目视为不存在，
+    总大小超过上限时按最近读取时间淘汰。
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程复用的数据库连接"""
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        """开启写事务，退出时提交，出错时回滚"""
+        return self.connections.transaction()
+
+    def get(self, key: str, max_age: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+        """
+        读取缓存并刷新读取时间，返回 (内容, 类型)。
+        不存在或获取时间早于 max_age 秒之前时返回 None；max_age 为 None 时不检查有效期。
+        """
+        now = int(time.time())
+        try:
+            row = self._get_connection().execute(
+                "SELECT body, content_type, fetched_at FROM response_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (max_age is not None and row[2] < now - max_age):
+                return None
+            with self._transaction() as conn:
+                conn.execute(
+                    "UPDATE response_cache SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+            return bytes(row[0]), row[1]
+        except sqlite3.Error as e:
+            print(f"读取缓存 {key} 失败: {e}")
+            return None
+
+    def put(self, key: str, body: bytes, content_type: str, max_bytes: int) -> bool:
+        """写入或覆盖一条缓存，随后把缓存总大小淘汰到 max_bytes 以内。"""
+        now = int(time.time())
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO response_cache (
+                        key, body, content_type, size, fetched_at, accessed_at
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, body, content_type, len(body), now, now),
+                )
+                self._evict(conn, max_bytes)
+            return True
+        except sqlite3.Error as e:
+            print(f"写入缓存 {key} 失败: {e}")
+            return False
+
+    @staticmethod
+    def _evict(conn: sqlite3.Connection, max_bytes: int) -> int:
+        # 按读取时间从新到旧累加大小（同一秒内按写入先后），累计超过上限的条目全部删除
+        return conn.execute(
+            """
+            DELETE FROM response_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (
+                        ORDER BY accessed_at DESC, rowid DESC
+                    ) AS running_size
+                    FROM response_cache
+                )
+                WHERE running_size > ?
+            )
+            """,
+            (max_bytes,),
+        ).rowcount
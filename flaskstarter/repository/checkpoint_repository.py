@@ -0,0 +1,124 @@
+import sqlite3
+import time
+from typing import Optional, Tuple
+from ..entity.crawl_checkpoint import CrawlCheckpoint
+from ..database.connection import get_connection_manager
+
+
+class CheckpointRepository:
+    """
+    保存爬取进度：视频评论的检查点，爬取中断后可从最近的检查点继续；
+    以及视频评论、用户评论历史上次完整爬取/同步到的位置，增量爬取时翻到这里为止。
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        return self.connections.transaction()
+
+    def save_checkpoint(self, checkpoint: CrawlCheckpoint) -> bool:
+        checkpoint.updated_at = int(time.time())
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO crawl_checkpoint (
+                        oid, cursor, pending_roots, count, updated_at,
+                        latest_time, latest_rpid
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    checkpoint.to_tuple(),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"保存爬取检查点失败: {e}")
+            return False
+
+    def get_checkpoint(self, oid: int) -> Optional[CrawlCheckpoint]:
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute("SELECT * FROM crawl_checkpoint WHERE oid = ?", (oid,))
+            return CrawlCheckpoint.from_db_row(cursor.fetchone())
+        except sqlite3.Error as e:
+            print(f"读取爬取检查点失败: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def delete_checkpoint(self, oid: int) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM crawl_checkpoint WHERE oid = ?", (oid,))
+            return True
+        except sqlite3.Error as e:
+            print(f"删除爬取检查点失败: {e}")
+            return False
+
+    def get_user_sync_mark(self, mid: int) -> Optional[Tuple[int, int]]:
+        """返回用户评论历史上次完整同步时最新一条评论的 (time, rpid)，从未同步过时返回 None。"""
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute(
+                "SELECT latest_time, latest_rpid FROM user_comment_sync WHERE mid = ?",
+                (mid,),
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else None
+        except sqlite3.Error as e:
+            print(f"读取用户评论同步位置失败: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def save_user_sync_mark(self, mid: int, mark: Tuple[int, int]) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO user_comment_sync (
+                        mid, latest_time, latest_rpid, synced_at
+                    ) VALUES (?, ?, ?, ?)
+                    """,
+                    (mid, mark[0], mark[1], int(time.time())),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"保存用户评论同步位置失败: {e}")
+            return False
+
+    def get_video_sync_mark(self, oid: int) -> Optional[Tuple[int, int]]:
+        """返回视频上次完整爬取时最新一条一级评论的 (time, rpid)，从未爬完过时返回 None。"""
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute(
+                "SELECT latest_time, latest_rpid FROM video_comment_sync WHERE oid = ?",
+                (oid,),
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else None
+        except sqlite3.Error as e:
+            print(f"读取视频评论同步位置失败: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def save_video_sync_mark(self, oid: int, mark: Tuple[int, int]) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO video_comment_sync (
+                        oid, latest_time, latest_rpid, synced_at
+                    ) VALUES (?, ?, ?, ?)
+                    """,
+                    (oid, mark[0], mark[1], int(time.time())),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"保存视频评论同步位置失败: {e}")
+            return False
@@ -1,111 +1,164 @@
+import heapq
 import sqlite3
-from typing import List, Optional, Tuple, Iterator
+from typing import Dict, List, Optional, Tuple, Iterator, Iterable
 from ..entity.comment import Comment
+from ..database.connection import get_connection_manager
+from .bulk import iter_chunks
 
 
 class CommentRepository:
     def __init__(self, db_name):
         self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
 
     def _get_connection(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_name)
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        return self.connections.transaction()
 
     def add_comment(self, comment: Comment, overwrite: bool = False) -> bool:
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT 1 FROM comment WHERE rpid = ?", (comment.rpid,))
-            exists = cursor.fetchone()
+            with self._transaction() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM comment WHERE rpid = ?", (comment.rpid,)
+                ).fetchone()
 
-            if exists:
-                if overwrite:
-                    update_sql = """
-                    UPDATE comment SET
-                        parentid = ?, rootid = ?, mid = ?, name = ?, level = ?, sex = ?,
-                        information = ?, time = ?, single_reply_num = ?,
-                        single_like_num = ?, sign = ?, ip_location = ?,
-                        vip = ?, face = ?, oid = ?, type = ?
-                    WHERE rpid = ?
+                if exists:
+                    if overwrite:
+                        update_sql = """
+                        UPDATE comment SET
+                            parentid = ?, rootid = ?, mid = ?, name = ?, level = ?, sex = ?,
+                            information = ?, time = ?, single_reply_num = ?,
+                            single_like_num = ?, sign = ?, ip_location = ?,
+                            vip = ?, face = ?, oid = ?, type = ?
+                        WHERE rpid = ?
+                        """
+                        params = (
+                            comment.parentid,
+                            comment.rootid,
+                            comment.mid,
+                            comment.name,
+                            comment.level,
+                            comment.sex,
+                            comment.information,
+                            comment.time,
+                            comment.single_reply_num,
+                            comment.single_like_num,
+                            comment.sign,
+                            comment.ip_location,
+                            comment.vip,
+                            comment.face,
+                            comment.oid,
+                            comment.type,
+                            comment.rpid,
+                        )
+                        conn.execute(update_sql, params)
+                        return True
+                    else:
+                        return False
+                else:
+                    insert_sql = """
+                    INSERT INTO comment (
+                        rpid, parentid, rootid, mid, name, level, sex, information,
+                        time, single_reply_num, single_like_num, sign,
+                        ip_location, vip, face, oid, type
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """
-                    params = (
-                        comment.parentid,
-                        comment.rootid,
-                        comment.mid,
-                        comment.name,
-                        comment.level,
-                        comment.sex,
-                        comment.information,
-                        comment.time,
-                        comment.single_reply_num,
-                        comment.single_like_num,
-                        comment.sign,
-                        comment.ip_location,
-                        comment.vip,
-                        comment.face,
-                        comment.oid,
-                        comment.rpid,
-                        comment.type,
-                    )
-                    cursor.execute(update_sql, params)
-                    conn.commit()
+                    conn.execute(insert_sql, comment.to_tuple())
                     return True
-                else:
-                    return False
-            else:
-                insert_sql = """
-                INSERT INTO comment (
-                    rpid, parentid, rootid, mid, name, level, sex, information,
-                    time, single_reply_num, single_like_num, sign,
-                    ip_location, vip, face, oid, type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                cursor.execute(insert_sql, comment.to_tuple())
-                conn.commit()
-                return True
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"添加/更新评论失败: {e}")
             return False
-        finally:
-            conn.close()
 
     def add_mini_comment(self, comment: Comment, overwrite: bool = False) -> bool:
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute("SELECT 1 FROM comment WHERE rpid = ?", (comment.rpid,))
-            exists = cursor.fetchone()
+            with self._transaction() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM comment WHERE rpid = ?", (comment.rpid,)
+                ).fetchone()
 
-            if exists:
-                if overwrite:
-                    update_sql = """
-                    UPDATE comment SET
-                        parentid = ?, rootid=?, mid = ?,information = ?, time = ?, oid = ?, type = ?
-                    WHERE rpid = ?
+                if exists:
+                    if overwrite:
+                        update_sql = """
+                        UPDATE comment SET
+                            parentid = ?, rootid=?, mid = ?,information = ?, time = ?, oid = ?, type = ?
+                        WHERE rpid = ?
+                        """
+                        params = (
+                            comment.parentid,
+                            comment.rootid,
+                            comment.mid,
+                            comment.information,
+                            comment.time,
+                            comment.oid,
+                            comment.type,
+                            comment.rpid,
+                        )
+                        conn.execute(update_sql, params)
+                        return True
+                    else:
+                        return False
+                else:
+                    insert_sql = """
+                    INSERT INTO comment (
+                        rpid, parentid, rootid, mid, information, time, oid, type
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """
-                    params = (
+
+                    params_for_insert = (
+                        comment.rpid,
                         comment.parentid,
                         comment.rootid,
                         comment.mid,
                         comment.information,
                         comment.time,
                         comment.oid,
-                        comment.rpid,
                         comment.type,
                     )
-                    cursor.execute(update_sql, params)
-                    conn.commit()
+                    conn.execute(insert_sql, params_for_insert)
                     return True
-                else:
-                    return False
-            else:
-                insert_sql = """
-                INSERT INTO comment (
-                    rpid, parentid, rootid, mid, information, time, oid, type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """
+        except sqlite3.Error as e:
+            print(f"添加/更新评论失败: {e}")
+            return False
 
-                params_for_insert = (
+    def bulk_upsert_comments(
+        self, comments: Iterable[Comment], mode: str = "full", chunk_size: int = 1000
+    ) -> int:
+        """
+        批量插入或更新评论，每 chunk_size 条一个事务。
+        mode="full" 覆盖全部字段；mode="mini" 只写精简字段，已有的完整快照字段保持不变。
+        返回成功写入的条数，出错时停止并返回出错前已提交的条数。
+        """
+        if mode == "full":
+            upsert_sql = """
+            INSERT INTO comment (
+                rpid, parentid, rootid, mid, name, level, sex, information,
+                time, single_reply_num, single_like_num, sign,
+                ip_location, vip, face, oid, type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(rpid) DO UPDATE SET
+                parentid = excluded.parentid, rootid = excluded.rootid,
+                mid = excluded.mid, name = excluded.name, level = excluded.level,
+                sex = excluded.sex, information = excluded.information,
+                time = excluded.time, single_reply_num = excluded.single_reply_num,
+                single_like_num = excluded.single_like_num, sign = excluded.sign,
+                ip_location = excluded.ip_location, vip = excluded.vip,
+                face = excluded.face, oid = excluded.oid, type = excluded.type
+            """
+            rows = (comment.to_tuple() for comment in comments)
+        elif mode == "mini":
+            upsert_sql = """
+            INSERT INTO comment (
+                rpid, parentid, rootid, mid, information, time, oid, type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(rpid) DO UPDATE SET
+                parentid = excluded.parentid, rootid = excluded.rootid,
+                mid = excluded.mid, information = excluded.information,
+                time = excluded.time, oid = excluded.oid, type = excluded.type
+            """
+            rows = (
+                (
                     comment.rpid,
                     comment.parentid,
                     comment.rootid,
@@ -115,15 +168,20 @@ class CommentRepository:
                     comment.oid,
                     comment.type,
                 )
-                cursor.execute(insert_sql, params_for_insert)
-                conn.commit()
-                return True
+                for comment in comments
+            )
+        else:
+            raise ValueError(f"不支持的写入模式: {mode}")
+
+        written = 0
+        try:
+            for chunk in iter_chunks(rows, chunk_size):
+                with self._transaction() as conn:
+                    conn.executemany(upsert_sql, chunk)
+                written += len(chunk)
         except sqlite3.Error as e:
-            conn.rollback()
-            print(f"添加/更新评论失败: {e}")
-            return False
-        finally:
-            conn.close()
+            print(f"批量添加/更新评论失败: {e}")
+        return written
 
     def delete_comments_by_mids(self, mids: List[int]) -> int:
         """
@@ -132,21 +190,15 @@ class CommentRepository:
         """
         if not mids:
             return 0
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            placeholders = ",".join(["?"] * len(mids))
-            delete_sql = f"DELETE FROM comment WHERE mid IN ({placeholders})"
-            cursor.execute(delete_sql, tuple(mids))
-            deleted_count = cursor.rowcount
-            conn.commit()
+            with self._transaction() as conn:
+                placeholders = ",".join(["?"] * len(mids))
+                delete_sql = f"DELETE FROM comment WHERE mid IN ({placeholders})"
+                deleted_count = conn.execute(delete_sql, tuple(mids)).rowcount
             return deleted_count
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"按 mid 删除评论失败: {e}")
             return 0
-        finally:
-            conn.close()
 
     def delete_comments_by_oids(self, oids: List[int]) -> int:
         """
@@ -155,21 +207,15 @@ class CommentRepository:
         """
         if not oids:
             return 0
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            placeholders = ",".join(["?"] * len(oids))
-            delete_sql = f"DELETE FROM comment WHERE oid IN ({placeholders})"
-            cursor.execute(delete_sql, tuple(oids))
-            deleted_count = cursor.rowcount
-            conn.commit()
+            with self._transaction() as conn:
+                placeholders = ",".join(["?"] * len(oids))
+                delete_sql = f"DELETE FROM comment WHERE oid IN ({placeholders})"
+                deleted_count = conn.execute(delete_sql, tuple(oids)).rowcount
             return deleted_count
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"按 oid 删除评论失败: {e}")
             return 0
-        finally:
-            conn.close()
 
     def get_comments_by_mid_paginated(
         self, mids: List[int], page: int = 1, page_size: int = 20
@@ -186,8 +232,7 @@ class CommentRepository:
             page_size = 20
 
         offset = (page - 1) * page_size
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         comments = []
         try:
             placeholders = ",".join(["?"] * len(mids))
@@ -203,7 +248,7 @@ class CommentRepository:
         except sqlite3.Error as e:
             print(f"按 mid 分页查询评论失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return comments
 
     def get_comments_by_oid_paginated(
@@ -221,8 +266,7 @@ class CommentRepository:
             page_size = 20
 
         offset = (page - 1) * page_size
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         comments = []
         try:
             placeholders = ",".join(["?"] * len(oids))
@@ -238,23 +282,13 @@ class CommentRepository:
         except sqlite3.Error as e:
             print(f"按 oid 分页查询评论失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return comments
 
-    def get_comments_by_mid_stream(self, mids: List[int]) -> Iterator[Comment]:
-        if not mids:
-            return
-
-        conn = self._get_connection()
+    def _stream_comments(self, query_sql: str, params: Tuple, label: str) -> Iterator[Comment]:
+        cursor = self._get_connection().cursor()
         try:
-            cursor = conn.cursor()
-            placeholders = ",".join(["?"] * len(mids))
-            query_sql = f"""
-            SELECT * FROM comment
-            WHERE mid IN ({placeholders})
-            ORDER BY time ASC -- 流式通常按时间升序处理
-            """
-            cursor.execute(query_sql, tuple(mids))
+            cursor.execute(query_sql, params)
             while True:
                 rows = cursor.fetchmany(1000)
                 if not rows:
@@ -262,50 +296,50 @@ class CommentRepository:
                 for row in rows:
                     yield Comment.from_db_row(row)
         except sqlite3.Error as e:
-            print(f"按 mid 流式查询评论失败: {e}")
+            print(f"按 {label} 流式查询评论失败: {e}")
         finally:
-            if conn:
-                conn.close()
+            cursor.close()
+
+    def get_comments_by_mid_stream(self, mids: List[int]) -> Iterator[Comment]:
+        """
+        根据一个或多个用户ID (mid) 流式查询评论，按时间升序返回。
+        每个 mid 单独按索引顺序查询后再归并，避免多值 IN 查询对全部结果做临时排序。
+        """
+        query_sql = """
+        SELECT * FROM comment
+        WHERE mid = ?
+        ORDER BY time ASC -- 流式通常按时间升序处理
+        """
+        streams = [
+            self._stream_comments(query_sql, (mid,), "mid")
+            for mid in dict.fromkeys(mids)
+        ]
+        return heapq.merge(*streams, key=lambda comment: comment.time)
 
     def get_comments_by_oid_stream(self, oids: List[int]) -> Iterator[Comment]:
         """
         根据一个或多个视频ID (oid) 流式查询评论。
-        返回一个 Comment 对象的迭代器。
+        返回一个 Comment 对象的迭代器，按时间升序；
+        每个 oid 单独按索引顺序查询后再归并，避免多值 IN 查询对全部结果做临时排序。
         """
-        if not oids:
-            return
-
-        conn = self._get_connection()
-        try:
-            cursor = conn.cursor()
-            placeholders = ",".join(["?"] * len(oids))
-            query_sql = f"""
-            SELECT * FROM comment
-            WHERE oid IN ({placeholders})
-            AND type = 1
-            ORDER BY time ASC -- 流式通常按时间升序处理
-            """
-            cursor.execute(query_sql, tuple(oids))
-            while True:
-                rows = cursor.fetchmany(1000)
-                if not rows:
-                    break
-                for row in rows:
-                    yield Comment.from_db_row(row)
-        except sqlite3.Error as e:
-            print(f"按 oid 流式查询评论失败: {e}")
-        finally:
-            if conn:
-                conn.close()
+        query_sql = """
+        SELECT * FROM comment
+        WHERE oid = ?
+        AND type = 1
+        ORDER BY time ASC -- 流式通常按时间升序处理
+        """
+        streams = [
+            self._stream_comments(query_sql, (oid,), "oid")
+            for oid in dict.fromkeys(oids)
+        ]
+        return heapq.merge(*streams, key=lambda comment: comment.time)
 
     def get_latest_comment_by_mid(self, mid: int) -> Optional[Comment]:
         if not mid:
             return None
-        conn = self._get_connection()
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = sqlite3.Row
         try:
-
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
             query_sql = """
             SELECT rpid, oid, type FROM comment
             WHERE mid = ?
@@ -326,5 +360,24 @@ class CommentRepository:
             print(f"获取用户最新评论失败: {e}")
             return None
         finally:
-            if conn:
-                conn.close()
+            cursor.close()
+
+    def get_reply_counts(self, rpids: List[int]) -> Dict[int, int]:
+        """
+        根据评论ID查询已入库的回复数 (single_reply_num)，返回 {rpid: 回复数}。
+        """
+        if not rpids:
+            return {}
+        cursor = self._get_connection().cursor()
+        reply_counts = {}
+        try:
+            placeholders = ",".join(["?"] * len(rpids))
+            query_sql = f"SELECT rpid, single_reply_num FROM comment WHERE rpid IN ({placeholders})"
+            cursor.execute(query_sql, tuple(rpids))
+            for rpid, single_reply_num in cursor.fetchall():
+                reply_counts[rpid] = single_reply_num or 0
+        except sqlite3.Error as e:
+            print(f"查询评论回复数失败: {e}")
+        finally:
+            cursor.close()
+        return reply_counts
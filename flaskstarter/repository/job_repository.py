@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import time
+from typing import List, Optional
+from ..entity.job import Job, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED
+from ..database.connection import get_connection_manager
+
+
+class JobRepository:
+    """
+    后台任务队列的持久化。任务按 id 先进先出，领取任务在一个 BEGIN IMMEDIATE 事务里完成，
+    多个工作线程、多个进程同时领取也不会拿到同一个任务。
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        return self.connections.transaction()
+
+    def enqueue_job(self, kind: str, params: dict) -> int:
+        now = int(time.time())
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO job (kind, params, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (kind, json.dumps(params, ensure_ascii=False), JOB_QUEUED, now, now),
+            )
+            return cursor.lastrowid
+
+    def claim_next_job(self, worker: str) -> Optional[Job]:
+        """领取最早入队的任务并标记为运行中，没有排队的任务时返回 None。"""
+        now = int(time.time())
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM job WHERE status = ? ORDER BY id LIMIT 1",
+                (JOB_QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE job SET status = ?, worker = ?, started_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (JOB_RUNNING, worker, now, now, row[0]),
+            )
+            return Job.from_db_row(
+                conn.execute("SELECT * FROM job WHERE id = ?", (row[0],)).fetchone()
+            )
+
+    def update_progress(self, job_id: int, done: int, total: int, message: str = None):
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "UPDATE job SET done = ?, total = ?, message = ?, updated_at = ? WHERE id = ?",
+                    (done, total, message, int(time.time()), job_id),
+                )
+        except sqlite3.Error as e:
+            print(f"更新任务 {job_id} 进度失败: {e}")
+
+    def finish_job(self, job_id: int, result: dict) -> bool:
+        return self._finish(job_id, JOB_SUCCEEDED, result=result)
+
+    def fail_job(self, job_id: int, error: str) -> bool:
+        return self._finish(job_id, JOB_FAILED, error=error)
+
+    def _finish(self, job_id: int, status: str, result: dict = None, error: str = None) -> bool:
+        now = int(time.time())
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    UPDATE job SET status = ?, result = ?, error = ?, updated_at = ?, finished_at = ?
+                    WHERE id = ?
+                    """,
+                    (
+                        status,
+                        json.dumps(result, ensure_ascii=False) if result is not None else None,
+                        error,
+                        now,
+                        now,
+                        job_id,
+                    ),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"保存任务 {job_id} 结果失败: {e}")
+            return False
+
+    def requeue_job(self, job_id: int) -> bool:
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    """
+                    UPDATE job SET status = ?, worker = NULL, updated_at = ?
+                    WHERE id = ? AND status = ?
+                    """,
+                    (JOB_QUEUED, int(time.time()), job_id, JOB_RUNNING),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"重新排队任务 {job_id} 失败: {e}")
+            return False
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute("SELECT * FROM job WHERE id = ?", (job_id,))
+            return Job.from_db_row(cursor.fetchone())
+        except sqlite3.Error as e:
+            print(f"读取任务 {job_id} 失败: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_jobs_by_status(self, status: str) -> List[Job]:
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute("SELECT * FROM job WHERE status = ? ORDER BY id", (status,))
+            return [Job.from_db_row(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"读取任务列表失败: {e}")
+            return []
+        finally:
+            cursor.close()
@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SerialWriter:
+    """
+    把写数据库的操作交给同一个后台线程依次执行。
+    多个爬虫并发运行时共用一个 SerialWriter，数据库始终只有一个写连接，
+    不会因为争抢写锁而等待 busy_timeout。run() 会等待写入完成并返回结果或抛出异常。
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+
+    def run(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "SerialWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
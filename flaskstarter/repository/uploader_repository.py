@@ -0,0 +1,106 @@
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+from ..entity.bv import Bv
+from ..database.connection import get_connection_manager
+
+
+class UploaderRepository:
+    """
+    负责 UP 主视频索引 (uploader / uploader_video 表) 的读写，视频本身的信息保存在 bv 表中。
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程复用的数据库连接"""
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        """开启写事务，退出时提交，出错时回滚"""
+        return self.connections.transaction()
+
+    def get_refresh_times(self, mid: int) -> Optional[Tuple[int, int]]:
+        """返回 (最近一次刷新时间, 最近一次完整获取时间)，从未获取过时返回 None。"""
+        try:
+            row = self._get_connection().execute(
+                "SELECT refreshed_at, full_refreshed_at FROM uploader WHERE mid = ?",
+                (mid,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"查询UP主 {mid} 的视频索引失败: {e}")
+            return None
+        if row is None or row[1] is None:
+            return None
+        return row[0], row[1]
+
+    def get_video_oids(self, mid: int) -> Set[int]:
+        try:
+            rows = self._get_connection().execute(
+                "SELECT oid FROM uploader_video WHERE mid = ?", (mid,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"查询UP主 {mid} 的视频索引失败: {e}")
+            return set()
+        return {row[0] for row in rows}
+
+    def get_videos(self, mid: int) -> List[Bv]:
+        """按发布时间倒序返回索引中 UP 主的全部视频。"""
+        cursor = self._get_connection().cursor()
+        videos = []
+        try:
+            cursor.execute(
+                """
+                SELECT bv.* FROM uploader_video uv
+                JOIN bv ON bv.oid = uv.oid
+                WHERE uv.mid = ?
+                ORDER BY uv.created DESC
+                """,
+                (mid,),
+            )
+            for row in cursor.fetchall():
+                videos.append(Bv.from_db_row(row))
+        except sqlite3.Error as e:
+            print(f"查询UP主 {mid} 的视频索引失败: {e}")
+        finally:
+            cursor.close()
+        return videos
+
+    def save_videos(
+        self,
+        mid: int,
+        videos: Iterable[Tuple[int, int]],
+        video_count: int,
+        full: bool,
+    ) -> bool:
+        """
+        把 (oid, 发布时间) 写入 UP 主的视频索引并更新刷新时间。
+        full 为 True 表示这是完整的视频列表，索引中不在列表里的视频（已删除）一并移除。
+        """
+        videos = list(videos)
+        now = int(time.time())
+        try:
+            with self._transaction() as conn:
+                if full:
+                    conn.execute("DELETE FROM uploader_video WHERE mid = ?", (mid,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO uploader_video (mid, oid, created) VALUES (?, ?, ?)",
+                    [(mid, oid, created) for oid, created in videos],
+                )
+                conn.execute(
+                    """
+                    INSERT INTO uploader (mid, video_count, refreshed_at, full_refreshed_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(mid) DO UPDATE SET
+                        video_count = excluded.video_count,
+                        refreshed_at = excluded.refreshed_at,
+                        full_refreshed_at = COALESCE(excluded.full_refreshed_at, uploader.full_refreshed_at)
+                    """,
+                    (mid, video_count, now, now if full else None),
+                )
+            return True
+        except sqlite3.Error as e:
+            print(f"保存UP主 {mid} 的视频索引失败: {e}")
+            return False
@@ -1,6 +1,8 @@
 import sqlite3
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Iterable
 from ..entity.user import User
+from ..database.connection import get_connection_manager
+from .bulk import iter_chunks
 
 
 class UserRepository:
@@ -10,41 +12,58 @@ class UserRepository:
 
     def __init__(self, db_name):
         self.db_name = db_name
+        self.connections = get_connection_manager(db_name)
 
     def _get_connection(self) -> sqlite3.Connection:
-        """获取数据库连接"""
-        return sqlite3.connect(self.db_name)
+        """获取当前线程复用的数据库连接"""
+        return self.connections.get_connection()
+
+    def _transaction(self):
+        """开启写事务，退出时提交，出错时回滚"""
+        return self.connections.transaction()
 
     def add_or_update_user(self, user: User) -> bool:
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
             insert_or_replace_sql = """
             INSERT OR REPLACE INTO user (
-                mid, face, fans, friend, name, sex, sign, like_num, vip
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                mid, face, fans, friend, name, sex, sign, like_num, vip, fetched_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
-            params = (
-                user.mid,
-                user.face,
-                user.fans,
-                user.friend,
-                user.name,
-                user.sex,
-                user.sign,
-                user.like_num,
-                user.vip,
-            )
-            cursor.execute(insert_or_replace_sql, params)
-
-            conn.commit()
+            with self._transaction() as conn:
+                conn.execute(insert_or_replace_sql, user.to_tuple())
             return True
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"添加/更新用户失败: {e}")
             return False
-        finally:
-            conn.close()
+
+    def bulk_upsert_users(self, users: Iterable[User], chunk_size: int = 1000) -> int:
+        """
+        批量插入或更新用户，每 chunk_size 条一个事务。
+        评论爬取得到的用户没有粉丝数/关注数/获赞数，这些列为 NULL 时保留已补全的值。
+        返回成功写入的条数，出错时停止并返回出错前已提交的条数。
+        """
+        upsert_sql = """
+        INSERT INTO user (
+            mid, face, fans, friend, name, sex, sign, like_num, vip, fetched_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(mid) DO UPDATE SET
+            face = excluded.face,
+            fans = COALESCE(excluded.fans, user.fans),
+            friend = COALESCE(excluded.friend, user.friend),
+            name = excluded.name, sex = excluded.sex, sign = excluded.sign,
+            like_num = COALESCE(excluded.like_num, user.like_num),
+            vip = excluded.vip,
+            fetched_at = COALESCE(excluded.fetched_at, user.fetched_at)
+        """
+        written = 0
+        try:
+            for chunk in iter_chunks((user.to_tuple() for user in users), chunk_size):
+                with self._transaction() as conn:
+                    conn.executemany(upsert_sql, chunk)
+                written += len(chunk)
+        except sqlite3.Error as e:
+            print(f"批量添加/更新用户失败: {e}")
+        return written
 
     def delete_users_by_mids(self, mids: List[int]) -> int:
         """
@@ -53,21 +72,15 @@ class UserRepository:
         """
         if not mids:
             return 0
-        conn = self._get_connection()
-        cursor = conn.cursor()
         try:
-            placeholders = ",".join(["?"] * len(mids))
-            delete_sql = f"DELETE FROM user WHERE mid IN ({placeholders})"
-            cursor.execute(delete_sql, tuple(mids))
-            deleted_count = cursor.rowcount
-            conn.commit()
+            with self._transaction() as conn:
+                placeholders = ",".join(["?"] * len(mids))
+                delete_sql = f"DELETE FROM user WHERE mid IN ({placeholders})"
+                deleted_count = conn.execute(delete_sql, tuple(mids)).rowcount
             return deleted_count
         except sqlite3.Error as e:
-            conn.rollback()
             print(f"按 mid 删除用户失败: {e}")
             return 0
-        finally:
-            conn.close()
 
     def get_users_by_mids(self, mids: List[int]) -> List[User]:
         """
@@ -77,8 +90,7 @@ class UserRepository:
 
         if not mids:
             return []
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        cursor = self._get_connection().cursor()
         users = []
         try:
             placeholders = ",".join(["?"] * len(mids))
@@ -89,5 +101,40 @@ class UserRepository:
         except sqlite3.Error as e:
             print(f"按 mid 查询用户失败: {e}")
         finally:
-            conn.close()
+            cursor.close()
         return users
+
+    def get_mids_to_enrich(
+        self,
+        fetched_before: int,
+        oids: Optional[List[int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[int]:
+        """
+        查询发过评论、但资料从未补全或补全时间早于 fetched_before 的用户ID。
+        oids 不为空时只查这些视频下的评论者。
+        """
+        where_oid = ""
+        params: list = []
+        if oids:
+            where_oid = f"WHERE c.oid IN ({','.join(['?'] * len(oids))})"
+            params.extend(oids)
+        query_sql = f"""
+        SELECT c.mid FROM (SELECT DISTINCT mid FROM comment c {where_oid}) AS c
+        LEFT JOIN user u ON u.mid = c.mid
+        WHERE u.fetched_at IS NULL OR u.fetched_at < ?
+        ORDER BY c.mid
+        """
+        params.append(fetched_before)
+        if limit:
+            query_sql += " LIMIT ?"
+            params.append(limit)
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute(query_sql, tuple(params))
+            return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"查询待补全资料的用户失败: {e}")
+            return []
+        finally:
+            cursor.close()
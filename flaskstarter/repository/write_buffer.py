@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from ..entity.comment import Comment
+from ..entity.user import User
+from ..database.connection import get_connection_manager
+from .comment_repository import CommentRepository
+from .serial_writer import SerialWriter
+from .user_repository import UserRepository
+
+
+class UserSnapshotCache:
+    """
+    按条数限制大小的 LRU 缓存，记录本次会话中已写入数据库的用户快照 (User.to_tuple())。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def is_persisted(self, user: User) -> bool:
+        """用户的当前快照是否已经写入过，同时统计命中率。"""
+        snapshot = self._snapshots.get(user.mid)
+        if snapshot is not None and snapshot == user.to_tuple():
+            self._snapshots.move_to_end(user.mid)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def remember(self, users: List[User]):
+        if self.max_entries <= 0:
+            return
+        for user in users:
+            self._snapshots[user.mid] = user.to_tuple()
+            self._snapshots.move_to_end(user.mid)
+        while len(self._snapshots) > self.max_entries:
+            self._snapshots.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class WriteBuffer:
+    """
+    爬虫写库缓冲区：先在内存中收集 Comment 与 User，再在一个事务里通过仓库的批量 upsert 接口写入。
+    满 max_rows 条或距第一条未写入数据超过 max_delay_ms 毫秒时自动写入，
+    爬虫也会在每页结束和爬取结束（包括出错退出）时主动调用 flush()。
+    传入 writer 时写入交给该 SerialWriter 的线程执行，多个缓冲区可以共用同一个写线程。
+    活跃用户会随评论反复出现，快照与最近写入过的一致时 add_user() 直接跳过。
+    """
+
+    def __init__(
+        self,
+        db_name,
+        max_rows: int = 500,
+        max_delay_ms: int = 1000,
+        writer: Optional[SerialWriter] = None,
+        user_cache_size: int = 20000,
+    ):
+        self.connections = get_connection_manager(db_name)
+        self.writer = writer
+        self.user_repo = UserRepository(db_name)
+        self.comment_repo = CommentRepository(db_name)
+        self.max_rows = max_rows
+        self.max_delay_ms = max_delay_ms
+        self._users: Dict[int, User] = {}
+        self._comments: Dict[int, Comment] = {}
+        self._first_pending_at = None
+        self._lock = threading.Lock()
+        self.user_cache = UserSnapshotCache(user_cache_size)
+
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.commit_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._users) + len(self._comments)
+
+    def add_user(self, user: User):
+        with self._lock:
+            if self.user_cache.is_persisted(user):
+                self._users.pop(user.mid, None)
+                return
+            self._users[user.mid] = user
+            self._mark_pending()
+        self._flush_if_due()
+
+    def add_comment(self, comment: Comment):
+        with self._lock:
+            self._comments[comment.rpid] = comment
+            self._mark_pending()
+        self._flush_if_due()
+
+    def _mark_pending(self):
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+
+    def _flush_if_due(self):
+        if len(self) >= self.max_rows:
+            self.flush()
+        elif (
+            self._first_pending_at is not None
+            and (time.monotonic() - self._first_pending_at) * 1000 >= self.max_delay_ms
+        ):
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        把缓冲区内的数据在一个事务中写入数据库。
+        写入失败时整体回滚并保留缓冲数据，下次 flush 时重试。
+        """
+        with self._lock:
+            if not self._users and not self._comments:
+                return True
+            users = list(self._users.values())
+            comments = list(self._comments.values())
+
+            started = time.perf_counter()
+            try:
+                if self.writer is not None:
+                    self.writer.run(self._write, users, comments)
+                else:
+                    self._write(users, comments)
+            except sqlite3.Error as e:
+                print(f"批量写入失败，{len(users) + len(comments)} 条数据留待重试: {e}")
+                return False
+
+            self.commit_seconds += time.perf_counter() - started
+            self.flush_count += 1
+            self.rows_flushed += len(users) + len(comments)
+            self.user_cache.remember(users)
+            self._users.clear()
+            self._comments.clear()
+            self._first_pending_at = None
+            return True
+
+    def _write(self, users: List[User], comments: List[Comment]):
+        with self.connections.transaction():
+            if self.user_repo.bulk_upsert_users(users) != len(users):
+                raise sqlite3.Error("用户写入不完整")
+            if self.comment_repo.bulk_upsert_comments(comments) != len(comments):
+                raise sqlite3.Error("评论写入不完整")
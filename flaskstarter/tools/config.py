@@ -1,20 +1,89 @@
+import os
+
 ROOT_PATH = "./flaskstarter/"
 FONT_PATH = ROOT_PATH + "assets/fonts/PingFang-Medium.ttf"
 
 TEST_DB_PATH = ROOT_PATH + "test.db"
 BILI_DB_PATH = ROOT_PATH + "assets/bili_data.db"
+# 评论数据库的存储调优预设，可选值见 database/connection.py 中的 STORAGE_PROFILES
+BILI_DB_STORAGE_PROFILE = "balanced"
 HIT_STOPWORDS_PATH = ROOT_PATH + "assets/hit_stopwords.txt"
 IMAGE_DIR = ROOT_PATH + "static/images/"
 STATIC_IMAGE_DIR = "/static/images/"
 
 COOKIE_PATH = ROOT_PATH + "assets/bili_cookie.txt"
 
-OUTPUT_CSV_PATH = ROOT_PATH + "output_csv/output.csv"
-OUTPUT_CSV_PATH1 = "./output_csv/output.csv"
+# 接口地址，可用同名环境变量覆盖，例如指向本地桩服务 (flaskstarter/benchmark/stub_server.py) 离线压测
+BILI_API_BASE = os.environ.get("BILI_API_BASE", "https://api.bilibili.com")
+AICU_API_BASE = os.environ.get("AICU_API_BASE", "https://api.aicu.cc")
+AICU_WORKER_BASE = os.environ.get("AICU_WORKER_BASE", "https://worker.aicu.cc")
+
+# 异步爬取模式下同时请求二级评论的最大并发数
+SUB_REPLY_CONCURRENCY = 8
+# 爬取用户全部评论时同时请求的 aicu 评论页数，实际速率仍受 aicu_search 限速约束
+AICU_PAGE_CONCURRENCY = 4
+# 批量补全用户资料时同时请求的用户数，实际速率仍受 aicu_space 限速约束
+USER_ENRICH_WORKERS = 4
+# 用户资料 (粉丝数、关注数、获赞数) 的有效期 (秒)，过期或从未获取的用户才重新请求
+USER_ENRICH_TTL = 7 * 24 * 3600
+# 批量补全用户资料时每攒满多少个用户批量写库一次
+USER_ENRICH_BATCH_ROWS = 200
+# 获取 UP 主视频列表时同时请求的页数，实际速率仍受 space_arc 限速约束
+UPLOADER_PAGE_CONCURRENCY = 3
+# UP 主视频索引的有效期 (秒)：有效期内只增量获取新发布的视频，过期后完整获取一次以更新所有视频的评论数
+UPLOADER_INDEX_TTL = 24 * 3600
+# 批量解析 BV 号时同时请求视频信息接口的数量，实际速率仍受 video_view 限速约束
+BV_RESOLVE_CONCURRENCY = 4
+# 视频信息接口返回视频不存在或不可见后，多久之内 (秒) 不再为该 BV 号请求接口
+BV_NEGATIVE_CACHE_TTL = 6 * 3600
+# 批量爬取多个视频时同时进行的视频数，所有视频共用限速配置
+CRAWL_VIDEO_WORKERS = 3
+
+# 共享 HTTP 连接池大小，应不小于同时进行的请求数
+HTTP_POOL_SIZE = (SUB_REPLY_CONCURRENCY + 1) * CRAWL_VIDEO_WORKERS
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0"
+
+# 各接口族共享的限速配置 (次/秒)：初始速率、风控后最低速率、恢复时最高速率、突发容量
+RATE_LIMITS = {
+    "main_reply": {"rate": 2.0, "min_rate": 0.2, "max_rate": 5.0, "burst": 2},
+    "sub_reply": {"rate": 8.0, "min_rate": 0.5, "max_rate": 20.0, "burst": 8},
+    "aicu_search": {"rate": 2.0, "min_rate": 0.2, "max_rate": 4.0, "burst": 2},
+    "aicu_space": {"rate": 2.0, "min_rate": 0.2, "max_rate": 4.0, "burst": 2},
+    "reply_detail": {"rate": 2.0, "min_rate": 0.2, "max_rate": 4.0, "burst": 2},
+    "space_arc": {"rate": 1.0, "min_rate": 0.2, "max_rate": 3.0, "burst": 2},
+    "video_view": {"rate": 4.0, "min_rate": 0.5, "max_rate": 8.0, "burst": 4},
+}
+
+# 原始接口页面存档：开启后爬虫把每页原始 JSON 追加到 gzip 分段文件，可用 flask replayarchive 离线重建数据
+PAGE_ARCHIVE_ENABLED = False
+PAGE_ARCHIVE_DIR = ROOT_PATH + "assets/page_archive/"
+
+# 爬虫写库缓冲区：攒满多少条或等待多少毫秒后批量提交一次
+WRITE_BUFFER_MAX_ROWS = 500
+WRITE_BUFFER_MAX_DELAY_MS = 1000
+# 每个爬虫记住最近写入过的多少个用户快照，快照未变的用户不再重复写库
+WRITE_BUFFER_USER_CACHE_SIZE = 20000
+
+# 后台任务队列：工作线程数、空闲时轮询新任务的间隔 (秒)、是否在网页进程里运行工作线程
+# 关闭 JOB_IN_WEB_PROCESS 时需要另外运行 flask runjobs 处理任务
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_IN_WEB_PROCESS = True
+# 任务进度事件流 (SSE) 没有新事件时重新读取任务状态的间隔 (秒)，
+# 任务在 flask runjobs 进程中运行时只能通过这种方式得到进度
+JOB_EVENTS_HEARTBEAT = 3.0
+
+# 评论详情与头像缓存在评论数据库的 response_cache 表中：各自的有效期 (秒) 与缓存总大小上限 (字节)
+COMMENT_DETAIL_CACHE_TTL = 24 * 3600
+AVATAR_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 每个任务导出的 CSV 与生成的图表放在以任务ID命名的子目录中，并发的任务互不覆盖；
+# 结束超过 JOB_OUTPUT_TTL 秒的任务的文件在打开模式选择页时清理
+JOB_OUTPUT_DIR = ROOT_PATH + "output_csv/jobs/"
+JOB_IMAGE_DIR = IMAGE_DIR + "jobs/"
+STATIC_JOB_IMAGE_DIR = STATIC_IMAGE_DIR + "jobs/"
+JOB_OUTPUT_TTL = 24 * 3600
 OUTPUT_CSV_NAME = "output.csv"
 
-USER_FACE_PATH = IMAGE_DIR + "userface.jpg"
-USER_FACE_NAME = "userface.jpg"
 ORIGIN_FACE_NAME = "noface.jpg"
-
-CHROME_DRIVER_PATH = ROOT_PATH + "assets/chromedriver.exe"
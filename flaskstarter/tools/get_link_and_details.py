@@ -1,36 +1,28 @@
-import re
 from typing import Dict
 import requests
 import json
 import time
 import hashlib
 import urllib.parse
-from ..tools.config import COOKIE_PATH
+from ..tools.config import COOKIE_PATH, BILI_API_BASE
+from .http_client import get_http_client
 
 import json
 import os
 
 
 def get_comment_details(oid: int, type: int, rpid: int) -> Dict:
-    # 从 cookie 文件中获取 csrf token 和完整的 cookie 字符串
-    cookie_str = ""
-    csrf_token = ""
+    http = get_http_client()
+    # csrf token 即 cookie 中的 bili_jct，由 HTTP 客户端缓存，cookie 文件变化时才重新读取
     try:
-        with open(COOKIE_PATH, "r") as f:
-            cookie_str = f.read()
-            # 从 cookie 字符串中提取 bili_jct (csrf token)
-            match = re.search(r"bili_jct=([^;]+)", cookie_str)
-            if match:
-                csrf_token = match.group(1)
-            else:
-                print("警告: 未在Cookie中找到 bili_jct (CSRF Token)。")
-    except FileNotFoundError:
-        print(f"错误: Cookie文件未找到于 {COOKIE_PATH}。")
-        return {"success": False, "message": f"Cookie文件未找到于 {COOKIE_PATH}。"}
+        cookie_str, csrf_token = http.cookies.get()
     except Exception as e:
         print(f"读取Cookie文件失败: {e}")
         return {"success": False, "message": f"读取Cookie文件失败: {e}"}
+    if not cookie_str:
+        return {"success": False, "message": f"Cookie文件 {COOKIE_PATH} 不存在或为空。"}
     if not csrf_token:
+        print("警告: 未在Cookie中找到 bili_jct (CSRF Token)。")
         return {"success": False, "message": "未获取到有效的CSRF Token (bili_jct)。"}
     # pagination_str 对于 detail API 似乎通常是空的或默认值
     pagination_str = '{"offset":""}'
@@ -38,17 +30,11 @@ def get_comment_details(oid: int, type: int, rpid: int) -> Dict:
     # 注意：你提供的URL中没有w_rid和wts，表明这个API可能不需要WBI签名
     # 如果实际测试发现需要，则需要重新引入WBI签名逻辑
     url = (
-        f"https://api.bilibili.com/x/v2/reply/detail?"
+        f"{BILI_API_BASE}/x/v2/reply/detail?"
         f"csrf={csrf_token}&oid={oid}&pagination_str={urllib.parse.quote(pagination_str)}&root={rpid}&type={type}"
     )
-    headers = {
-        "Cookie": cookie_str,
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0",
-    }
     try:
-        response = requests.get(url=url, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = json.loads(response.content.decode("utf-8"))
+        data = http.get_json(url, family="reply_detail", timeout=15)
         if data.get("code") != 0:
             return {"success": False, "message": data.get("message", "API返回错误")}
         comment_info_raw = data["data"].get("root")
@@ -0,0 +1,190 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..crawler.rate_limiter import RateLimiter, get_rate_limiter, is_throttled
+from .config import COOKIE_PATH, HTTP_POOL_SIZE, HTTP_USER_AGENT
+
+# 每个接口族保留的最近耗时样本数，用于计算分位数
+LATENCY_SAMPLE_SIZE = 1000
+
+
+class CookieStore:
+    """
+    在内存中缓存 Cookie 与 CSRF Token (bili_jct)，只有 Cookie 文件的修改时间变化时才重新读取。
+    """
+
+    def __init__(self, cookie_path: str = COOKIE_PATH):
+        self.cookie_path = cookie_path
+        self.cookie = ""
+        self.csrf = ""
+        # 文件不存在时 mtime 记为 None，初始值与之区分，保证首次调用一定会读取
+        self._mtime = -1
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.cookie_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        if mtime is None:
+            print(f"错误: Cookie文件未找到于 {self.cookie_path}。")
+            self.cookie, self.csrf = "", ""
+            return
+
+        with open(self.cookie_path, "r") as f:
+            self.cookie = f.read().strip()
+        match = re.search(r"bili_jct=([^;]+)", self.cookie)
+        self.csrf = match.group(1) if match else ""
+
+    def get(self) -> tuple[str, str]:
+        """返回 (cookie, csrf)。"""
+        with self._lock:
+            self._reload_if_changed()
+            return self.cookie, self.csrf
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLE_SIZE)
+
+    def record(self, seconds: float, ok: bool):
+        self.count += 1
+        self.total_seconds += seconds
+        self.samples.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        samples = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": self.total_seconds / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": samples[-1] * 1000 if samples else 0.0,
+        }
+
+
+class HttpClient:
+    """
+    所有爬虫共用的 HTTP 客户端：
+    - 复用一个 requests.Session，按主机保持长连接，连接池大小由 HTTP_POOL_SIZE 配置；
+    - Cookie 由 CookieStore 缓存，需要登录态的请求才附带；
+    - family 对应限速器中的接口族，请求前取令牌，返回后根据状态码调整速率；
+    - 按 family 统计请求耗时。
+    """
+
+    def __init__(
+        self,
+        cookie_path: str = COOKIE_PATH,
+        pool_size: int = HTTP_POOL_SIZE,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.cookies = CookieStore(cookie_path)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = HTTP_USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats: Dict[str, LatencyStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def get(
+        self,
+        url: str,
+        family: str,
+        params: Optional[dict] = None,
+        timeout: float = 15,
+        with_cookie: bool = True,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        发送 GET 请求并返回响应，不检查状态码。
+        family 不在限速配置中时只统计耗时、不限速。
+        """
+        limited = family in self.rate_limiter.buckets
+        if limited:
+            self.rate_limiter.acquire(family)
+
+        headers = {}
+        if with_cookie:
+            headers["Cookie"] = self.cookies.get()[0]
+
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.session.get(
+                url, params=params, headers=headers, timeout=timeout, stream=stream
+            )
+            return response
+        finally:
+            self._record(family, time.perf_counter() - started, response)
+            if limited and response is not None and is_throttled(response.status_code):
+                self.rate_limiter.report_throttled(family)
+
+    def get_json(
+        self,
+        url: str,
+        family: str,
+        params: Optional[dict] = None,
+        timeout: float = 15,
+        with_cookie: bool = True,
+    ) -> dict:
+        """
+        发送 GET 请求并解析 JSON，HTTP 错误抛出 requests.exceptions.RequestException，
+        解析失败抛出 json.JSONDecodeError。接口 code 交给限速器判断是否被风控。
+        """
+        response = self.get(
+            url, family, params=params, timeout=timeout, with_cookie=with_cookie
+        )
+        response.raise_for_status()
+        data = json.loads(response.content.decode("utf-8"))
+        if family in self.rate_limiter.buckets:
+            self.rate_limiter.report(family, api_code=data.get("code"))
+        return data
+
+    def _record(self, family: str, seconds: float, response: Optional[requests.Response]):
+        ok = response is not None and response.ok
+        with self._stats_lock:
+            stats = self._stats.get(family)
+            if stats is None:
+                stats = self._stats[family] = LatencyStats()
+            stats.record(seconds, ok)
+
+    def get_latency_stats(self) -> Dict[str, dict]:
+        with self._stats_lock:
+            return {family: stats.summary() for family, stats in self._stats.items()}
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
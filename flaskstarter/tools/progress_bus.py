@@ -0,0 +1,58 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class ProgressBus:
+    """
+    进程内的进度事件总线，按主题（例如 "job:12"）分发事件。
+    每个订阅者持有一个有界队列，队列满时丢弃最旧的事件，慢速订阅者不会拖慢爬虫。
+    没有订阅者时 has_subscribers() 只是一次字典查找，发布方应先检查它再构造事件。
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers
+
+    def publish(self, topic: str, event: dict):
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        for events in list(subscribers):
+            while True:
+                try:
+                    events.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[queue.Queue]:
+        events = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(events)
+        try:
+            yield events
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(topic, [])
+                if events in subscribers:
+                    subscribers.remove(events)
+                if not subscribers:
+                    self._subscribers.pop(topic, None)
+
+
+_progress_bus = ProgressBus()
+
+
+def get_progress_bus() -> ProgressBus:
+    """进程内共享的进度事件总线。"""
+    return _progress_bus
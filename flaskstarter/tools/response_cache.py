@@ -0,0 +1,75 @@
+import json
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from ..repository.cache_repository import CacheRepository
+from .config import *
+from .get_link_and_details import get_comment_details
+from .http_client import get_http_client
+
+
+def _detail_key(mid: int) -> str:
+    return f"detail:{mid}"
+
+
+def _avatar_key(url: str) -> str:
+    return f"avatar:{url}"
+
+
+def get_cached_comment_details(
+    mid: int, oid: int, type: int, rpid: int, db_name: str = BILI_DB_PATH
+) -> Dict:
+    """
+    按用户ID缓存 get_comment_details 的结果，有效期内不再请求接口。
+    只缓存成功的结果，失败时下次仍会重新请求。
+    """
+    cache = CacheRepository(db_name)
+    cached = cache.get(_detail_key(mid), max_age=COMMENT_DETAIL_CACHE_TTL)
+    if cached is not None:
+        return json.loads(cached[0])
+
+    detail = get_comment_details(oid, type, rpid)
+    if detail.get("success"):
+        cache.put(
+            _detail_key(mid),
+            json.dumps(detail, ensure_ascii=False).encode("utf-8"),
+            "application/json",
+            RESPONSE_CACHE_MAX_BYTES,
+        )
+    return detail
+
+
+def get_cached_avatar(url: str, db_name: str = BILI_DB_PATH) -> Optional[Tuple[bytes, str]]:
+    """
+    按头像URL缓存头像图片，返回 (图片内容, 类型)。
+    过期后重新下载，下载失败时退回过期的缓存；从未缓存过且下载失败时返回 None。
+    """
+    cache = CacheRepository(db_name)
+    cached = cache.get(_avatar_key(url), max_age=AVATAR_CACHE_TTL)
+    if cached is not None:
+        return cached
+
+    try:
+        response = get_http_client().get(
+            url, family="avatar", timeout=10, with_cookie=False
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"下载头像 {url} 失败: {e}")
+        return cache.get(_avatar_key(url))
+
+    content_type = response.headers.get("Content-Type", "image/jpeg")
+    cache.put(_avatar_key(url), response.content, content_type, RESPONSE_CACHE_MAX_BYTES)
+    return response.content, content_type
+
+
+def get_user_avatar(mid: int, db_name: str = BILI_DB_PATH) -> Optional[Tuple[bytes, str]]:
+    """取缓存的评论详情中该用户的头像，没有缓存过该用户的评论详情时返回 None。"""
+    cached = CacheRepository(db_name).get(_detail_key(mid))
+    if cached is None:
+        return None
+    comment_info = json.loads(cached[0]).get("comment_info") or {}
+    if not comment_info.get("face"):
+        return None
+    return get_cached_avatar(comment_info["face"], db_name)
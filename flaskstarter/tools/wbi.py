@@ -0,0 +1,23 @@
+import hashlib
+import time
+import urllib.parse
+from typing import Optional
+
+# WBI 签名的混合密钥，与评论主接口 (x/v2/reply/wbi/main) 签名时拼接的密钥相同
+WBI_MIXIN_KEY = "ea1db124af3c7062474693fa704f4ff8"
+
+
+def sign_wbi_params(params: dict, wts: Optional[int] = None) -> dict:
+    """
+    按 WBI 规则给请求参数签名：加入时间戳 wts，按参数名排序并去掉值中的 !'()* 后拼成查询串，
+    末尾拼接混合密钥取 MD5 作为 w_rid。返回带 wts 与 w_rid 的新参数字典。
+    """
+    signed = dict(params)
+    signed["wts"] = int(time.time()) if wts is None else wts
+    signed = {
+        key: "".join(ch for ch in str(value) if ch not in "!'()*")
+        for key, value in sorted(signed.items())
+    }
+    query = urllib.parse.urlencode(signed)
+    signed["w_rid"] = hashlib.md5((query + WBI_MIXIN_KEY).encode("utf-8")).hexdigest()
+    return signed
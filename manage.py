@@ -1,11 +1,29 @@
 # -*- coding: utf-8 -*-
 
+import time
+
+import click
 from sqlalchemy.orm.mapper import configure_mappers
 
 from flaskstarter import create_app
+from flaskstarter.benchmark.suite import DEFAULT_SHAPES, SHAPES, run_benchmarks
+from flaskstarter.crawler.archive_replay import ArchiveReplayer
+from flaskstarter.crawler.crawl_scheduler import CrawlScheduler
+from flaskstarter.crawler.get_user_information import BilibiliUserCrawler
 from flaskstarter.database.db_manage import init_bilibili_db
+from flaskstarter.database.migrations import apply_migrations
+from flaskstarter.database.query_plans import find_plan_regressions
 from flaskstarter.extensions import db
-from flaskstarter.tools.config import BILI_DB_PATH
+from flaskstarter.jobs.tasks import get_job_queue
+from flaskstarter.repository.bv_repository import BvRepository
+from flaskstarter.tools.config import (
+    BILI_DB_PATH,
+    CRAWL_VIDEO_WORKERS,
+    JOB_WORKERS,
+    PAGE_ARCHIVE_ENABLED,
+    USER_ENRICH_TTL,
+    USER_ENRICH_WORKERS,
+)
 from flaskstarter.user import Users, ADMIN, USER, ACTIVE
 
 from flaskstarter.utils import INSTANCE_FOLDER_PATH
@@ -41,3 +59,116 @@ def initdb():
 
     print("Database initialized with 2 users (admin, demo)")
     init_bilibili_db(BILI_DB_PATH)
+
+
+@application.cli.command("migratedb")
+def migratedb():
+    """Apply pending migrations to the bilibili database."""
+    version = apply_migrations(BILI_DB_PATH)
+    print(f"Bilibili database is at schema version {version}")
+
+
+@application.cli.command("checkplans")
+def checkplans():
+    """Fail if a hot bilibili query no longer uses an index."""
+    regressions = find_plan_regressions(BILI_DB_PATH)
+    for name, plan in regressions.items():
+        print(f"{name}: {' | '.join(plan)}")
+    if regressions:
+        raise SystemExit(1)
+    print("All hot queries use an index")
+
+
+@application.cli.command("crawlvideos")
+@click.argument("bvs", nargs=-1, required=True)
+@click.option("--incremental", is_flag=True,
+              help="Only fetch comments newer than what is already stored.")
+@click.option("--fresh", is_flag=True, help="Ignore saved checkpoints.")
+@click.option("--skip-unchanged", is_flag=True,
+              help="Skip videos whose comment count is the same as after their last full crawl.")
+@click.option("--archive/--no-archive", default=PAGE_ARCHIVE_ENABLED,
+              help="Append the raw API pages to the page archive.")
+@click.option("--workers", default=CRAWL_VIDEO_WORKERS, show_default=True,
+              help="Videos crawled at the same time.")
+def crawlvideos(bvs, incremental, fresh, skip_unchanged, archive, workers):
+    """Crawl (or refresh) the comments of one or more videos."""
+    scheduler = CrawlScheduler(max_workers=workers, archive=archive)
+    for result in scheduler.crawl_all(bvs, fresh=fresh, incremental=incremental,
+                                      skip_unchanged=skip_unchanged):
+        if result.skipped:
+            print(f"{result.bv}: unchanged at {result.expected_count} comments, skipped")
+            continue
+        status = result.error or ("done" if result.finished else "incomplete")
+        print(f"{result.bv}: {result.count} comments in {result.seconds:.1f}s ({status}), "
+              f"{result.saved_requests} sub-reply requests saved by previews, "
+              f"user cache hit rate {result.user_cache_hit_rate:.1%}")
+
+
+@application.cli.command("enrichusers")
+@click.argument("bvs", nargs=-1)
+@click.option("--ttl-days", default=USER_ENRICH_TTL / 86400, show_default=True,
+              help="Refetch profiles older than this many days.")
+@click.option("--limit", type=int, default=None,
+              help="Fetch at most this many profiles.")
+@click.option("--workers", default=USER_ENRICH_WORKERS, show_default=True,
+              help="Profiles requested at the same time.")
+def enrichusers(bvs, ttl_days, limit, workers):
+    """Fetch fans/friend/like counts for commenters with missing or stale profiles."""
+    oids = BvRepository(BILI_DB_PATH).get_oids_by_bids(list(bvs)) if bvs else None
+    if bvs and not oids:
+        raise click.ClickException("None of the given videos have been crawled")
+    crawler = BilibiliUserCrawler(BILI_DB_PATH, workers=workers)
+    started = time.perf_counter()
+    count = crawler.enrich_users(ttl=int(ttl_days * 86400), oids=oids, limit=limit)
+    print(f"Enriched {count} users in {time.perf_counter() - started:.1f}s")
+
+
+@application.cli.command("runjobs")
+@click.option("--workers", default=JOB_WORKERS, show_default=True,
+              help="Jobs run at the same time.")
+def runjobs(workers):
+    """Run background job workers in the foreground until interrupted."""
+    queue = get_job_queue()
+    queue.workers = workers
+    queue.start()
+    print(f"Running {workers} job workers, press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Waiting for running jobs to finish...")
+        queue.stop()
+
+
+@application.cli.command("replayarchive")
+@click.option("--oid", "oids", type=int, multiple=True,
+              help="Video oid to replay (repeatable).")
+@click.option("--uid", "uids", type=int, multiple=True,
+              help="User uid to replay (repeatable).")
+def replayarchive(oids, uids):
+    """Rebuild comment/user rows from the raw page archive, offline."""
+    replayer = ArchiveReplayer(BILI_DB_PATH)
+    if oids or uids:
+        stats = replayer.replay(oids=list(oids), uids=list(uids))
+    else:
+        stats = replayer.replay()
+    print(f"Replayed {stats['records']} pages from {stats['videos']} videos and "
+          f"{stats['users']} users: {stats['rows']} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:.0f} rows/s, {stats['errors']} parse errors)")
+
+
+@application.cli.command("bench")
+@click.option("--shapes", default=",".join(DEFAULT_SHAPES), show_default=True,
+              help=f"Comma-separated dataset shapes: {', '.join(SHAPES)}.")
+@click.option("--output", default="benchmark_results.json", show_default=True,
+              help="Where to write the JSON results.")
+@click.option("--baseline", type=click.Path(exists=True), default=None,
+              help="Previous results; exit non-zero on a regression.")
+@click.option("--tolerance", default=0.2, show_default=True,
+              help="Allowed relative slowdown before flagging a regression.")
+@click.option("--repeat", default=3, show_default=True,
+              help="Runs per scenario; the fastest one is kept.")
+def bench(shapes, output, baseline, tolerance, repeat):
+    """Benchmark the crawlers end to end against the local API stub."""
+    raise SystemExit(run_benchmarks(shapes.split(","), output, baseline=baseline,
+                                    tolerance=tolerance, repeat=repeat))
@@ -0,0 +1,40 @@
+from flaskstarter.database.connection import get_connection_manager
+from flaskstarter.database.migrations import apply_migrations
+from flaskstarter.database.query_plans import (
+    explain_query,
+    find_plan_regressions,
+    is_regressed,
+    query_forms,
+)
+from flaskstarter.entity.comment import Comment
+from flaskstarter.repository.comment_repository import CommentRepository
+
+
+def _init_db(tmp_path):
+    db_name = str(tmp_path / "bili_data.db")
+    apply_migrations(db_name)
+    return db_name
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    assert find_plan_regressions(_init_db(tmp_path)) == {}
+
+
+def test_multi_value_in_form_is_checked(tmp_path):
+    conn = get_connection_manager(_init_db(tmp_path)).get_connection()
+    sql = "SELECT * FROM comment WHERE oid IN (?) AND type = 1 ORDER BY time ASC"
+    forms = query_forms(sql)
+    assert len(forms) == 2
+    assert not is_regressed(explain_query(conn, forms[0]))
+    assert is_regressed(explain_query(conn, forms[1]))
+
+
+def test_oid_stream_merges_videos_in_time_order(tmp_path):
+    repo = CommentRepository(_init_db(tmp_path))
+    comments = [
+        Comment(rpid=rpid, parentid=0, rootid=0, mid=rpid, time=time, oid=oid, type=1)
+        for rpid, oid, time in [(1, 10, 300), (2, 20, 100), (3, 10, 200), (4, 20, 400)]
+    ]
+    repo.bulk_upsert_comments(comments)
+    streamed = [comment.rpid for comment in repo.get_comments_by_oid_stream([10, 20, 10])]
+    assert streamed == [2, 3, 1, 4]